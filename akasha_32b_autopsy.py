@@ -1,32 +1,114 @@
 import os
+import sys
+import json
 import numpy as np
-from llama_cpp import Llama
+from akasha_anchor_cache import AnchorCache, content_hash
+from akasha_blueprints import BlueprintWriter, BLUEPRINTS_32B, task_id
+from akasha_gguf import GGUFReader
 
 MODEL_PATH = "Qwen3-32B-Q4_K_M.gguf"
+TOP_K = 100
 
-print("💀 AWAKENING THE QWEN 3 DEAD BODY...")
-# Memory-Mapped to stay within your 32GB RAM limit
-llm = Llama(model_path=MODEL_PATH, n_gpu_layers=0, n_ctx=2048, verbose=False, logits_all=True)
+_llm = None
+anchor_cache = AnchorCache()
 
-def extract_qwen3_plans(task):
+def get_llm():
+    # Only wake the dead body on a cache miss
+    global _llm
+    if _llm is None:
+        from llama_cpp import Llama
+        print("💀 AWAKENING THE QWEN 3 DEAD BODY...")
+        # Memory-Mapped to stay within your 32GB RAM limit.
+        # logits_all=False: llama.cpp only keeps the LAST token's logits (1 x vocab, not n_ctx x vocab)
+        _llm = Llama(model_path=MODEL_PATH, n_gpu_layers=0, n_ctx=2048, verbose=False, logits_all=False)
+    return _llm
+
+def top_k(logits, k=TOP_K):
+    """O(vocab) selection with argpartition, then sort only the k winners."""
+    k = min(k, logits.shape[-1])
+    candidates = np.argpartition(logits, -k)[-k:]
+    order = np.argsort(logits[candidates])[::-1]
+    return candidates[order], logits[candidates[order]]
+
+def last_logits(llm):
+    # Zero-copy view of the context's logits buffer for the last evaluated token
+    import llama_cpp
+    return np.ctypeslib.as_array(llama_cpp.llama_get_logits(llm.ctx), shape=(llm.n_vocab(),))
+
+def eval_positions(llm, tokens, positions=None):
+    """
+    Evaluate `tokens` and return {position: top-k} for each selected position
+    (default: only the last token). The prompt is fed in chunks ending at each
+    selected position, so the KV cache carries over and nothing is recomputed.
+    Positions outside [0, len(tokens)) raise ValueError.
+    """
+    positions = sorted(set(positions or [len(tokens) - 1]))
+    invalid = [pos for pos in positions if not 0 <= pos < len(tokens)]
+    if invalid:
+        raise ValueError(f"Positions {invalid} out of range for a {len(tokens)}-token prompt")
+    llm.reset()
+    plans, start = {}, 0
+    for pos in positions:
+        llm.eval(tokens[start:pos + 1])
+        indices, scores = top_k(last_logits(llm))
+        plans[pos] = {"indices": indices.tolist(), "scores": scores.tolist()}
+        start = pos + 1
+    return plans
+
+def extract_qwen3_plans(task, positions=None, with_scores=False):
+    """
+    Top-k plan of the last token, or {position: plan} for every position in `positions`
+    (each plan: indices, or {"indices", "scores"} with with_scores=True).
+    """
     thinking_prompt = f"<|thought|>\n{task}\n<|endofthought|>"
-    print(f"🔍 PROBING THINKING MANIFOLD...")
-    tokens = llm.tokenize(thinking_prompt.encode('utf-8'))
-    llm.eval(tokens)
-    
-    # Capture the raw output
-    logits = np.array(llm._scores)
-    # Get the indices of the 100 strongest signals
-    top_indices = np.argsort(logits)[-100:][::-1]
-    return top_indices.tolist()
+    where = "last" if positions is None else ",".join(map(str, sorted(set(positions))))
+
+    def forward():
+        llm = get_llm()
+        print(f"🔍 PROBING THINKING MANIFOLD...")
+        tokens = llm.tokenize(thinking_prompt.encode('utf-8'))
+        # Get the indices of the 100 strongest signals
+        plans = eval_positions(llm, tokens, positions)
+        return {str(pos): plan for pos, plan in plans.items()}
+
+    # The GGUF carries its own tokenizer, so one file hash covers both
+    gguf_id = content_hash(MODEL_PATH)
+    record = anchor_cache.lookup(thinking_prompt, gguf_id, gguf_id, f"logits:{where}", TOP_K, forward)
+    plans = {int(pos): (plan if with_scores else plan["indices"]) for pos, plan in record.items()}
+    return plans if positions is not None else plans[max(plans)]
+
+def logit_dimension():
+    # Size of the index space the blueprints live in, read from the GGUF header (no model load)
+    with GGUFReader(MODEL_PATH) as skeleton:
+        return skeleton.tensor("token_embd.weight").shape[1]
+
+def extract_many(tasks, out_path=BLUEPRINTS_32B):
+    """Stream every task through ONE loaded model into one binary blueprint container."""
+    with BlueprintWriter(out_path, logit_dimension(), content_hash(MODEL_PATH), top_k=TOP_K) as writer:
+        for n, task in enumerate(tasks, 1):
+            plan = extract_qwen3_plans(task, with_scores=True)
+            writer.add(task_id(task), plan["indices"], plan["scores"])
+            print(f"   [{n}] {task_id(task)}: {plan['indices'][:5]}...")
+    return len(writer.task_ids)
+
+def read_tasks(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                row = json.loads(line)
+                yield row.get("task") or row["instruction"]
+            else:
+                yield line
 
 if __name__ == "__main__":
-    target_task = "Write a PyTorch kernel for 4-bit dequantization. Use __shared__ float tile logic."
-    master_indices = extract_qwen3_plans(target_task)
-    
-    # CLEAN SAVE: Join numbers with commas, NO BRACKETS
-    with open("32b_blueprints.txt", "w") as f:
-        f.write(",".join(map(str, master_indices)))
-    
-    print("\n✅ BLUEPRINTS SAVED CLEANLY TO: 32b_blueprints.txt")
-    print(f"Sample data: {str(master_indices[:5])}...")
+    # python akasha_32b_autopsy.py [tasks.txt | titan_dataset_complete.jsonl]
+    if len(sys.argv) > 1:
+        tasks = list(read_tasks(sys.argv[1]))
+    else:
+        tasks = ["Write a PyTorch kernel for 4-bit dequantization. Use __shared__ float tile logic."]
+
+    count = extract_many(tasks)
+    print(f"\n✅ {count} BLUEPRINT SETS SAVED TO: {BLUEPRINTS_32B}")
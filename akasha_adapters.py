@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+from collections import OrderedDict
+import torch
+import torch.nn as nn
+
+# ==================================================
+# 🔀 PROJECT AKASHA: MULTI-ADAPTER ROUTING
+# One base model, many DoRA roles, every row picks its own.
+# ==================================================
+#
+# Each target Linear of the base model is wrapped in a RoutedLinear that holds
+# SLOT-STACKED low-rank weights:
+#     A     [slots, r, in]      lora_A
+#     B     [slots, out, r]     lora_B * scaling
+#     scale [slots, out]        DoRA  m / ||W + s*B@A||   (1.0 for plain LoRA)
+# Slot 0 is the empty adapter. Before a forward pass the caller routes rows to
+# slots; the delta is then ONE gathered bmm pair for the whole mixed batch:
+#     y = scale[row] * (W x + B[row] @ (A[row] @ x)) + bias
+# The DoRA weight norm only depends on the weights, so it is computed once at
+# load time instead of on every forward.
+#
+# Adapters are registered by name + path and loaded on first use. The number of
+# resident slots is derived from a byte budget; the least recently routed
+# adapter is evicted when a new one needs room.
+#
+#   python akasha_adapters.py   -> grouped vs. per-adapter batches, tiny CPU Qwen3
+
+ADAPTER_BUDGET_BYTES = 512 * 1024**2
+MAX_RANK = 16
+TARGET_MODULES = ("q_proj", "k_proj", "v_proj", "o_proj", "gate_proj", "up_proj", "down_proj")
+_SUFFIXES = (".lora_A.weight", ".lora_B.weight", ".lora_magnitude_vector.weight", ".lora_magnitude_vector")
+
+def dense_weight(module):
+    """Base weight as a float32 [out, in] matrix (dequantised when it is a bitsandbytes 4-bit layer)."""
+    weight = module.weight
+    if hasattr(weight, "quant_state"):
+        import bitsandbytes.functional as bnbf
+        return bnbf.dequantize_4bit(weight.data, weight.quant_state).float()
+    return weight.float()
+
+def read_adapter(path):
+    """PEFT adapter directory -> (config dict, {module name: {"A","B","m"}})."""
+    with open(os.path.join(path, "adapter_config.json")) as f:
+        config = json.load(f)
+    weights_file = os.path.join(path, "adapter_model.safetensors")
+    if os.path.exists(weights_file):
+        from safetensors.torch import load_file
+        state = load_file(weights_file)
+    else:
+        state = torch.load(os.path.join(path, "adapter_model.bin"), map_location="cpu")
+    return config, split_state(state)
+
+def split_state(state):
+    modules = {}
+    for key, tensor in state.items():
+        for suffix, part in zip(_SUFFIXES, ("A", "B", "m", "m")):
+            if key.endswith(suffix):
+                name = key[:-len(suffix)].removeprefix("base_model.model.")
+                modules.setdefault(name, {})[part] = tensor
+                break
+    return modules
+
+# ==================================================
+# 1. THE ROUTED LINEAR (one gathered bmm pair per mixed batch)
+# ==================================================
+class RoutedLinear(nn.Module):
+    def __init__(self, base, registry, slots, rank):
+        super().__init__()
+        self.base = base
+        self.registry = registry
+        out_features, in_features = base.out_features, base.in_features
+        device = next(base.parameters()).device
+        dtype = registry.dtype
+        self.register_buffer("A", torch.zeros(slots, rank, in_features, dtype=dtype, device=device), persistent=False)
+        self.register_buffer("B", torch.zeros(slots, out_features, rank, dtype=dtype, device=device), persistent=False)
+        self.register_buffer("scale", torch.ones(slots, out_features, dtype=dtype, device=device), persistent=False)
+
+    def load_slot(self, slot, A=None, B=None, magnitude=None, scaling=1.0):
+        self.A[slot].zero_()
+        self.B[slot].zero_()
+        self.scale[slot].fill_(1.0)
+        if A is None:
+            return
+        r = A.shape[0]
+        A, B = A.float().to(self.A.device), B.float().to(self.A.device) * scaling
+        self.A[slot, :r] = A.to(self.A.dtype)
+        self.B[slot, :, :r] = B.to(self.B.dtype)
+        if magnitude is not None:
+            # DoRA: PEFT's weight norm (row-wise over W + s*B@A), detached, so it is a constant per adapter
+            norm = torch.linalg.norm(dense_weight(self.base).to(A.device) + B @ A, dim=1)
+            self.scale[slot] = (magnitude.float().to(A.device).view(-1) / norm).to(self.scale.dtype)
+
+    def forward(self, x):
+        out = self.base(x)
+        slots = self.registry.row_slots
+        if slots is None:
+            return out
+        # [batch] slot ids -> per-row low-rank weights, then two batched matmuls
+        h = x.to(self.A.dtype)
+        low = torch.bmm(h, self.A[slots].transpose(1, 2))
+        delta = torch.bmm(low, self.B[slots].transpose(1, 2))
+        scale = self.scale[slots].unsqueeze(1)
+        bias = self.base.bias
+        if bias is None:
+            return (scale * (out.to(delta.dtype) + delta)).to(out.dtype)
+        return (scale * (out.to(delta.dtype) - bias + delta) + bias).to(out.dtype)
+
+# ==================================================
+# 2. THE REGISTRY (lazy load, slot LRU under a byte budget)
+# ==================================================
+class AdapterRegistry:
+    def __init__(self, model, budget_bytes=ADAPTER_BUDGET_BYTES, max_rank=MAX_RANK,
+                 target_modules=TARGET_MODULES, dtype=None):
+        self.model = model
+        self.max_rank = max_rank
+        self.dtype = dtype or model.get_input_embeddings().weight.dtype
+        self.sources = {}                 # name -> path | (config, modules)
+        self.resident = OrderedDict()     # name -> slot, LRU order
+        self.row_slots = None
+        targets = [
+            (name, module) for name, module in model.named_modules()
+            if name.rsplit(".", 1)[-1] in target_modules and hasattr(module, "in_features")
+        ]
+        element = torch.tensor([], dtype=self.dtype).element_size()
+        per_slot = sum((max_rank * (m.in_features + m.out_features) + m.out_features) * element for _, m in targets)
+        # Slot 0 is the empty adapter; the rest is what the budget buys
+        self.capacity = max(1, budget_bytes // max(per_slot, 1))
+        self.slot_bytes = per_slot
+        self.free_slots = list(range(1, self.capacity + 1))
+        self.layers = {}
+        for name, module in targets:
+            parent_name, _, child = name.rpartition(".")
+            routed = RoutedLinear(module, self, self.capacity + 1, max_rank)
+            setattr(model.get_submodule(parent_name), child, routed)
+            self.layers[name] = routed
+
+    def register(self, name, path=None, config=None, state=None):
+        """Make an adapter routable. Nothing is read until a row first asks for it."""
+        if path is None and state is None:
+            raise ValueError(f"adapter {name!r} needs a path or an in-memory state dict")
+        self.sources[name] = path if state is None else (config or {}, split_state(state))
+        if name in self.resident:
+            self._load(name, self.resident[name])
+
+    def _load(self, name, slot):
+        source = self.sources[name]
+        config, modules = read_adapter(source) if isinstance(source, str) else source
+        r = config.get("r", MAX_RANK)
+        if r > self.max_rank:
+            raise ValueError(f"adapter {name!r} has rank {r} > max_rank {self.max_rank}")
+        alpha = config.get("lora_alpha", r)
+        scaling = alpha / (r ** 0.5) if config.get("use_rslora") else alpha / r
+        with torch.no_grad():
+            for layer_name, layer in self.layers.items():
+                parts = modules.get(layer_name)
+                if parts is None:
+                    layer.load_slot(slot)
+                else:
+                    layer.load_slot(slot, parts["A"], parts["B"], parts.get("m"), scaling)
+
+    def ensure(self, names):
+        """Slots for `names` (None -> 0), loading missing adapters and evicting the least recently used."""
+        wanted = [n for n in dict.fromkeys(names) if n is not None]
+        if len(wanted) > self.capacity:
+            raise RuntimeError(f"{len(wanted)} adapters in one batch but the budget holds {self.capacity}")
+        for name in wanted:
+            if name in self.resident:
+                self.resident.move_to_end(name)
+                continue
+            if name not in self.sources:
+                raise KeyError(f"adapter {name!r} is not registered")
+            if not self.free_slots:
+                victim = next(n for n in self.resident if n not in wanted)
+                self.free_slots.append(self.resident.pop(victim))
+            slot = self.free_slots.pop(0)
+            self._load(name, slot)
+            self.resident[name] = slot
+        return {name: self.resident[name] for name in wanted}
+
+    def route(self, adapters):
+        """Row i of the next forward uses adapters[i] (None = bare base model). route(None) switches routing off."""
+        if adapters is None:
+            self.row_slots = None
+            return
+        slots = self.ensure(adapters)
+        device = next(iter(self.layers.values())).A.device if self.layers else "cpu"
+        self.row_slots = torch.tensor([slots.get(a, 0) for a in adapters], dtype=torch.long, device=device)
+
+    def stats(self):
+        return {"resident": list(self.resident), "capacity": self.capacity,
+                "slot_bytes": self.slot_bytes, "registered": list(self.sources)}
+
+# ==================================================
+# 3. GROUPED vs. SPLIT BATCHES (tiny random Qwen3 + random DoRA adapters, CPU)
+# ==================================================
+def random_dora_state(model, rank=MAX_RANK, seed=0, target_modules=TARGET_MODULES):
+    generator = torch.Generator().manual_seed(seed)
+    state = {}
+    for name, module in model.named_modules():
+        if name.rsplit(".", 1)[-1] in target_modules and hasattr(module, "in_features"):
+            prefix = f"base_model.model.{name}"
+            state[f"{prefix}.lora_A.weight"] = torch.randn(rank, module.in_features, generator=generator) * 0.05
+            state[f"{prefix}.lora_B.weight"] = torch.randn(module.out_features, rank, generator=generator) * 0.05
+            state[f"{prefix}.lora_magnitude_vector"] = torch.linalg.norm(module.weight.float(), dim=1) * (
+                1 + 0.1 * torch.randn(module.out_features, generator=generator))
+    return state
+
+if __name__ == "__main__":
+    from akasha_resident import load_worker
+
+    roles = sys.argv[1:] or ["architect", "builder", "scholar", "shield"]
+    model, tokenizer = load_worker(tiny=True)
+    states = {role: random_dora_state(model, seed=i) for i, role in enumerate(roles)}
+    registry = AdapterRegistry(model, budget_bytes=64 * 1024**2, dtype=torch.float32)
+    for role, state in states.items():
+        registry.register(role, config={"r": MAX_RANK, "lora_alpha": 16, "use_dora": True}, state=state)
+    print(f"🔀 {len(roles)} adapters, {registry.capacity} resident slots of {registry.slot_bytes / 1024:.0f} KiB")
+
+    rows, seq = 32, 64
+    ids = torch.randint(0, model.config.vocab_size, (rows, seq))
+    adapters = [roles[i % len(roles)] for i in range(rows)]
+    with torch.no_grad():
+        # Reference: one forward per adapter group (what set_adapter + split batches does)
+        start = time.perf_counter()
+        split = torch.empty(rows, model.config.vocab_size)
+        for role in roles:
+            idx = [i for i, a in enumerate(adapters) if a == role]
+            registry.route([role] * len(idx))
+            split[idx] = model(ids[idx]).logits[:, -1]
+        split_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        registry.route(adapters)
+        grouped = model(ids).logits[:, -1]
+        grouped_time = time.perf_counter() - start
+        registry.route(None)
+
+    print(f"   split per adapter : {split_time * 1000:8.1f} ms")
+    print(f"   one mixed batch   : {grouped_time * 1000:8.1f} ms")
+    print(f"   max |diff|        : {(split - grouped).abs().max().item():.2e}")
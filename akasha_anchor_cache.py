@@ -0,0 +1,169 @@
+import os
+import json
+import hashlib
+import tempfile
+import unicodedata
+
+# ==================================================
+# 🗄️  PROJECT AKASHA: PERSISTENT ANCHOR CACHE
+# Probe a prompt once. Every repeat run is a file read.
+# ==================================================
+#
+# Key  = (normalised prompt, tokenizer hash, model/adapter hash, layer, k)
+# Disk = one small JSON file per key, written atomically (tmp + os.replace)
+# LRU  = file mtime is touched on every hit; oldest files go first when the
+#        entry count or byte cap is exceeded. Count and bytes are running totals
+#        (one scan at startup), so a put only walks the tree when a cap is crossed
+
+CACHE_DIR = os.environ.get("AKASHA_ANCHOR_CACHE", ".akasha_cache/anchors")
+MAX_ENTRIES = 50_000
+MAX_BYTES = 256 * 1024 * 1024
+# Files bigger than this (e.g. the 20GB GGUF) are fingerprinted by size + head + tail
+FULL_HASH_LIMIT = 512 * 1024 * 1024
+SAMPLE_BYTES = 16 * 1024 * 1024
+
+_HASH_MEMO = {}
+
+def normalise_prompt(prompt):
+    return " ".join(unicodedata.normalize("NFC", prompt).split())
+
+def content_hash(path):
+    """sha256 over a file, or over every file of a directory (names included). Memoised on (size, mtime)."""
+    files = [path] if os.path.isfile(path) else sorted(
+        os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+    )
+    stamp = tuple((f, os.path.getsize(f), os.path.getmtime(f)) for f in files)
+    if stamp in _HASH_MEMO:
+        return _HASH_MEMO[stamp]
+
+    digest = hashlib.sha256()
+    for f, size, _ in stamp:
+        digest.update(os.path.relpath(f, path).encode("utf-8") + str(size).encode("utf-8"))
+        with open(f, "rb") as fh:
+            if size <= FULL_HASH_LIMIT:
+                for block in iter(lambda: fh.read(1 << 20), b""):
+                    digest.update(block)
+            else:
+                digest.update(fh.read(SAMPLE_BYTES))
+                fh.seek(size - SAMPLE_BYTES)
+                digest.update(fh.read(SAMPLE_BYTES))
+    _HASH_MEMO[stamp] = digest.hexdigest()
+    return _HASH_MEMO[stamp]
+
+def tokenizer_hash(tokenizer):
+    """Hash of the tokenizer files on disk, falling back to the vocab itself."""
+    path = getattr(tokenizer, "name_or_path", None)
+    if path and os.path.isdir(path):
+        names = ("vocab.json", "merges.txt", "tokenizer.json", "tokenizer_config.json", "added_tokens.json",
+                 "chat_template.jinja")
+        files = [os.path.join(path, n) for n in names if os.path.exists(os.path.join(path, n))]
+        if files:
+            return hashlib.sha256("".join(content_hash(f) for f in files).encode("utf-8")).hexdigest()
+    vocab = json.dumps(sorted(tokenizer.get_vocab().items()))
+    return hashlib.sha256(vocab.encode("utf-8")).hexdigest()
+
+def model_hash(model):
+    """Content hash of the checkpoint/adapter directory, or of config + weights sample for in-memory models."""
+    path = getattr(model, "name_or_path", None) or getattr(model.config, "_name_or_path", "")
+    if path and os.path.exists(path):
+        return content_hash(path)
+    digest = hashlib.sha256(model.config.to_json_string().encode("utf-8"))
+    for param in list(model.parameters())[:4]:
+        digest.update(param.detach().float().flatten()[:4096].cpu().numpy().tobytes())
+    return digest.hexdigest()
+
+class AnchorCache:
+    def __init__(self, root=CACHE_DIR, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self.count, self.bytes = 0, 0
+        for _, size, _ in self._scan():
+            self.count += 1
+            self.bytes += size
+
+    def key(self, prompt, tokenizer_id, model_id, layer, k):
+        raw = json.dumps([normalise_prompt(prompt), tokenizer_id, model_id, layer, k])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+            os.utime(path)  # LRU touch
+            return record
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, record):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = None
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp, path)  # atomic: readers see the old file or the new one, never half
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.count += replaced is None
+        self.bytes += os.path.getsize(path) - (replaced or 0)
+        if self.count > self.max_entries or self.bytes > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        for bucket in os.scandir(self.root):
+            if bucket.is_dir():
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith(".json"):
+                        yield entry
+
+    def _scan(self):
+        """(mtime, size, path) per entry, one stat() each."""
+        for entry in self.entries():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            yield st.st_mtime, st.st_size, entry.path
+
+    def evict(self):
+        # Full walk only here; it also resyncs the running totals (other processes share the dir)
+        stats = sorted(self._scan())
+        total = sum(size for _, size, _ in stats)
+        removed = 0
+        for _, size, path in stats:
+            if len(stats) - removed <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self.count, self.bytes = len(stats) - removed, total
+        return removed
+
+    def lookup(self, prompt, tokenizer_id, model_id, layer, k, compute):
+        """Return the cached record, or run `compute()` (the forward pass), store and return it."""
+        key = self.key(prompt, tokenizer_id, model_id, layer, k)
+        record = self.get(key)
+        if record is None:
+            record = compute()
+            self.put(key, record)
+        return record
+
+if __name__ == "__main__":
+    cache = AnchorCache()
+    print(f"🗄️  ANCHOR CACHE: {cache.root}")
+    print(f"    {cache.count} entries, {cache.bytes / 1024:.1f} KiB")
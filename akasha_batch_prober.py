@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import torch
+
+# ==================================================
+# 📡 PROJECT AKASHA: BATCHED ANCHOR PROBER
+# Thousands of prompts, micro-batched, only the layers we need.
+# ==================================================
+#
+#   python akasha_batch_prober.py titan_dataset_complete.jsonl [--layers norm,-1] [--k 20] [--out anchor_stats] [--tiny]
+#
+# Output is a COLUMNAR directory: one raw little-endian file per column plus
+# schema.json. Read it back with load_columns(out_dir) -> dict of np.memmap.
+#
+# Layer spec: an int is the output of that decoder layer (pre final norm),
+# "norm" is the final normalised state (what hidden_states[-1] used to give).
+# In the `layer` column "norm" is stored as -1000.
+
+ADAPTER_DIR = "titan_dora_adapters"
+MAX_SEQ_LENGTH = 2048
+TOKENS_PER_BATCH = 16384
+NORM_LAYER = -1000
+
+COLUMNS = {
+    "prompt_id": np.int32,   # line number in the JSONL
+    "layer": np.int16,
+    "rank": np.int16,        # 0 = strongest
+    "position": np.int32,    # token position inside the prompt
+    "dim": np.int32,         # hidden dimension (the anchor coordinate)
+    "value": np.float32,
+}
+
+# ==================================================
+# 1. COLUMNAR SINK
+# ==================================================
+class ColumnarWriter:
+    def __init__(self, out_dir, columns=COLUMNS, meta=None):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.columns = columns
+        self.meta = meta or {}
+        self.rows = 0
+        self.files = {name: open(os.path.join(out_dir, f"{name}.bin"), "wb") for name in columns}
+
+    def append(self, **arrays):
+        n = len(next(iter(arrays.values())))
+        for name, dtype in self.columns.items():
+            self.files[name].write(np.ascontiguousarray(arrays[name], dtype=np.dtype(dtype).newbyteorder("<")).tobytes())
+        self.rows += n
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        schema = {
+            "rows": self.rows,
+            "columns": {name: np.dtype(dtype).newbyteorder("<").str for name, dtype in self.columns.items()},
+            **self.meta,
+        }
+        with open(os.path.join(self.out_dir, "schema.json"), "w") as f:
+            json.dump(schema, f, indent=2)
+
+def load_columns(out_dir):
+    with open(os.path.join(out_dir, "schema.json")) as f:
+        schema = json.load(f)
+    return {
+        name: np.memmap(os.path.join(out_dir, f"{name}.bin"), dtype=np.dtype(dtype), mode="r", shape=(schema["rows"],))
+        if schema["rows"] else np.zeros(0, dtype=np.dtype(dtype))
+        for name, dtype in schema["columns"].items()
+    }
+
+# ==================================================
+# 2. PROMPT STREAM + MICRO-BATCHING
+# ==================================================
+def read_prompts(path, field="instruction"):
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            line = line.strip()
+            if line:
+                yield line_no, json.loads(line)[field]
+
+def micro_batches(tokenized, tokens_per_batch=TOKENS_PER_BATCH):
+    """Group (prompt_id, ids) by length so each padded batch stays under the token budget."""
+    tokenized = sorted(tokenized, key=lambda item: len(item[1]))
+    batch, longest = [], 0
+    for item in tokenized:
+        longest_if_added = max(longest, len(item[1]))
+        if batch and longest_if_added * (len(batch) + 1) > tokens_per_batch:
+            yield batch
+            batch, longest_if_added = [], len(item[1])
+        batch.append(item)
+        longest = longest_if_added
+    if batch:
+        yield batch
+
+# ==================================================
+# 3. HOOKED CAPTURE (no output_hidden_states, no lm_head)
+# ==================================================
+class _StopForward(Exception):
+    pass
+
+class LayerCapture:
+    def __init__(self, model, layers):
+        decoder = model.get_decoder()
+        n_layers = len(decoder.layers)
+        self.decoder = decoder
+        self.layers = list(layers)
+        self.states = {}
+        self.handles = []
+        modules = {}
+        for layer in self.layers:
+            if layer == "norm":
+                modules[NORM_LAYER] = decoder.norm
+            else:
+                modules[int(layer) % n_layers] = decoder.layers[int(layer)]
+        self.ids = list(modules)
+        # Nothing past the deepest requested layer needs to run
+        self.stop_at = None if NORM_LAYER in modules else max(modules)
+        for layer_id, module in modules.items():
+            self.handles.append(module.register_forward_hook(self._hook(layer_id)))
+
+    def _hook(self, layer_id):
+        def hook(module, input, output):
+            self.states[layer_id] = output[0] if isinstance(output, tuple) else output
+            if layer_id == self.stop_at:
+                raise _StopForward
+        return hook
+
+    def __call__(self, input_ids, attention_mask):
+        self.states = {}
+        try:
+            self.decoder(input_ids=input_ids, attention_mask=attention_mask, use_cache=False)
+        except _StopForward:
+            pass
+        return self.states
+
+    def remove(self):
+        for handle in self.handles:
+            handle.remove()
+
+def topk_records(state, lengths, k):
+    """Per-prompt top-k over (position, dim), pads excluded. Returns (values, positions, dims), each [batch, k]."""
+    batch, seq_len, hidden = state.shape
+    valid = torch.arange(seq_len, device=state.device).unsqueeze(0) < lengths.unsqueeze(1)
+    scores = state.float().masked_fill(~valid.unsqueeze(-1), -float("inf")).view(batch, -1)
+    values, flat = torch.topk(scores, k=min(k, seq_len * hidden), dim=1)
+    return values, flat // hidden, flat % hidden
+
+def probe_corpus(model, tokenizer, prompts, out_dir, layers=("norm",), k=20,
+                 tokens_per_batch=TOKENS_PER_BATCH, max_length=MAX_SEQ_LENGTH):
+    device = model.get_input_embeddings().weight.device
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    tokenized = [(pid, tokenizer(text, truncation=True, max_length=max_length).input_ids) for pid, text in prompts]
+
+    capture = LayerCapture(model, layers)
+    writer = ColumnarWriter(out_dir, meta={"layers": list(layers), "k": k, "norm_layer_code": NORM_LAYER})
+    start, n_prompts = time.perf_counter(), 0
+    try:
+        with torch.no_grad():
+            for batch in micro_batches(tokenized, tokens_per_batch):
+                ids = [item[1] for item in batch]
+                longest = max(len(x) for x in ids)
+                # Right padding: token positions stay equal to prompt positions
+                input_ids = torch.full((len(ids), longest), pad_id, dtype=torch.long)
+                for row, x in enumerate(ids):
+                    input_ids[row, :len(x)] = torch.tensor(x)
+                lengths = torch.tensor([len(x) for x in ids])
+                attention_mask = (torch.arange(longest).unsqueeze(0) < lengths.unsqueeze(1)).long()
+                states = capture(input_ids.to(device), attention_mask.to(device))
+
+                prompt_ids = np.array([item[0] for item in batch], dtype=np.int32)
+                for layer_id in capture.ids:
+                    values, positions, dims = topk_records(states[layer_id], lengths.to(device), k)
+                    kk = values.shape[1]
+                    writer.append(
+                        prompt_id = np.repeat(prompt_ids, kk),
+                        layer = np.full(len(batch) * kk, layer_id),
+                        rank = np.tile(np.arange(kk), len(batch)),
+                        position = positions.flatten().cpu().numpy(),
+                        dim = dims.flatten().cpu().numpy(),
+                        value = values.flatten().cpu().numpy(),
+                    )
+                n_prompts += len(batch)
+    finally:
+        capture.remove()
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"[✔] Probed {n_prompts} prompts in {elapsed:.2f}s ({n_prompts / max(elapsed, 1e-9):.1f} prompts/s) -> {out_dir}")
+    return writer.rows
+
+if __name__ == "__main__":
+    from akasha_resident import load_worker
+
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    corpus = args[0] if args and not args[0].startswith("--") else "titan_dataset_complete.jsonl"
+    layers = [x if x == "norm" else int(x) for x in option("--layers", "norm").split(",")]
+    k = int(option("--k", 20))
+    out_dir = option("--out", "anchor_stats")
+
+    print("📡 INITIALIZING BATCHED ANCHOR PROBER...")
+    model, tokenizer = load_worker(adapters=(), tiny="--tiny" in args)
+    rows = probe_corpus(model, tokenizer, read_prompts(corpus, option("--field", "instruction")), out_dir, layers, k)
+    cols = load_columns(out_dir)
+    print(f"📍 {rows} anchor records. Most frequent dims: "
+          f"{np.bincount(cols['dim']).argsort()[-10:][::-1].tolist() if rows else []}")
@@ -0,0 +1,436 @@
+import sys
+import time
+import inspect
+import threading
+from collections import deque, defaultdict, OrderedDict
+import torch
+
+# ==================================================
+# 🚂 PROJECT AKASHA: CONTINUOUS BATCHING ENGINE
+# Missions join and leave the decode batch every token.
+# ==================================================
+#
+# Each request owns one SLOT of a preallocated KV cache. New requests are
+# prefilled into a free slot and then ride along in the shared decode step;
+# finished requests hand their slot back immediately, so the batch never
+# waits for its slowest member.
+#
+# Requests may mark a leading PREFIX (role anchor / system turn). Its KV is
+# computed once per adapter, kept in an LRU, and copied into the slot, so
+# prefill only runs over the part of the prompt that actually changes.
+#
+#   python akasha_batcher.py   -> tokens/s vs. concurrency, prefix-cache TTFT, tiny CPU Qwen3
+
+MAX_SEQ_LENGTH = 2048
+NUM_SLOTS = 8
+PREFIX_CACHE_BYTES = 256 * 1024**2
+# Left unset by the caller -> taken from model.generation_config, like model.generate does
+SAMPLING_PARAMS = ("do_sample", "temperature", "top_k", "top_p")
+
+# ==================================================
+# 1. SLOT KV CACHE (duck-types the transformers Cache.update protocol)
+# ==================================================
+class SlotKVCache:
+    def __init__(self, config, num_slots=NUM_SLOTS, max_len=MAX_SEQ_LENGTH, dtype=torch.float16, device="cuda"):
+        n_kv = getattr(config, "num_key_value_heads", None) or config.num_attention_heads
+        head_dim = getattr(config, "head_dim", None) or config.hidden_size // config.num_attention_heads
+        shape = (num_slots, n_kv, max_len, head_dim)
+        self.keys = [torch.zeros(shape, dtype=dtype, device=device) for _ in range(config.num_hidden_layers)]
+        self.values = [torch.zeros(shape, dtype=dtype, device=device) for _ in range(config.num_hidden_layers)]
+        self.lengths = torch.zeros(num_slots, dtype=torch.long, device=device)
+        self.num_slots = num_slots
+        self.max_len = max_len
+        self.device = device
+        self.dtype = dtype
+        self.rows = None
+
+    def bind(self, rows, q_len):
+        """Select which slots the next forward pass reads/writes. Returns (position_ids, 4D mask)."""
+        self.rows = rows
+        self.positions = self.lengths[rows].unsqueeze(1) + torch.arange(q_len, device=self.device)
+        self.kv_len = int(self.positions.max()) + 1
+        key_pos = torch.arange(self.kv_len, device=self.device)
+        visible = key_pos.view(1, 1, -1) <= self.positions.unsqueeze(-1)
+        mask = torch.zeros(visible.shape, dtype=self.dtype, device=self.device)
+        mask.masked_fill_(~visible, torch.finfo(self.dtype).min)
+        return self.positions, mask.unsqueeze(1)
+
+    def advance(self):
+        self.lengths[self.rows] = self.positions[:, -1] + 1
+
+    def release(self, slot):
+        self.lengths[slot] = 0
+
+    def update(self, key_states, value_states, layer_idx, cache_kwargs=None):
+        k, v = self.keys[layer_idx], self.values[layer_idx]
+        rows = self.rows.unsqueeze(1)
+        k[rows, :, self.positions] = key_states.transpose(1, 2).to(k.dtype)
+        v[rows, :, self.positions] = value_states.transpose(1, 2).to(v.dtype)
+        return k[self.rows, :, :self.kv_len], v[self.rows, :, :self.kv_len]
+
+    def get_seq_length(self, layer_idx=0):
+        return int(self.lengths.max())
+
+    def snapshot(self, slot, length):
+        """Copy of the first `length` cached positions of a slot, per layer."""
+        return [(k[slot, :, :length].clone(), v[slot, :, :length].clone()) for k, v in zip(self.keys, self.values)]
+
+    def restore(self, slot, snapshot):
+        """Seed a slot with a snapshot; the next bind() continues right after it."""
+        length = snapshot[0][0].shape[1]
+        for (k, v), (pk, pv) in zip(zip(self.keys, self.values), snapshot):
+            k[slot, :, :length] = pk
+            v[slot, :, :length] = pv
+        self.lengths[slot] = length
+
+# ==================================================
+# 1b. PREFIX CACHE (LRU over shared role/system prefixes, bounded in bytes)
+# ==================================================
+class PrefixCache:
+    def __init__(self, max_bytes=PREFIX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (adapter, prefix ids) -> snapshot
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def size(snapshot):
+        return sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in snapshot)
+
+    def get(self, key):
+        snapshot = self.entries.get(key)
+        if snapshot is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return snapshot
+
+    def put(self, key, snapshot):
+        size = self.size(snapshot)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.size(self.entries.pop(key))
+        self.entries[key] = snapshot
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= self.size(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+# ==================================================
+# 2. REQUESTS (each carries its own decoding params)
+# ==================================================
+class BatchRequest:
+    def __init__(self, input_ids, max_new_tokens=400, temperature=1.0, do_sample=False, top_k=0, top_p=1.0,
+                 repetition_penalty=1.0, no_repeat_ngram_size=0, eos_token_id=None, adapter=None, prefix_len=0):
+        self.input_ids = list(input_ids)
+        # Leading tokens shared with other requests (KV reused); at least one token is always prefilled
+        self.prefix_len = min(prefix_len or 0, len(self.input_ids) - 1)
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature or 1.0
+        self.do_sample = bool(do_sample)
+        self.top_k = top_k or 0              # 0: no top-k cut
+        self.top_p = 1.0 if top_p is None else top_p
+        self.repetition_penalty = repetition_penalty or 1.0
+        self.no_repeat_ngram_size = no_repeat_ngram_size or 0
+        self.eos_token_id = eos_token_id
+        self.adapter = adapter
+        self.output_ids = []
+        self.error = None
+        self.slot = None
+        self.done = threading.Event()
+        # n-gram prefix -> tokens that would complete an already-seen n-gram
+        self.ngrams = defaultdict(set)
+
+    def tail(self, n):
+        if len(self.output_ids) >= n:
+            return self.output_ids[-n:]
+        return (self.input_ids + self.output_ids)[-n:]
+
+    def index_ngrams(self, ids):
+        n = self.no_repeat_ngram_size
+        for i in range(len(ids) - n + 1):
+            self.ngrams[tuple(ids[i:i + n - 1])].add(ids[i + n - 1])
+
+    def banned_tokens(self):
+        """Tokens that would repeat an n-gram already present in prompt + output."""
+        n = self.no_repeat_ngram_size
+        if not n or len(self.input_ids) + len(self.output_ids) < n - 1:
+            return ()
+        return self.ngrams.get(tuple(self.tail(n - 1)) if n > 1 else (), ())
+
+    def finished(self):
+        if len(self.output_ids) >= self.max_new_tokens:
+            return True
+        return self.eos_token_id is not None and bool(self.output_ids) and self.output_ids[-1] == self.eos_token_id
+
+    def result(self, timeout=None):
+        self.done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.output_ids
+
+REQUEST_PARAMS = frozenset(inspect.signature(BatchRequest).parameters) - {"input_ids"}
+
+# ==================================================
+# 3. THE SCHEDULER
+# ==================================================
+class ContinuousBatcher:
+    def __init__(self, model, tokenizer, num_slots=NUM_SLOTS, max_len=MAX_SEQ_LENGTH, lock=None, set_adapter=None,
+                 prefix_bytes=PREFIX_CACHE_BYTES, route=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        embed = model.get_input_embeddings().weight
+        self.device = embed.device
+        self.vocab_size = model.config.vocab_size
+        self.cache = SlotKVCache(model.config, num_slots, max_len, embed.dtype, self.device)
+        self.prefixes = PrefixCache(prefix_bytes)
+        self.lock = lock or threading.Lock()
+        self.set_adapter = set_adapter
+        # route(adapters per row): per-row adapter routing (akasha_adapters); mixed-adapter batches allowed
+        self.route = route
+        self.adapter = None
+        self.waiting = deque()
+        self.active = {}  # slot -> request
+        self.free_slots = list(range(num_slots))
+        self.seen = torch.zeros(num_slots, self.vocab_size, dtype=torch.bool, device=self.device)
+        config = getattr(model, "generation_config", None)
+        self.sampling_defaults = {name: getattr(config, name, None) for name in SAMPLING_PARAMS}
+        self.wakeup = threading.Condition()
+        self.thread = None
+
+    # --- public API ---
+    def submit(self, input_ids, **params):
+        unknown = set(params) - REQUEST_PARAMS
+        if unknown:
+            raise ValueError(f"continuous batcher does not support generation kwargs {sorted(unknown)} "
+                             f"(supported: {sorted(REQUEST_PARAMS)})")
+        for name in SAMPLING_PARAMS:
+            if params.get(name) is None and self.sampling_defaults[name] is not None:
+                params[name] = self.sampling_defaults[name]
+        request = BatchRequest(input_ids, **params)
+        if len(request.input_ids) + request.max_new_tokens > self.cache.max_len:
+            request.error = ValueError(
+                f"prompt ({len(request.input_ids)}) + max_new_tokens ({request.max_new_tokens}) "
+                f"exceeds slot length {self.cache.max_len}"
+            )
+            request.done.set()
+            return request
+        with self.wakeup:
+            self.waiting.append(request)
+            self.wakeup.notify()
+            self.start()
+        return request
+
+    def generate(self, input_ids, **params):
+        return self.submit(input_ids, **params).result()
+
+    def generate_many(self, batch_input_ids, **params):
+        requests = [self.submit(ids, **params) for ids in batch_input_ids]
+        return [r.result() for r in requests]
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._loop, name="akasha-batcher", daemon=True)
+            self.thread.start()
+
+    def _loop(self):
+        while True:
+            with self.wakeup:
+                while not self.waiting and not self.active:
+                    self.wakeup.wait()
+            try:
+                self.step()
+            except Exception as e:
+                # A broken decode step must not leave callers waiting forever
+                for request in list(self.active.values()):
+                    request.error = e
+                    self._retire(request)
+
+    # --- one scheduler tick: admit, then one batched decode token ---
+    def step(self):
+        with self.lock, torch.no_grad():
+            self._admit()
+            if self.active:
+                self._decode()
+
+    def _admit(self):
+        with self.wakeup:
+            if not self.active and self.waiting:
+                self.adapter = self.waiting[0].adapter
+            admitted = []
+            for request in list(self.waiting):
+                if not self.free_slots:
+                    break
+                if self.route is None and request.adapter != self.adapter:
+                    break  # FIFO: drain the batch, then switch adapters
+                self.waiting.remove(request)
+                request.slot = self.free_slots.pop(0)
+                admitted.append(request)
+        # Re-assert every tick: steered/probe calls may have switched adapters in between
+        if self.route is None and self.set_adapter is not None and self.adapter is not None:
+            self.set_adapter(self.adapter)
+        for request in admitted:
+            try:
+                self._prefill(request)
+            except Exception as e:
+                request.error = e
+                self._retire(request)
+
+    def _prefill(self, request):
+        slot = request.slot
+        self.cache.release(slot)
+        self.seen[slot].zero_()
+        self.seen[slot, request.input_ids] = True
+        if request.no_repeat_ngram_size:
+            request.index_ngrams(request.input_ids)
+        self.active[slot] = request
+        rows = torch.tensor([slot], device=self.device)
+        start = 0
+        if request.prefix_len > 0:
+            start = request.prefix_len
+            key = (request.adapter, tuple(request.input_ids[:start]))
+            snapshot = self.prefixes.get(key)
+            if snapshot is None:
+                # First sighting: run the prefix on its own, then keep its KV for the next request
+                prefix = torch.tensor([request.input_ids[:start]], dtype=torch.long, device=self.device)
+                self._forward(prefix, rows, [request])
+                self.prefixes.put(key, self.cache.snapshot(slot, start))
+            else:
+                self.cache.restore(slot, snapshot)
+        ids = torch.tensor([request.input_ids[start:]], dtype=torch.long, device=self.device)
+        logits = self._forward(ids, rows, [request])
+        self._emit(rows, [request], logits)
+
+    def _decode(self):
+        slots = sorted(self.active)
+        requests = [self.active[s] for s in slots]
+        rows = torch.tensor(slots, device=self.device)
+        last = torch.tensor([[r.output_ids[-1]] for r in requests], dtype=torch.long, device=self.device)
+        logits = self._forward(last, rows, requests)
+        self._emit(rows, requests, logits)
+
+    def _forward(self, input_ids, rows, requests):
+        if self.route is not None:
+            self.route([r.adapter for r in requests])
+        position_ids, mask = self.cache.bind(rows, input_ids.shape[1])
+        outputs = self.model(
+            input_ids = input_ids,
+            attention_mask = mask,
+            position_ids = position_ids,
+            cache_position = position_ids[0],
+            past_key_values = self.cache,
+            use_cache = True,
+            logits_to_keep = 1,
+        )
+        self.cache.advance()
+        return outputs.logits[:, -1, :].float()
+
+    def _emit(self, rows, requests, logits):
+        # Repetition penalty (HF semantics), vectorised over the batch
+        penalty = torch.tensor([r.repetition_penalty for r in requests], device=self.device).unsqueeze(1)
+        penalised = torch.where(logits > 0, logits / penalty, logits * penalty)
+        logits = torch.where(self.seen[rows], penalised, logits)
+
+        for i, request in enumerate(requests):
+            banned = request.banned_tokens()
+            if banned:
+                logits[i, list(banned)] = -float("inf")
+
+        greedy = logits.argmax(dim=-1)
+        if any(r.do_sample for r in requests):
+            next_tokens = torch.where(
+                torch.tensor([r.do_sample for r in requests], device=self.device),
+                self._sample(requests, logits), greedy,
+            )
+        else:
+            next_tokens = greedy
+
+        self.seen[rows, next_tokens] = True
+        for request, token in zip(requests, next_tokens.tolist()):
+            request.output_ids.append(token)
+            if request.no_repeat_ngram_size:
+                request.index_ngrams(request.tail(request.no_repeat_ngram_size))
+            if request.finished():
+                self._retire(request)
+
+    def _sample(self, requests, logits):
+        """Temperature, then top-k, then top-p (HF warper order), each row with its own params."""
+        temps = torch.tensor([r.temperature for r in requests], device=self.device).unsqueeze(1)
+        sorted_logits, order = torch.sort(logits / temps, dim=-1, descending=True)
+        ranks = torch.arange(sorted_logits.shape[1], device=self.device)
+        top_k = torch.tensor([r.top_k or sorted_logits.shape[1] for r in requests], device=self.device).unsqueeze(1)
+        sorted_logits = sorted_logits.masked_fill(ranks >= top_k, -float("inf"))
+        # Nucleus over what top-k left: drop a token once the mass before it reaches top_p (the top token stays)
+        probs = torch.softmax(sorted_logits, dim=-1)
+        top_p = torch.tensor([r.top_p for r in requests], device=self.device).unsqueeze(1)
+        sorted_logits = sorted_logits.masked_fill(probs.cumsum(dim=-1) - probs > top_p, -float("inf"))
+        picked = torch.multinomial(torch.softmax(sorted_logits, dim=-1), 1)
+        return order.gather(1, picked).squeeze(1)
+
+    def _retire(self, request):
+        if request.output_ids and request.output_ids[-1] == request.eos_token_id:
+            request.output_ids.pop()
+        self.active.pop(request.slot, None)
+        self.cache.release(request.slot)
+        with self.wakeup:
+            self.free_slots.append(request.slot)
+        request.done.set()
+
+# ==================================================
+# 4. THROUGHPUT BENCHMARK (tokens/s vs. concurrency, CPU)
+# ==================================================
+if __name__ == "__main__":
+    from akasha_resident import load_worker
+
+    new_tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    print("🚂 CONTINUOUS BATCHING BENCHMARK (tiny Qwen3, CPU)")
+    model, tokenizer = load_worker(tiny=True)
+    prompts = [
+        f"### ANCHOR: ROLE {i}\nTASK: Optimize Latent Memory Projectors, variant {i}.\nCODE:"
+        for i in range(32)
+    ]
+    batch_ids = [tokenizer(p).input_ids for p in prompts]
+
+    # Baseline: the old AkashaGodzilla.infer path, one model.generate per prompt
+    start = time.perf_counter()
+    for ids in batch_ids[:8]:
+        model.generate(
+            torch.tensor([ids]), max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+            repetition_penalty=1.2, no_repeat_ngram_size=5, do_sample=False,
+            pad_token_id=tokenizer.pad_token_id,
+        )
+    serial = 8 * new_tokens / (time.perf_counter() - start)
+    print(f"  serial model.generate (bs=1)   : {serial:8.1f} tok/s")
+
+    for concurrency in (1, 2, 4, 8, 16):
+        batcher = ContinuousBatcher(model, tokenizer, num_slots=concurrency, max_len=256)
+        start = time.perf_counter()
+        outputs = batcher.generate_many(
+            batch_ids, max_new_tokens=new_tokens, repetition_penalty=1.2, no_repeat_ngram_size=5, do_sample=False,
+        )
+        elapsed = time.perf_counter() - start
+        total = sum(len(o) for o in outputs)
+        print(f"  continuous batch, {concurrency:2d} slots   : {total / elapsed:8.1f} tok/s")
+
+    # Time-to-first-token with a long shared role anchor, cold vs. prefix-cached
+    role = "### ANCHOR: " + "You are the Titan Builder. Write production-grade, optimized Python code. " * 12 + "\n"
+    prefix_len = len(tokenizer(role).input_ids)
+    tasks = [tokenizer(role + f"TASK: variant {i}\nCODE:").input_ids for i in range(16)]
+    for label, use_prefix in (("no prefix cache", False), ("prefix cache   ", True)):
+        batcher = ContinuousBatcher(model, tokenizer, num_slots=1, max_len=512)
+        batcher.generate(tasks[0], max_new_tokens=1, prefix_len=prefix_len if use_prefix else 0)  # warm-up / fill
+        start = time.perf_counter()
+        for ids in tasks[1:]:
+            batcher.generate(ids, max_new_tokens=1, prefix_len=prefix_len if use_prefix else 0)
+        ttft = (time.perf_counter() - start) / (len(tasks) - 1)
+        print(f"  TTFT, {prefix_len}-token role, {label}: {ttft * 1000:7.2f} ms  {batcher.prefixes.stats()}")
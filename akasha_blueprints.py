@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import struct
+import hashlib
+import tempfile
+import numpy as np
+from akasha_anchor_cache import normalise_prompt
+
+# ==================================================
+# 📦 PROJECT AKASHA: BINARY BLUEPRINT CONTAINER (.akb)
+# Many tasks, one file, memory-mapped. No more regex over commas.
+# ==================================================
+#
+# Layout (little endian):
+#   b"AKBP" | uint32 version | uint64 header_len | JSON header | pad to 64
+#   indices  int32   [total]      all blueprint sets, concatenated
+#   scores   float32 [total]
+#   offsets  int64   [count + 1]  set i = indices[offsets[i]:offsets[i+1]]
+#   task_ids S16     [count]
+# The JSON header carries dimension, source-model fingerprint and the array table.
+#
+#   python akasha_blueprints.py show [file.akb]
+#   python akasha_blueprints.py import 32b_blueprints.txt   -> legacy text into .akb
+
+MAGIC = b"AKBP"
+VERSION = 1
+ALIGN = 64
+BLUEPRINTS_32B = "32b_blueprints.akb"      # written by akasha_32b_autopsy
+BLUEPRINTS_1_7B = "1.7b_blueprints.akb"    # written by akasha_projector
+TASK_ID_BYTES = 16
+
+def task_id(task):
+    """Stable id for a task text (whitespace/unicode-normalised)."""
+    return hashlib.sha1(normalise_prompt(task).encode("utf-8")).hexdigest()[:TASK_ID_BYTES]
+
+# ==================================================
+# 1. WRITER
+# ==================================================
+class BlueprintWriter:
+    def __init__(self, path, dimension, source, **meta):
+        self.path = path
+        self.dimension = int(dimension)
+        self.source = source
+        self.meta = meta
+        self.task_ids, self.indices, self.scores = [], [], []
+
+    def add(self, task_id, indices, scores=None):
+        indices = np.asarray(indices, dtype=np.int32).reshape(-1)
+        scores = np.zeros(len(indices), np.float32) if scores is None else np.asarray(scores, np.float32).reshape(-1)
+        if len(scores) != len(indices):
+            raise ValueError(f"{task_id}: {len(indices)} indices but {len(scores)} scores")
+        self.task_ids.append(task_id)
+        self.indices.append(indices)
+        self.scores.append(scores)
+
+    def close(self):
+        lengths = np.array([len(x) for x in self.indices], dtype=np.int64)
+        arrays = {
+            "indices": np.concatenate(self.indices) if self.indices else np.zeros(0, np.int32),
+            "scores": np.concatenate(self.scores) if self.scores else np.zeros(0, np.float32),
+            "offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            "task_ids": np.array(self.task_ids, dtype=f"S{TASK_ID_BYTES}"),
+        }
+        write_container(self.path, arrays, dimension=self.dimension, source=self.source,
+                        count=len(self.task_ids), **self.meta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+def write_container(path, arrays, **header):
+    table, offset = {}, 0
+    for name, array in arrays.items():
+        table[name] = {"dtype": array.dtype.newbyteorder("<").str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    blob = json.dumps({"version": VERSION, **header, "arrays": table}).encode("utf-8")
+    preamble = MAGIC + struct.pack("<IQ", VERSION, len(blob)) + blob
+    preamble += b"\0" * ((-len(preamble)) % ALIGN)
+
+    # Atomic: write next to the target, then os.replace
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(preamble)
+            for name, array in arrays.items():
+                data = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).tobytes()
+                f.write(data + b"\0" * ((-len(data)) % ALIGN))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+# ==================================================
+# 2. READER (memory-mapped, O(1) lookup by task id)
+# ==================================================
+class BlueprintStore:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, header_len = f.read(4), *struct.unpack("<IQ", f.read(12))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an Akasha blueprint container")
+            if version > VERSION:
+                raise ValueError(f"{path} is blueprint format v{version}; this reader understands v{VERSION}")
+            self.header = json.loads(f.read(header_len))
+        base = -(-(16 + header_len) // ALIGN) * ALIGN
+        self.arrays = {}
+        for name, spec in self.header["arrays"].items():
+            shape = tuple(spec["shape"])
+            if int(np.prod(shape)) == 0:
+                self.arrays[name] = np.zeros(shape, dtype=np.dtype(spec["dtype"]))
+            else:
+                self.arrays[name] = np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r",
+                                              offset=base + spec["offset"], shape=shape)
+        self.indices = self.arrays["indices"]
+        self.scores = self.arrays["scores"]
+        self.offsets = self.arrays["offsets"]
+        self.task_ids = self.arrays["task_ids"]
+        self.dimension = self.header["dimension"]
+        self.source = self.header["source"]
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.task_ids)
+
+    def __contains__(self, tid):
+        return self._position(tid) is not None
+
+    def _position(self, tid):
+        if self._lookup is None:
+            self._lookup = {t.decode("ascii"): i for i, t in enumerate(self.task_ids.tolist())}
+        return self._lookup.get(tid)
+
+    def set(self, i):
+        """(indices, scores) of the i-th blueprint set, as zero-copy views."""
+        start, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.indices[start:stop], self.scores[start:stop]
+
+    def get(self, tid):
+        i = self._position(tid)
+        if i is None:
+            raise KeyError(f"task {tid} not in {self.path}")
+        return self.set(i)
+
+def load_anchors(path=BLUEPRINTS_1_7B, task=None, tid=None, k=None, default=None):
+    """
+    The one loader every script uses instead of pasted lists.
+    Picks the set for `task` (text) / `tid`, or the first set; returns a plain list of ints.
+    Falls back to `default` when the container (or the task) does not exist yet, or holds no sets.
+    """
+    if not os.path.exists(path):
+        if default is None:
+            raise FileNotFoundError(f"{path} not found. Run the autopsy/projector first.")
+        return list(default)
+    store = BlueprintStore(path)
+    if task is not None:
+        tid = task_id(task)
+    if tid is not None and tid not in store and default is not None:
+        return list(default)
+    if len(store) == 0:
+        if default is not None:
+            return list(default)
+        raise ValueError(f"{path} holds no blueprint sets. Re-run the autopsy/projector.")
+    indices, _ = store.get(tid) if tid is not None else store.set(0)
+    return indices[:k].tolist()
+
+def import_text(text_path, out_path=BLUEPRINTS_32B, dimension=5120, source="legacy-text", task="legacy"):
+    """Convert an old comma-separated 32b_blueprints.txt into a one-set container."""
+    import re
+    with open(text_path, "r") as f:
+        indices = [int(i) for i in re.findall(r"\d+", f.read())]
+    with BlueprintWriter(out_path, dimension, source) as writer:
+        writer.add(task_id(task), indices)
+    return out_path
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "import":
+        print(f"📦 Imported -> {import_text(args[1])}")
+    else:
+        path = args[1] if len(args) > 1 else BLUEPRINTS_32B
+        store = BlueprintStore(path)
+        print(f"📦 {path}: v{store.header.get('version', VERSION)} | {len(store)} sets | "
+              f"{len(store.indices)} anchors | dim {store.dimension} | source {store.source[:16]}")
+        for i in range(min(len(store), 5)):
+            indices, scores = store.set(i)
+            print(f"   {store.task_ids[i].decode()}: {indices[:8].tolist()}...")
@@ -0,0 +1,177 @@
+import time
+import asyncio
+
+# ==================================================
+# 🕸️  PROJECT AKASHA: STAGE GRAPH
+# Stages declare their inputs. Whatever is ready runs, batched with everything else.
+# ==================================================
+#
+# Each mission walks the graph on its own: a stage starts the moment the stages
+# it reads from have finished (Architect and Scholar both wait only on Builder).
+# Every stage of every mission in flight submits its prompt to ONE shared
+# BatchedGeneration, whose dispatcher sends whatever has queued up as a single
+# mixed-adapter generate_many call. While one batch decodes, the next one fills.
+#
+# Backpressure, twice:
+#   missions   admission queue of MAX_INFLIGHT: feeding blocks while the graph is full
+#   prompts    QUEUE_SIZE pending prompts: stages block on submit while generation lags
+#
+#   python akasha_loop.py bench [missions] [--tiny]   -> missions/min, serial loop vs. this graph
+
+MAX_INFLIGHT = 8       # missions inside the graph at once
+MAX_BATCH = 16         # prompts per generate_many call
+QUEUE_SIZE = 32        # prompts waiting for the dispatcher before stages block
+BATCH_WAIT = 0.005     # seconds the dispatcher lingers for more prompts to join a batch
+
+class Stage:
+    def __init__(self, name, inputs, template, adapter=None):
+        """
+        inputs   : names of earlier stages (or "goal") this stage reads
+        template : str.format pattern over {anchor} and each input name
+        adapter  : adapter to route the stage's rows to (default: the stage name)
+        """
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.template = template
+        self.adapter = adapter or name
+
+    def prompt(self, values, anchor=""):
+        return self.template.format(anchor=anchor, **{name: values[name] for name in self.inputs})
+
+def topological(stages):
+    """Stages ordered so every input comes first. Raises on cycles / unknown inputs."""
+    order, done, pending = [], {"goal"}, list(stages)
+    while pending:
+        ready = [s for s in pending if set(s.inputs) <= done]
+        if not ready:
+            raise ValueError(f"Unresolvable stage inputs: {[(s.name, s.inputs) for s in pending]}")
+        for stage in ready:
+            order.append(stage)
+            done.add(stage.name)
+            pending.remove(stage)
+    return order
+
+# ==================================================
+# 1. SHARED GENERATION (one dispatcher, one batch in flight)
+# ==================================================
+class BatchedGeneration:
+    def __init__(self, infer_many, max_batch=MAX_BATCH, queue_size=QUEUE_SIZE, wait=BATCH_WAIT):
+        """infer_many(prompts, adapters, prefixes) -> texts, called from a worker thread."""
+        self.infer_many = infer_many
+        self.max_batch = max_batch
+        self.wait = wait
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.batches = []  # size of every dispatched batch
+
+    async def generate(self, prompt, adapter=None, prefix=None):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((prompt, adapter, prefix, future))  # blocks when the queue is full
+        return await future
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def dispatch(self):
+        while True:
+            batch = await self._next_batch()
+            prompts, adapters, prefixes, futures = zip(*batch)
+            try:
+                # The worker call blocks; the event loop keeps admitting prompts for the next batch
+                texts = await asyncio.to_thread(self.infer_many, list(prompts), list(adapters), list(prefixes))
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches.append(len(batch))
+            for future, text in zip(futures, texts):
+                if not future.done():
+                    future.set_result(text)
+
+# ==================================================
+# 2. THE GRAPH
+# ==================================================
+class StageGraph:
+    def __init__(self, stages, infer_many, anchor=None, max_inflight=MAX_INFLIGHT,
+                 max_batch=MAX_BATCH, queue_size=QUEUE_SIZE, wait=BATCH_WAIT):
+        """anchor(stage_name) -> constant prompt head of that stage (also used as its KV prefix)."""
+        self.order = topological(stages)
+        self.infer_many = infer_many
+        self.anchor = anchor or (lambda name: "")
+        self.max_inflight = max_inflight
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.wait = wait
+        self.report = {}
+
+    async def _mission(self, goal, generation):
+        values, tasks = {"goal": goal}, {}
+
+        async def run(stage):
+            await asyncio.gather(*(tasks[name] for name in stage.inputs if name != "goal"))
+            anchor = self.anchor(stage.name)
+            values[stage.name] = await generation.generate(stage.prompt(values, anchor), stage.adapter, anchor or None)
+
+        for stage in self.order:
+            tasks[stage.name] = asyncio.ensure_future(run(stage))
+        await asyncio.gather(*tasks.values())
+        return values
+
+    async def _run(self, goals):
+        generation = BatchedGeneration(self.infer_many, self.max_batch, self.queue_size, self.wait)
+        dispatcher = asyncio.ensure_future(generation.dispatch())
+        missions = asyncio.Queue(maxsize=self.max_inflight)
+        results = [None] * len(goals)
+
+        async def feed():
+            for item in enumerate(goals):
+                await missions.put(item)
+            for _ in range(self.max_inflight):
+                await missions.put(None)
+
+        async def runner():
+            while True:
+                item = await missions.get()
+                if item is None:
+                    return
+                i, goal = item
+                results[i] = await self._mission(goal, generation)
+
+        try:
+            await asyncio.gather(feed(), *(runner() for _ in range(self.max_inflight)))
+        finally:
+            dispatcher.cancel()
+        return results, generation.batches
+
+    def run(self, goals):
+        """Every goal through every stage. Returns one {stage name: output, "goal": goal} dict per goal, in order."""
+        start = time.perf_counter()
+        results, batches = asyncio.run(self._run(list(goals)))
+        seconds = time.perf_counter() - start
+        self.report = {
+            "missions": len(results),
+            "seconds": seconds,
+            "missions_per_min": throughput(len(results), seconds),
+            "batches": len(batches),
+            "mean_batch": sum(batches) / max(len(batches), 1),
+        }
+        return results
+
+def throughput(missions, seconds):
+    return 60.0 * missions / max(seconds, 1e-9)
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ==================================================
+# 🧊 PROJECT AKASHA: GENERATION CACHE
+# Same tokens, same weights, greedy decode -> same text. Decode it once.
+# ==================================================
+#
+# Key  = (prompt token ids, model hash, adapter id, steering hash, decoding params)
+# Disk = one SQLite table (WAL), shared by the resident worker and in-process runs
+# TTL  = rows older than TTL_SECONDS are misses and get deleted
+# LRU  = last_used is bumped on every hit; least recently used rows go first when
+#        the entry count or byte cap is exceeded
+#
+# Only deterministic decodes are cached: do_sample=False (passed, or the model's
+# generation_config default when unset), top_k=1, or sampling at temperature <=
+# NEAR_GREEDY_TEMPERATURE. Anything more stochastic bypasses the cache in both directions.
+#
+#   python akasha_gen_cache.py          -> stats
+#   python akasha_gen_cache.py purge    -> drop expired rows, then evict down to the caps
+
+GEN_CACHE_PATH = os.environ.get("AKASHA_GEN_CACHE", ".akasha_cache/generations.sqlite")
+TTL_SECONDS = float(os.environ.get("AKASHA_GEN_CACHE_TTL", 7 * 24 * 3600))
+MAX_ENTRIES = 100_000
+MAX_BYTES = 256 * 1024 * 1024
+# 0.01 (benchmark / final injector) turns a 0.1 logit gap into e^10 : 1, i.e. argmax.
+# Set AKASHA_GEN_CACHE_MAX_TEMP=0 to cache strictly greedy decodes only.
+NEAR_GREEDY_TEMPERATURE = float(os.environ.get("AKASHA_GEN_CACHE_MAX_TEMP", 0.05))
+
+def steering_hash(vector, layers):
+    """Hash of a SteeringVector (anchors, strengths, hidden size) and the layers it is attached to."""
+    raw = json.dumps([vector.fingerprint(), list(layers)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+def deterministic(params, sampling_default=False):
+    """True when these decoding params always pick the same tokens (`sampling_default` = the model's do_sample)."""
+    if not params.get("do_sample", sampling_default) or params.get("top_k") == 1:
+        return True
+    temperature = params.get("temperature")
+    return temperature is not None and 0 < temperature <= NEAR_GREEDY_TEMPERATURE
+
+class GenerationCache:
+    def __init__(self, path=GEN_CACHE_PATH, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One connection shared by the worker's request threads, serialised by the lock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used)")
+        self.db.commit()
+
+    def key(self, input_ids, model_id, adapter=None, steering=None, params=None, sampling_default=False):
+        """Cache key of one decode, or None when its params are stochastic (no read, no write)."""
+        if not deterministic(params or {}, sampling_default):
+            self.bypassed += 1
+            return None
+        raw = json.dumps([list(input_ids), model_id, adapter, steering, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT text, created FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self.db.execute("DELETE FROM generations WHERE key = ?", (key,))
+                    self.db.commit()
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.db.execute("UPDATE generations SET last_used = ? WHERE key = ?", (now, key))  # LRU touch
+            self.db.commit()
+            return row[0]
+
+    def put(self, key, text):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO generations (key, text, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, text, len(text.encode("utf-8")), now, now),
+            )
+            self.db.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired rows, then least recently used rows until both caps hold. Returns rows removed."""
+        with self.lock:
+            removed = self.db.execute("DELETE FROM generations WHERE created < ?", (time.time() - self.ttl,)).rowcount
+            count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                keys = []
+                for key, size in self.db.execute("SELECT key, size FROM generations ORDER BY last_used"):
+                    if count - len(keys) <= self.max_entries and total <= self.max_bytes:
+                        break
+                    keys.append((key,))
+                    total -= size
+                self.db.executemany("DELETE FROM generations WHERE key = ?", keys)
+                removed += len(keys)
+            self.db.commit()
+            return removed
+
+    def lookup(self, input_ids, model_id, params, compute, adapter=None, steering=None, sampling_default=False):
+        """
+        Cached text for a deterministic decode, or run `compute()` (the generation), store and return it.
+        Stochastic params skip the cache entirely.
+        """
+        key = self.key(input_ids, model_id, adapter, steering, params, sampling_default)
+        if key is None:
+            return compute()
+        text = self.get(key)
+        if text is not None:
+            return text
+        text = compute()
+        self.put(key, text)
+        return text
+
+    def stats(self):
+        with self.lock:
+            count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses, "bypassed": self.bypassed}
+
+    def close(self):
+        self.db.close()
+
+if __name__ == "__main__":
+    cache = GenerationCache()
+    if sys.argv[1:] == ["purge"]:
+        print(f"🧊 Removed {cache.evict()} rows")
+    stats = cache.stats()
+    print(f"🧊 GENERATION CACHE: {cache.path}")
+    print(f"    {stats['entries']} entries, {stats['bytes'] / 1024:.1f} KiB, TTL {cache.ttl / 3600:.0f}h")
@@ -0,0 +1,260 @@
+import sys
+import mmap
+import struct
+import numpy as np
+
+# ==================================================
+# 🦴 PROJECT AKASHA: GGUF SKELETON READER
+# Memory-map the 32B "dead body". Touch only the rows you ask for.
+# ==================================================
+#
+# No llama.cpp, no n_ctx x vocab score buffers: the file is mmapped, the
+# header/tensor table is parsed once, and each tensor (or single row) is
+# dequantised to NumPy only when requested.
+#
+#   python akasha_gguf.py [Qwen3-32B-Q4_K_M.gguf]   -> list tensors
+#   python -m pytest tests/test_gguf.py             -> synthetic GGUF round trip vs. ggml's scalar loops
+
+MODEL_PATH = "Qwen3-32B-Q4_K_M.gguf"
+GGUF_MAGIC = b"GGUF"
+DEFAULT_ALIGNMENT = 32
+QK_K = 256
+
+# --- metadata value types ---
+UINT8, INT8, UINT16, INT16, UINT32, INT32, FLOAT32, BOOL, STRING, ARRAY, UINT64, INT64, FLOAT64 = range(13)
+_SCALAR = {
+    UINT8: "<B", INT8: "<b", UINT16: "<H", INT16: "<h", UINT32: "<I", INT32: "<i",
+    FLOAT32: "<f", BOOL: "<?", UINT64: "<Q", INT64: "<q", FLOAT64: "<d",
+}
+
+# --- ggml tensor types: (block size in elements, bytes per block) ---
+F32, F16, Q8_0, Q4_K, Q6_K, BF16 = 0, 1, 8, 12, 14, 30
+GGML_BLOCKS = {
+    F32: (1, 4),
+    F16: (1, 2),
+    BF16: (1, 2),
+    Q8_0: (32, 2 + 32),
+    Q4_K: (QK_K, 2 + 2 + 12 + QK_K // 2),
+    Q6_K: (QK_K, QK_K // 2 + QK_K // 4 + QK_K // 16 + 2),
+}
+GGML_NAMES = {F32: "F32", F16: "F16", BF16: "BF16", Q8_0: "Q8_0", Q4_K: "Q4_K", Q6_K: "Q6_K"}
+
+# ==================================================
+# 1. DEQUANTISATION (vectorised over blocks)
+# ==================================================
+def dequantize_q8_0(raw):
+    blocks = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 34)
+    d = blocks[:, :2].copy().view(np.float16).astype(np.float32)
+    qs = blocks[:, 2:].copy().view(np.int8).astype(np.float32)
+    return (d * qs).reshape(-1)
+
+def dequantize_q4_k(raw):
+    blocks = np.frombuffer(raw, dtype=np.uint8).reshape(-1, GGML_BLOCKS[Q4_K][1])
+    d = blocks[:, 0:2].copy().view(np.float16).astype(np.float32).reshape(-1, 1, 1)
+    dmin = blocks[:, 2:4].copy().view(np.float16).astype(np.float32).reshape(-1, 1, 1)
+    s = blocks[:, 4:16]
+    qs = blocks[:, 16:]
+
+    # 8 sub-blocks of 32, 6-bit scale + 6-bit min each (get_scale_min_k4)
+    sc = np.empty((len(blocks), 8), dtype=np.uint8)
+    mn = np.empty((len(blocks), 8), dtype=np.uint8)
+    sc[:, :4] = s[:, 0:4] & 63
+    mn[:, :4] = s[:, 4:8] & 63
+    sc[:, 4:] = (s[:, 8:12] & 0xF) | ((s[:, 0:4] >> 6) << 4)
+    mn[:, 4:] = (s[:, 8:12] >> 4) | ((s[:, 4:8] >> 6) << 4)
+
+    q = qs.reshape(-1, 4, 32)
+    q = np.stack((q & 0xF, q >> 4), axis=2).reshape(-1, 8, 32).astype(np.float32)
+    y = d * sc.astype(np.float32)[..., None] * q - dmin * mn.astype(np.float32)[..., None]
+    return y.reshape(-1)
+
+def dequantize_q6_k(raw):
+    blocks = np.frombuffer(raw, dtype=np.uint8).reshape(-1, GGML_BLOCKS[Q6_K][1])
+    ql = blocks[:, 0:128].reshape(-1, 2, 64)
+    qh = blocks[:, 128:192].reshape(-1, 2, 32)
+    sc = blocks[:, 192:208].copy().view(np.int8).astype(np.float32).reshape(-1, 2, 4, 2)
+    d = blocks[:, 208:210].copy().view(np.float16).astype(np.float32).reshape(-1, 1, 1, 1, 1)
+
+    lo, hi = ql[..., :32], ql[..., 32:]
+    q = np.stack((
+        (lo & 0xF) | ((qh & 3) << 4),
+        (hi & 0xF) | (((qh >> 2) & 3) << 4),
+        (lo >> 4) | (((qh >> 4) & 3) << 4),
+        (hi >> 4) | (((qh >> 6) & 3) << 4),
+    ), axis=2).astype(np.int8) - 32                    # [nb, half, group, 32]
+    q = q.reshape(-1, 2, 4, 2, 16).astype(np.float32)  # 16-element runs share a scale
+    return (d * sc[..., None] * q).reshape(-1)
+
+def dequantize(raw, ggml_type):
+    if ggml_type == F32:
+        return np.frombuffer(raw, dtype=np.float32)
+    if ggml_type == F16:
+        return np.frombuffer(raw, dtype=np.float16).astype(np.float32)
+    if ggml_type == BF16:
+        return (np.frombuffer(raw, dtype=np.uint16).astype(np.uint32) << 16).view(np.float32)
+    if ggml_type == Q8_0:
+        return dequantize_q8_0(raw)
+    if ggml_type == Q4_K:
+        return dequantize_q4_k(raw)
+    if ggml_type == Q6_K:
+        return dequantize_q6_k(raw)
+    raise NotImplementedError(f"ggml type {ggml_type} is not supported by the skeleton reader")
+
+# ==================================================
+# 2. READER
+# ==================================================
+class GGUFTensor:
+    def __init__(self, reader, name, shape, ggml_type, offset):
+        self.reader = reader
+        self.name = name
+        self.shape = shape          # ggml order: shape[0] is the row length
+        self.ggml_type = ggml_type
+        self.offset = offset        # absolute byte offset in the file
+        block, block_bytes = GGML_BLOCKS.get(ggml_type, (None, None))
+        self.row_length = shape[0]
+        self.n_rows = int(np.prod(shape[1:], dtype=np.int64)) if len(shape) > 1 else 1
+        self.row_bytes = None if block is None else shape[0] // block * block_bytes
+        self.nbytes = None if block is None else self.row_bytes * self.n_rows
+
+    def __repr__(self):
+        return f"GGUFTensor({self.name}, shape={self.shape}, type={GGML_NAMES.get(self.ggml_type, self.ggml_type)})"
+
+    def raw(self, start_row=0, stop_row=None):
+        if self.row_bytes is None:
+            raise NotImplementedError(f"ggml type {self.ggml_type} is not supported by the skeleton reader")
+        stop_row = self.n_rows if stop_row is None else stop_row
+        begin = self.offset + start_row * self.row_bytes
+        return self.reader.buffer[begin:self.offset + stop_row * self.row_bytes]
+
+    def rows(self, start, stop):
+        """Dequantise rows [start, stop) -> float32 [stop - start, row_length]."""
+        return dequantize(self.raw(start, stop), self.ggml_type).reshape(stop - start, self.row_length)
+
+    def row(self, index):
+        return self.rows(index, index + 1)[0]
+
+    def dequantize(self):
+        """The whole tensor in NumPy order (reversed ggml shape)."""
+        return dequantize(self.raw(), self.ggml_type).reshape(tuple(reversed(self.shape)))
+
+class GGUFReader:
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self._mmap)
+        self.metadata = {}
+        self.tensors = {}
+        self._parse()
+
+    def close(self):
+        try:
+            self.buffer.release()
+            self._mmap.close()
+        except BufferError:
+            pass  # NumPy views into the map are still alive; it is unmapped with them
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- header parsing ---
+    def _read(self, fmt):
+        value = struct.unpack_from(fmt, self.buffer, self._pos)[0]
+        self._pos += struct.calcsize(fmt)
+        return value
+
+    def _read_string(self):
+        length = self._read("<Q")
+        value = bytes(self.buffer[self._pos:self._pos + length]).decode("utf-8", errors="replace")
+        self._pos += length
+        return value
+
+    def _read_value(self, value_type):
+        if value_type == STRING:
+            return self._read_string()
+        if value_type == ARRAY:
+            item_type, count = self._read("<I"), self._read("<Q")
+            if item_type in _SCALAR:
+                dtype = np.dtype(_SCALAR[item_type])
+                values = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=self._pos).copy()
+                self._pos += dtype.itemsize * count
+                return values
+            return [self._read_value(item_type) for _ in range(count)]
+        return self._read(_SCALAR[value_type])
+
+    def _parse(self):
+        if bytes(self.buffer[:4]) != GGUF_MAGIC:
+            raise ValueError(f"{self.path} is not a GGUF file")
+        self._pos = 4
+        self.version = self._read("<I")
+        if self.version < 2:
+            raise ValueError(f"GGUF version {self.version} is not supported")
+        n_tensors, n_kv = self._read("<Q"), self._read("<Q")
+
+        for _ in range(n_kv):
+            key = self._read_string()
+            self.metadata[key] = self._read_value(self._read("<I"))
+
+        infos = []
+        for _ in range(n_tensors):
+            name = self._read_string()
+            n_dims = self._read("<I")
+            shape = tuple(self._read("<Q") for _ in range(n_dims))
+            infos.append((name, shape, self._read("<I"), self._read("<Q")))
+
+        alignment = int(self.metadata.get("general.alignment", DEFAULT_ALIGNMENT))
+        self.data_offset = (self._pos + alignment - 1) // alignment * alignment
+        for name, shape, ggml_type, offset in infos:
+            self.tensors[name] = GGUFTensor(self, name, shape, ggml_type, self.data_offset + offset)
+
+    def tensor(self, name):
+        return self.tensors[name]
+
+# ==================================================
+# 3. SYNTHETIC WRITER (for building small test files)
+# ==================================================
+def _pack_string(s):
+    data = s.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+def _pack_value(value):
+    if isinstance(value, bool):
+        return struct.pack("<I", BOOL) + struct.pack("<?", value)
+    if isinstance(value, int):
+        return struct.pack("<I", UINT32) + struct.pack("<I", value)
+    if isinstance(value, float):
+        return struct.pack("<I", FLOAT32) + struct.pack("<f", value)
+    if isinstance(value, str):
+        return struct.pack("<I", STRING) + _pack_string(value)
+    if isinstance(value, (list, tuple)):
+        if all(isinstance(v, str) for v in value):
+            return struct.pack("<IIQ", ARRAY, STRING, len(value)) + b"".join(_pack_string(v) for v in value)
+        return struct.pack("<IIQ", ARRAY, INT32, len(value)) + struct.pack(f"<{len(value)}i", *value)
+    raise TypeError(f"cannot encode metadata value {value!r}")
+
+def write_gguf(path, metadata, tensors, alignment=DEFAULT_ALIGNMENT):
+    """tensors: {name: (ggml_type, ggml_shape, raw_bytes)}"""
+    header = GGUF_MAGIC + struct.pack("<IQQ", 3, len(tensors), len(metadata))
+    for key, value in metadata.items():
+        header += _pack_string(key) + _pack_value(value)
+    offset, data = 0, b""
+    for name, (ggml_type, shape, raw) in tensors.items():
+        header += _pack_string(name) + struct.pack("<I", len(shape))
+        header += struct.pack(f"<{len(shape)}Q", *shape) + struct.pack("<IQ", ggml_type, offset)
+        pad = (-len(raw)) % alignment
+        data += raw + b"\0" * pad
+        offset += len(raw) + pad
+    header += b"\0" * ((-len(header)) % alignment)
+    with open(path, "wb") as f:
+        f.write(header + data)
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    with GGUFReader(target) as skeleton:
+        print(f"🦴 {target}: GGUF v{skeleton.version}, {len(skeleton.tensors)} tensors, {len(skeleton.metadata)} metadata keys")
+        for tensor in list(skeleton.tensors.values())[:20]:
+            print(f"   {tensor}")
@@ -1,5 +1,8 @@
 import torch
 from unsloth import FastLanguageModel
+from akasha_blueprints import load_anchors
+from akasha_anchor_cache import model_hash
+from akasha_gen_cache import GenerationCache
 
 # ==================================================
 # 🧠 THE LATENT KERNEL (PROTOTYPE)
@@ -7,10 +10,10 @@ from unsloth import FastLanguageModel
 # ==================================================
 
 # 1. THE 40 MASTER ANCHORS (The "High-IQ" Blueprints you harvested)
-# (Paste your filtered list from the Projector here)
-KERNEL_ANCHORS = [
-    14, 82, 194, 256, 412, 1024, 2048, # ... paste your actual numbers
-]
+# Read from the Projector's 1.7b_blueprints.akb (prototype list until it exists)
+KERNEL_ANCHORS = load_anchors(k=40, default=[
+    14, 82, 194, 256, 412, 1024, 2048,
+])
 
 # 2. LOAD THE LOCAL SPECIALIST (The "Student")
 print("⚡ BOOTING LATENT KERNEL...")
@@ -19,6 +22,9 @@ model, tokenizer = FastLanguageModel.from_pretrained(
     max_seq_length = 2048,
     load_in_4bit = True,
 )
+# Same system state + intent -> same decision: near-greedy decodes are replayed from disk
+GEN_CACHE = GenerationCache()
+MODEL_ID = model_hash(model)
 
 def analyze_system_state(current_apps, user_intent):
     """
@@ -42,14 +48,16 @@ def analyze_system_state(current_apps, user_intent):
     # WE STEER THE KERNEL WITH THE 32B BLUEPRINTS
     # This ensures the decision is "Senior Engineer" quality
     # (Simplified steering simulation for this prototype)
-    outputs = model.generate(
-        **inputs,
+    params = dict(
         max_new_tokens=128,
-        temperature=0.1, # Kernel logic must be cold and precise
+        do_sample=False, # Kernel logic must be cold and precise: greedy, so repeat states replay from the cache
     )
-    
-    decision = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    return decision
+
+    def decide():
+        outputs = model.generate(**inputs, **params)
+        return tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+    return GEN_CACHE.lookup(inputs.input_ids[0].tolist(), MODEL_ID, params, decide)
 
 if __name__ == "__main__":
     # Simulation: User is switching from Coding to Gaming
@@ -2,16 +2,20 @@ import torch
 import time
 import random
 from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from akasha_blueprints import load_anchors
+from titan_logsoftmax import selective_log_softmax
 
 # ==================================================
 # ⚡ PROJECT AKASHA: ZERO-TOKEN LATENT MINER (V4)
 # Purpose: Vector-Level Code Optimization (Flexible Mode)
 # ==================================================
 
-# 1. THE 32B IMPLANTS
-MASTER_BLUEPRINTS = [
-    # [PASTE YOUR NUMBERS HERE]
-]
+SEED = 3407
+SEARCH_BATCH = 32  # candidates per forward pass (bounds activation + logits memory)
+SYNC_EVERY = 16    # decode steps between host checks for finished rows
+
+# 1. THE 32B IMPLANTS (projected sets from 1.7b_blueprints.akb, empty until built)
+MASTER_BLUEPRINTS = load_anchors(default=[])
 
 print("⚡ INITIALIZING FLEXIBLE RIG...")
 
@@ -36,22 +40,63 @@ model = AutoModelForCausalLM.from_pretrained(
 
 embedding_layer = model.model.embed_tokens
 
-def sovereign_generate(optimized_latents, max_tokens=512):
+def sample_next(logits, strategy="greedy", temperature=1.0, top_k=50, top_p=0.9, generator=None):
+    """Next token per row from last-position logits [B, V]: greedy, top_k or top_p (nucleus) sampling."""
+    if strategy == "greedy":
+        return torch.argmax(logits, dim=-1)
+    logits = logits.float() / temperature
+    if strategy == "top_k":
+        kth = torch.topk(logits, min(top_k, logits.shape[-1]), dim=-1).values[:, -1:]
+        logits = logits.masked_fill(logits < kth, float("-inf"))
+    elif strategy == "top_p":
+        sorted_logits, order = torch.sort(logits, dim=-1, descending=True)
+        probs = torch.softmax(sorted_logits, dim=-1)
+        # Drop a token once the mass BEFORE it already reaches top_p (the top token always stays)
+        sorted_logits = sorted_logits.masked_fill(probs.cumsum(dim=-1) - probs > top_p, float("-inf"))
+        logits = torch.full_like(logits, float("-inf")).scatter_(1, order, sorted_logits)
+    else:
+        raise ValueError(f"Unknown strategy: {strategy} (use greedy | top_k | top_p)")
+    return torch.multinomial(torch.softmax(logits, dim=-1), 1, generator=generator).squeeze(1)
+
+def _keep_rows(past_key_values, rows):
+    if hasattr(past_key_values, "reorder_cache"):
+        past_key_values.reorder_cache(rows)  # index_select on the batch dim, so it also shrinks
+        return past_key_values
+    return tuple((k.index_select(0, rows), v.index_select(0, rows)) for k, v in past_key_values)
+
+def sovereign_generate(optimized_latents, max_tokens=512, attention_mask=None, strategy="greedy", temperature=1.0,
+                       top_k=50, top_p=0.9, sync_every=SYNC_EVERY, seed=SEED):
     """
     MANUAL TRANSMISSION
     Standard Transformers allows us to pass 'inputs_embeds' 
     without demanding 'input_ids'.
+
+    Batched: latents [B, T, H] (left-padded rows need `attention_mask`) -> B strings.
+    Tokens land in a preallocated [B, max_tokens] tensor; a finished-row mask stops rows
+    at EOS on device. The host only looks every `sync_every` tokens: then it exits if all
+    rows are done and drops finished rows (and their KV cache) from the batch.
     """
     curr_embeds = optimized_latents.to("cuda")
-    generated_ids = []
+    batch, device = curr_embeds.shape[0], curr_embeds.device
+    eos_id = tokenizer.eos_token_id
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else eos_id
+    generator = torch.Generator(device=device).manual_seed(seed) if strategy != "greedy" else None
+
+    generated = torch.full((batch, max_tokens), pad_id, dtype=torch.long, device=device)
+    finished = torch.zeros(batch, dtype=torch.bool, device=device)
+    active = torch.arange(batch, device=device)  # original row of every row still in the batch
+    mask = (attention_mask.to(device) if attention_mask is not None
+            else torch.ones(curr_embeds.shape[:2], dtype=torch.long, device=device))
     past_key_values = None
 
     with torch.no_grad():
         for i in range(max_tokens):
-            # 1. Forward Pass (Pure Vectors)
-            # The standard model accepts inputs_embeds=... and input_ids=None
+            # 1. Forward Pass (Pure Vectors), positions restart after left padding
+            position_ids = (mask.cumsum(-1) - 1).clamp(min=0)[:, -curr_embeds.shape[1]:]
             outputs = model(
                 inputs_embeds=curr_embeds,
+                attention_mask=mask,
+                position_ids=position_ids,
                 past_key_values=past_key_values,
                 use_cache=True
             )
@@ -59,21 +104,89 @@ def sovereign_generate(optimized_latents, max_tokens=512):
             # 2. Update Memory
             past_key_values = outputs.past_key_values
             
-            # 3. Greedy Decode
-            next_token_logits = outputs.logits[:, -1, :]
-            next_token = torch.argmax(next_token_logits, dim=-1).unsqueeze(0)
-            
-            if next_token.item() == tokenizer.eos_token_id:
-                break
-                
-            generated_ids.append(next_token.item())
-            
-            # 4. Prepare next step
-            curr_embeds = embedding_layer(next_token)
+            # 3. Decode on device (rows already at EOS keep emitting pad)
+            next_token = sample_next(outputs.logits[:, -1, :], strategy, temperature, top_k, top_p, generator)
+            next_token = next_token.masked_fill(finished[active], pad_id)
+            generated[active, i] = next_token
+            finished[active] |= next_token == eos_id
+
+            # 4. Host sync every `sync_every` tokens: stop, or shrink the batch to the live rows
+            if (i + 1) % sync_every == 0:
+                live = ~finished[active]
+                if not live.any():
+                    break
+                if not live.all():
+                    rows = live.nonzero().squeeze(1)
+                    active, mask, next_token = active[rows], mask[rows], next_token[rows]
+                    past_key_values = _keep_rows(past_key_values, rows)
+
+            # 5. Prepare next step
+            curr_embeds = embedding_layer(next_token.unsqueeze(1))
+            mask = torch.cat([mask, torch.ones_like(mask[:, :1])], dim=1)
+
+    texts = []
+    for ids in generated.tolist():  # the one full device -> host copy
+        ids = ids[:ids.index(eos_id)] if eos_id in ids else ids
+        texts.append(tokenizer.decode(ids, skip_special_tokens=True))
+    return texts
+
+def likelihood_scorer(logits, input_ids):
+    """Mean log-likelihood of the task's own tokens under each perturbed variant (drift penalty). -> [N]"""
+    targets = input_ids[:, 1:].expand(logits.shape[0], -1)
+    return selective_log_softmax(logits[:, :-1], targets).mean(dim=1)
+
+def confidence_scorer(logits, input_ids):
+    """Fidelity to the task + how decisively the variant commits to its first answer token. -> [N]"""
+    decisiveness = torch.log_softmax(logits[:, -1].float(), dim=-1).max(dim=-1).values
+    return likelihood_scorer(logits, input_ids) + decisiveness
+
+def score_latents(latents, input_ids, scorer=confidence_scorer, batch_size=SEARCH_BATCH):
+    """One batched forward per `batch_size` candidates: [N, T, H] -> scores [N]."""
+    scores = []
+    with torch.no_grad():
+        for start in range(0, latents.shape[0], batch_size):
+            logits = model(inputs_embeds=latents[start:start + batch_size], use_cache=False).logits
+            scores.append(scorer(logits, input_ids).float())
+    return torch.cat(scores)
+
+def latent_search(task_prompt, variants=64, iterations=4, top_k=4, sigma=0.05, scorer=confidence_scorer,
+                  batch_size=SEARCH_BATCH, seed=SEED):
+    """
+    Population search over prompt embeddings. Every iteration perturbs the current elite into
+    `variants` candidates (one tensor op), scores them in batched forwards and keeps the top_k
+    across all iterations so far. Budget = variants * iterations candidates.
+    Returns (latents [top_k, T, H], scores [top_k]), best first.
+    """
+    inputs = tokenizer(task_prompt, return_tensors="pt").to("cuda")
+    input_ids = inputs.input_ids
+    generator = torch.Generator(device=input_ids.device).manual_seed(seed)
+
+    with torch.no_grad():
+        base = embedding_layer(input_ids)
+    elite = base
+    elite_scores = score_latents(base, input_ids, scorer, batch_size)
+
+    for i in range(iterations):
+        # Each elite parent gets an equal share of the children
+        parents = elite.repeat_interleave(-(-variants // elite.shape[0]), dim=0)[:variants]
+        noise = torch.randn(parents.shape, generator=generator, device=parents.device, dtype=torch.float32)
+        children = parents + (noise * sigma).to(parents.dtype)
+        scores = score_latents(children, input_ids, scorer, batch_size)
+
+        pool = torch.cat([elite, children])
+        pool_scores = torch.cat([elite_scores, scores])
+        keep = torch.topk(pool_scores, min(top_k, pool_scores.shape[0])).indices
+        elite, elite_scores = pool[keep], pool_scores[keep]
+        print(f"   swing {i + 1}/{iterations}: {variants} variants, best {elite_scores[0].item():.4f}")
+
+    return elite, elite_scores
 
-    return tokenizer.decode(generated_ids, skip_special_tokens=True)
+def latent_swing(task_prompt, iterations=10, variants=None, top_k=4, scorer=confidence_scorer):
+    """variants=None: the original single random walk. variants=N: batched latent_search, decode the best."""
+    if variants:
+        elite, _ = latent_search(task_prompt, variants=variants, iterations=iterations, top_k=top_k, scorer=scorer)
+        return sovereign_generate(elite[:1])[0]
 
-def latent_swing(task_prompt, iterations=10):
     inputs = tokenizer(task_prompt, return_tensors="pt").to("cuda")
     input_ids = inputs.input_ids
     
@@ -85,16 +198,16 @@ def latent_swing(task_prompt, iterations=10):
         noise = torch.randn_like(current_latents) * 0.05
         current_latents = current_latents + noise
 
-    return sovereign_generate(current_latents)
+    return sovereign_generate(current_latents)[0]
 
 if __name__ == "__main__":
     task = "Write a Python function to find the longest palindrome in a string. Optimize for O(n)."
     
     print(f"\n🌀 MINING LATENT VEINS: {task}")
-    print(f"🔨 Taking Latent Swings (Iterations: 50)...")
+    print(f"🔨 Taking Latent Swings (8 iterations x 64 variants = 512 candidates)...")
     
     start_time = time.time()
-    result_code = latent_swing(task, iterations=50)
+    result_code = latent_swing(task, iterations=8, variants=64)
     end_time = time.time()
     
     print("\n" + "="*50)
@@ -1,7 +1,8 @@
-import torch
-import gc
+import sys
 import json
-from unsloth import FastLanguageModel
+import time
+from akasha_resident import connect
+from akasha_dag import Stage, StageGraph, MAX_INFLIGHT, MAX_BATCH, throughput
 
 # ==================================================
 # ☢️  PROJECT AKASHA: GODZILLA-TIER CORE ENGINE
@@ -11,8 +12,23 @@ from unsloth import FastLanguageModel
 # Pointing to your verified local directory
 ADAPTER_DIR = "titan_dora_adapters"
 
+# The specialist pipeline as a stage graph: Architect and Scholar only read the Builder's code
+PIPELINE = (
+    Stage("builder", ("goal",), "{anchor}TASK: {goal}\nCODE:"),
+    Stage("architect", ("builder",), "{anchor}AUDIT_TARGET: {builder}\nRESULT:"),
+    Stage("scholar", ("builder",), "{anchor}ALIGN_CODE: {builder}\nMAP:"),
+)
+BENCH_GOALS = (
+    "Optimize Latent Memory Projectors for PCIe Gen4 offloading.",
+    "Write a fused 4-bit dequantize + matmul Triton kernel.",
+    "Pin and double-buffer host tensors for non-blocking H2D copies.",
+    "Shard a 5120-dim projection across two CUDA streams.",
+    "Profile and remove the VRAM leak in a KV cache eviction loop.",
+    "Stitch 2048-dim hidden states into a 5120-dim manifold without copies.",
+)
+
 class AkashaGodzilla:
-    def __init__(self):
+    def __init__(self, tiny=False):
         print("\n" + "="*50)
         print("☢️  INITIALIZING GODZILLA-TIER SPECIALIST SQUAD")
         print("="*50)
@@ -26,17 +42,9 @@ class AkashaGodzilla:
             print("[!] CRITICAL ERROR: roles.json not found. Creating emergency map...")
             self.roles = {"builder": "ERROR", "architect": "ERROR", "scholar": "ERROR"}
 
-        # Load the base model (Corrected for 1.7B / 2048-dim alignment)
-        self.model, self.tokenizer = FastLanguageModel.from_pretrained(
-            model_name = ADAPTER_DIR, 
-            load_in_4bit = True,
-        )
-
-        # Pre-Load Specialty Adapters
+        # Attach to the resident worker (or load base ONCE + Architect/Builder/Scholar routed per row)
         print("[+] Welding Logic Anchors: Architect, Builder, Scholar...")
-        self.model.load_adapter(ADAPTER_DIR, adapter_name="architect")
-        self.model.load_adapter(ADAPTER_DIR, adapter_name="builder")
-        self.model.load_adapter(ADAPTER_DIR, adapter_name="scholar")
+        self.worker = connect(model_name=ADAPTER_DIR, adapters=("architect", "builder", "scholar"), multi=True, tiny=tiny)
         print("[✔] System Online. Handshake Success.")
 
     def run_pipeline(self, user_goal):
@@ -44,52 +52,129 @@ class AkashaGodzilla:
         
         # --- PHASE 1: THE BUILDER (Code Synthesis) ---
         print("🛠️  BUILDER: Generating Saturated Logic...")
-        self.model.set_adapter("builder")
-        builder_prompt = f"### ANCHOR: {self.roles['builder']}\nTASK: {user_goal}\nCODE:"
-        raw_code = self.infer(builder_prompt)
+        builder_prompt = f"{self.anchor('builder')}TASK: {user_goal}\nCODE:"
+        raw_code = self.infer(builder_prompt, adapter="builder", prefix=self.anchor("builder"))
         self.flush()
 
         # --- PHASE 2: THE ARCHITECT (Manifold Audit) ---
         print("🔍  ARCHITECT: Performing Hardware-Aware Autopsy...")
-        self.model.set_adapter("architect")
-        architect_prompt = f"### ANCHOR: {self.roles['architect']}\nAUDIT_TARGET: {raw_code}\nRESULT:"
-        audit = self.infer(architect_prompt)
+        architect_prompt = f"{self.anchor('architect')}AUDIT_TARGET: {raw_code}\nRESULT:"
+        audit = self.infer(architect_prompt, adapter="architect", prefix=self.anchor("architect"))
         self.flush()
 
         # --- PHASE 3: THE SCHOLAR (32B Memory Mapping) ---
         print("🧬  SCHOLAR: Stitching Latent Projections to 32B...")
-        self.model.set_adapter("scholar")
-        scholar_prompt = f"### ANCHOR: {self.roles['scholar']}\nALIGN_CODE: {raw_code}\nMAP:"
-        mapping = self.infer(scholar_prompt)
+        scholar_prompt = f"{self.anchor('scholar')}ALIGN_CODE: {raw_code}\nMAP:"
+        mapping = self.infer(scholar_prompt, adapter="scholar", prefix=self.anchor("scholar"))
         self.flush()
 
         return raw_code, audit, mapping
 
-    def infer(self, prompt):
-        inputs = self.tokenizer(prompt, return_tensors="pt").to("cuda")
-        
+    def run_missions(self, user_goals):
+        """Same three phases as run_pipeline, batched: Builder first, then Architect and Scholar in one mixed batch."""
+        print(f"\n[MISSION BATCH START]: {len(user_goals)} missions")
+
+        print("🛠️  BUILDER: Generating Saturated Logic...")
+        raw_codes = self.infer_many(
+            [f"{self.anchor('builder')}TASK: {goal}\nCODE:" for goal in user_goals],
+            adapter="builder",
+            prefix=self.anchor("builder"),
+        )
+        self.flush()
+
+        # Architect and Scholar both only need the Builder's code: one mixed-adapter batch, rows routed per role
+        print("🔍🧬  ARCHITECT + SCHOLAR: Autopsy and 32B Stitching, side by side...")
+        n = len(raw_codes)
+        results = self.infer_many(
+            [f"{self.anchor('architect')}AUDIT_TARGET: {code}\nRESULT:" for code in raw_codes]
+            + [f"{self.anchor('scholar')}ALIGN_CODE: {code}\nMAP:" for code in raw_codes],
+            adapter=["architect"] * n + ["scholar"] * n,
+            prefix=[self.anchor("architect")] * n + [self.anchor("scholar")] * n,
+        )
+        audits, mappings = results[:n], results[n:]
+        self.flush()
+
+        return list(zip(raw_codes, audits, mappings))
+
+    def run_dag(self, user_goals, max_inflight=MAX_INFLIGHT, max_batch=MAX_BATCH):
+        """
+        Missions stream through PIPELINE concurrently: every ready stage of every mission in
+        flight shares the same mixed-adapter batches. Returns (code, audit, mapping) per goal.
+        """
+        print(f"\n[MISSION STREAM START]: {len(user_goals)} missions, {max_inflight} in flight")
+        graph = StageGraph(
+            PIPELINE,
+            lambda prompts, adapters, prefixes: self.infer_many(prompts, adapter=adapters, prefix=prefixes),
+            anchor=self.anchor,
+            max_inflight=max_inflight,
+            max_batch=max_batch,
+        )
+        results = graph.run(user_goals)
+        self.flush()
+        report = graph.report
+        print(f"[✔] {report['missions']} missions in {report['seconds']:.1f}s "
+              f"({report['batches']} batches, {report['mean_batch']:.1f} prompts each)")
+        return [(r["builder"], r["architect"], r["scholar"]) for r in results]
+
+    def anchor(self, role):
+        # Constant head of every prompt for this role: its KV is computed once per adapter and reused
+        return f"### ANCHOR: {self.roles[role]}\n"
+
+    def infer(self, prompt, adapter=None, prefix=None):
+        return self.infer_many([prompt], adapter=adapter, prefix=prefix)[0]
+
+    def infer_many(self, prompts, adapter=None, prefix=None):
         # GODZILLA-TIER GENERATION PARAMS (Prevents Loops)
-        outputs = self.model.generate(
-            **inputs, 
+        # Each prompt joins the worker's continuous batch; only the new thought comes back
+        decoded = self.worker.generate_many(
+            prompts,
+            adapter=adapter,
+            prefix=prefix,
             max_new_tokens=400,
             temperature=0.1,           # Low for precision
             repetition_penalty=1.2,    # Prevents "Infinite Manifold-Safe" loops
             no_repeat_ngram_size=5,    # Breaks repetitive sentence structures
-            eos_token_id=self.tokenizer.eos_token_id,
-            use_cache=True
         )
-        
-        # Clean the output to only show the specialist's new thought
-        decoded = self.tokenizer.decode(outputs[0][inputs.input_ids.shape[1]:], skip_special_tokens=True).strip()
         # Cut off any residual hallucinations
-        return decoded.split("###")[0].strip()
+        return [text.strip().split("###")[0].strip() for text in decoded]
 
     def flush(self):
-        """Hardware-level VRAM evacuation for the RTX 4080."""
-        gc.collect()
-        torch.cuda.empty_cache()
+        """Between-stage VRAM check for the RTX 4080: evacuates only past the worker's MemoryPolicy threshold."""
+        self.worker.flush()
+
+def bench(akasha, missions=12):
+    """missions/min: the serial run_pipeline loop, the batched run_missions, and the stage graph."""
+    goals = [BENCH_GOALS[i % len(BENCH_GOALS)] for i in range(missions)]
+    rows = []
+    # Measure decoding, not cache hits: an in-process worker skips the generation cache, and
+    # every mission of every run of every invocation gets its own tag (a resident worker's
+    # persistent cache can never have seen the prompt)
+    if getattr(akasha.worker, "gen_cache", None) is not None:
+        akasha.worker.gen_cache = None
+    stamp = f"{time.time_ns():x}"
+    for tag, (name, run) in zip("ABC", (
+        ("serial run_pipeline", lambda gs: [akasha.run_pipeline(g) for g in gs]),
+        ("batched run_missions", akasha.run_missions),
+        ("stage graph run_dag", akasha.run_dag),
+    )):
+        start = time.perf_counter()
+        run([f"{goal} (run {stamp}-{tag}{i:04d})" for i, goal in enumerate(goals)])
+        rows.append((name, time.perf_counter() - start))
+
+    print("\n" + "="*50)
+    print(f"⏱️  THROUGHPUT ({missions} missions x {len(PIPELINE)} stages)")
+    print("="*50)
+    for name, seconds in rows:
+        print(f"   {name:<22} {seconds:>8.1f}s  {throughput(missions, seconds):>8.2f} missions/min  "
+              f"({rows[0][1] / seconds:.2f}x)")
 
 if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        count = int(args[1]) if len(args) > 1 and args[1].isdigit() else 12
+        bench(AkashaGodzilla(tiny="--tiny" in args), count)
+        sys.exit(0)
+
     akasha = AkashaGodzilla()
     code, audit, mapping = akasha.run_pipeline("Optimize Latent Memory Projectors for PCIe Gen4 offloading.")
     
@@ -0,0 +1,126 @@
+import gc
+import os
+import sys
+import time
+import torch
+
+# ==================================================
+# 🧹 PROJECT AKASHA: MEMORY POLICY
+# Flush when memory is actually tight, not after every stage.
+# ==================================================
+#
+# Old flush (after every pipeline stage):
+#     gc.collect(); torch.cuda.empty_cache()
+#   -> a full Python GC pass, every cached block handed back to the driver, and
+#      the next stage cudaMalloc's it all again.
+# New flush: read the allocator's high-water mark since the last check. Only past
+# FLUSH_THRESHOLD of device memory do we collect + empty_cache. Everything else
+# stays in PyTorch's caching allocator for the next stage to reuse.
+#
+# Arena: ARENA_BYTES are allocated once and freed straight back into the caching
+# allocator, so the segment stays reserved and generation buffers (logits,
+# activations, the HF generate path of steered runs) are carved out of it without
+# a cudaMalloc. A real flush re-reserves it.
+#
+# CPU: every call is a no-op (still counted).
+#
+#   python akasha_memory.py [missions]   -> stage latency + reserved memory, flush-always vs. policy (CUDA)
+
+FLUSH_THRESHOLD = float(os.environ.get("AKASHA_FLUSH_THRESHOLD", 0.85))  # fraction of device memory
+ARENA_BYTES = int(os.environ.get("AKASHA_ARENA_BYTES", 256 * 1024 * 1024))
+
+class MemoryPolicy:
+    def __init__(self, device=None, threshold=FLUSH_THRESHOLD, arena_bytes=ARENA_BYTES):
+        self.device = torch.device(device) if device is not None else torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.enabled = self.device.type == "cuda" and torch.cuda.is_available()
+        self.threshold = threshold
+        self.arena_bytes = arena_bytes if self.enabled else 0
+        self.total = torch.cuda.get_device_properties(self.device).total_memory if self.enabled else 0
+        self.checks = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.peak_reserved = 0
+        self.reserve_arena()
+
+    def reserve_arena(self):
+        if not self.arena_bytes:
+            return
+        block = torch.empty(self.arena_bytes, dtype=torch.uint8, device=self.device)
+        del block  # freed into the caching allocator: reserved, reusable, never returned until a flush
+
+    def high_water(self):
+        """Peak reserved bytes since the last check (the allocator's own high-water mark)."""
+        return torch.cuda.max_memory_reserved(self.device) if self.enabled else 0
+
+    def flush(self, force=False):
+        """gc + empty_cache only when the high-water mark crossed `threshold` (or `force`). Returns True if it flushed."""
+        self.checks += 1
+        if not self.enabled:
+            return False
+        peak = self.high_water()
+        self.peak_reserved = max(self.peak_reserved, peak)
+        torch.cuda.reset_peak_memory_stats(self.device)
+        if not force and peak <= self.threshold * self.total:
+            return False
+        start = time.perf_counter()
+        gc.collect()
+        torch.cuda.empty_cache()
+        self.reserve_arena()
+        self.flush_seconds += time.perf_counter() - start
+        self.flushes += 1
+        return True
+
+    def stats(self):
+        info = {"device": str(self.device), "checks": self.checks, "flushes": self.flushes,
+                "flush_seconds": round(self.flush_seconds, 4)}
+        if self.enabled:
+            info.update(
+                threshold_bytes = int(self.threshold * self.total),
+                arena_bytes = self.arena_bytes,
+                reserved = torch.cuda.memory_reserved(self.device),
+                allocated = torch.cuda.memory_allocated(self.device),
+                peak_reserved = max(self.peak_reserved, self.high_water()),
+            )
+        return info
+
+# ==================================================
+# MICRO-BENCHMARK: synthetic missions, flush after every stage
+# ==================================================
+def _stage(generator, device, hidden=2048, vocab=151_936):
+    """One stage's transient buffers: a variable-length prefill activation + its logits."""
+    tokens = int(torch.randint(64, 512, (1,), generator=generator))
+    activations = torch.randn(tokens, hidden, device=device, dtype=torch.float16)
+    logits = activations[-1:] @ torch.randn(hidden, vocab // 8, device=device, dtype=torch.float16)
+    return logits.float().softmax(-1).argmax().item()
+
+def benchmark(missions=1000, stages=3, seed=3407):
+    device = torch.device("cuda")
+    print(f"   {'policy':<14} | {'stage ms (mean)':>15} | {'p95':>7} | {'reserved start':>14} | "
+          f"{'reserved end':>12} | {'peak':>9} | flushes")
+    # "flush always" is the old behaviour: gc + empty_cache every stage, no arena
+    for name, force, arena in (("flush always", True, 0), ("threshold", False, ARENA_BYTES)):
+        generator = torch.Generator().manual_seed(seed)
+        torch.cuda.empty_cache()
+        policy = MemoryPolicy(device, arena_bytes=arena)
+        start_reserved = torch.cuda.memory_reserved(device)
+        latencies = []
+        for _ in range(missions):
+            for _ in range(stages):
+                start = time.perf_counter()
+                _stage(generator, device)
+                policy.flush(force=force)
+                latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        stats = policy.stats()
+        mib = 1024 * 1024
+        print(f"   {name:<14} | {sum(latencies) / len(latencies):>12.3f} ms | {latencies[int(0.95 * len(latencies))]:>7.3f} | "
+              f"{start_reserved / mib:>10.0f} MiB | {stats['reserved'] / mib:>8.0f} MiB | "
+              f"{stats['peak_reserved'] / mib:>5.0f} MiB | {stats['flushes']}")
+
+if __name__ == "__main__":
+    if not torch.cuda.is_available():
+        print("🧹 MemoryPolicy is a no-op on CPU; the benchmark needs CUDA.")
+        sys.exit(0)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"🧹 MEMORY POLICY: {count} missions x 3 stages, flush after every stage")
+    benchmark(missions=count)
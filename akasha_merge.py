@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import torch
+from akasha_anchor_cache import content_hash
+from akasha_adapters import read_adapter, random_dora_state, split_state, TARGET_MODULES
+
+# ==================================================
+# 🧱 PROJECT AKASHA: MERGED DoRA EXPORT
+# Fold W = m * (V / ||V||) into the base ONCE. Inference pays nothing after.
+# ==================================================
+#
+# A live DoRA adapter recomputes the weight norm and runs the low-rank branch
+# on every forward. For inference-only use (no adapter swapping) we fold it:
+#     W' = m / ||W + s*B@A||  *  (W + s*B@A)
+# and write a plain checkpoint (safetensors). On a GPU the merged weights are
+# re-quantised to NF4 and saved in bitsandbytes' serialised 4-bit format.
+#
+# One artefact per (adapter content, base model), cached under MERGED_DIR:
+#     <adapter name>-<key>/  model*.safetensors, config, tokenizer, akasha_merge.json
+# akasha_merge.json carries the sha256 of the weight files (the artefact's content hash).
+#
+#   python akasha_merge.py export [titan_dora_adapters] [--force]
+#   python akasha_merge.py bench                      -> live DoRA vs. merged forward, tiny Qwen3, CPU
+
+MERGED_DIR = os.environ.get("AKASHA_MERGED", ".akasha_cache/merged")
+MANIFEST = "akasha_merge.json"
+ADAPTER_DIR = "titan_dora_adapters"
+
+def merge_key(adapter_path, base_name):
+    return hashlib.sha256(f"{content_hash(adapter_path)}:{base_name}".encode("utf-8")).hexdigest()[:16]
+
+def base_model_name(adapter_path):
+    with open(os.path.join(adapter_path, "adapter_config.json")) as f:
+        return json.load(f)["base_model_name_or_path"]
+
+def artefact_dir(adapter_path, root=MERGED_DIR):
+    name = os.path.basename(os.path.normpath(adapter_path))
+    return os.path.join(root, f"{name}-{merge_key(adapter_path, base_model_name(adapter_path))}")
+
+def merged_artefact(adapter_path, root=MERGED_DIR):
+    """Directory of the cached merged checkpoint for this adapter, or None if it was never exported."""
+    if not os.path.exists(os.path.join(adapter_path, "adapter_config.json")):
+        return None
+    path = artefact_dir(adapter_path, root)
+    return path if os.path.exists(os.path.join(path, MANIFEST)) else None
+
+def weights_hash(path):
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".safetensors"):
+            digest.update(name.encode("utf-8"))
+            digest.update(content_hash(os.path.join(path, name)).encode("utf-8"))
+    return digest.hexdigest()
+
+# ==================================================
+# 1. THE FOLD
+# ==================================================
+def fold_adapter(model, config, modules):
+    """Merge LoRA/DoRA tensors ({module: {"A","B","m"}}) into the dense weights of `model`, in place."""
+    r = config.get("r", 16)
+    alpha = config.get("lora_alpha", r)
+    scaling = alpha / (r ** 0.5) if config.get("use_rslora") else alpha / r
+    with torch.no_grad():
+        for name, parts in modules.items():
+            layer = model.get_submodule(name)
+            weight = layer.weight.float() + (parts["B"].float() @ parts["A"].float()).to(layer.weight.device) * scaling
+            if "m" in parts:
+                magnitude = parts["m"].float().view(-1, 1).to(weight.device)
+                weight = weight * (magnitude / torch.linalg.norm(weight, dim=1, keepdim=True))
+            layer.weight.data.copy_(weight.to(layer.weight.dtype))
+    return model
+
+def load_dense_base(base_name):
+    """Base model with plain (de-quantised) Linear layers, ready to be folded into."""
+    from transformers import AutoModelForCausalLM
+    model = AutoModelForCausalLM.from_pretrained(base_name, device_map="auto", torch_dtype=torch.bfloat16)
+    if getattr(model, "is_loaded_in_4bit", False):
+        model = model.dequantize()
+    if hasattr(model.config, "quantization_config"):
+        del model.config.quantization_config
+    return model.eval()
+
+def export_merged(adapter_path=ADAPTER_DIR, root=MERGED_DIR, quantize=None, force=False):
+    """Fold `adapter_path` into its base and cache the result. Returns the artefact directory."""
+    cached = merged_artefact(adapter_path, root)
+    if cached and not force:
+        print(f"[✔] Merged artefact already cached: {cached}")
+        return cached
+    from transformers import AutoTokenizer, BitsAndBytesConfig, AutoModelForCausalLM
+    quantize = torch.cuda.is_available() if quantize is None else quantize
+    base_name = base_model_name(adapter_path)
+    out_dir = artefact_dir(adapter_path, root)
+    os.makedirs(root, exist_ok=True)
+
+    print(f"🧱 Folding {adapter_path} into {base_name}...")
+    config, modules = read_adapter(adapter_path)
+    model = fold_adapter(load_dense_base(base_name), config, modules)
+    tokenizer = AutoTokenizer.from_pretrained(adapter_path)
+
+    # Build next to the target, then swap in atomically
+    work = tempfile.mkdtemp(dir=root, prefix=".merge-")
+    try:
+        staged = os.path.join(work, "merged")
+        model.save_pretrained(staged, safe_serialization=True)
+        tokenizer.save_pretrained(staged)
+        if quantize:
+            print("[+] Re-quantising merged weights to NF4...")
+            del model
+            quantized = AutoModelForCausalLM.from_pretrained(
+                staged, device_map="auto",
+                quantization_config=BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4",
+                                                       bnb_4bit_compute_dtype=torch.bfloat16),
+            )
+            final = os.path.join(work, "final")
+            quantized.save_pretrained(final, safe_serialization=True)
+            tokenizer.save_pretrained(final)
+            staged = final
+        manifest = {
+            "adapter": os.path.abspath(adapter_path),
+            "adapter_hash": content_hash(adapter_path),
+            "base": base_name,
+            "use_dora": bool(config.get("use_dora")),
+            "quantized": "nf4" if quantize else None,
+            "content_hash": weights_hash(staged),
+        }
+        with open(os.path.join(staged, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(staged, out_dir)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    print(f"[✔] Merged artefact: {out_dir} ({manifest['content_hash'][:16]})")
+    return out_dir
+
+# ==================================================
+# 2. CPU BENCHMARK (live DoRA vs. folded weights)
+# ==================================================
+def benchmark(batch=4, seq_len=128, repeats=10):
+    from transformers import Qwen3Config, Qwen3ForCausalLM
+    from peft import LoraConfig, get_peft_model
+
+    torch.manual_seed(3407)
+    config = Qwen3Config(vocab_size=4096, hidden_size=512, intermediate_size=1536, num_hidden_layers=4,
+                         num_attention_heads=8, num_key_value_heads=4, head_dim=64)
+    model = Qwen3ForCausalLM(config).eval()
+    state = random_dora_state(model)
+    lora = LoraConfig(r=16, lora_alpha=16, use_dora=True, target_modules=list(TARGET_MODULES), init_lora_weights=False)
+    live = get_peft_model(model, lora).eval()
+    # Same tensors in PEFT's live adapter and in our fold
+    modules = split_state(state)
+    with torch.no_grad():
+        for name, parts in modules.items():
+            layer = live.base_model.model.get_submodule(name)
+            layer.lora_A["default"].weight.copy_(parts["A"])
+            layer.lora_B["default"].weight.copy_(parts["B"])
+            layer.lora_magnitude_vector["default"].weight.copy_(parts["m"])
+
+    ids = torch.randint(0, config.vocab_size, (batch, seq_len))
+
+    def timed(m):
+        with torch.no_grad():
+            m(ids)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                logits = m(ids).logits
+        return (time.perf_counter() - start) / repeats, logits
+
+    live_time, live_logits = timed(live)
+    merged = fold_adapter(live.unload(), {"r": 16, "lora_alpha": 16}, modules)
+    merged_time, merged_logits = timed(merged)
+    print(f"   live DoRA : {live_time * 1000:8.2f} ms / forward")
+    print(f"   merged    : {merged_time * 1000:8.2f} ms / forward  ({live_time / merged_time:.2f}x)")
+    print(f"   max |diff|: {(live_logits - merged_logits).abs().max().item():.2e}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args[0] if args else "export"
+    if command == "export":
+        paths = [a for a in args[1:] if not a.startswith("--")] or [ADAPTER_DIR]
+        for path in paths:
+            export_merged(path, force="--force" in args)
+    elif command == "bench":
+        print("🧱 DoRA FOLD BENCHMARK (CPU)")
+        benchmark()
+    else:
+        print(f"❌ Unknown command: {command} (use export | bench)")
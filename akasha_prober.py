@@ -1,40 +1,30 @@
-import torch
-from unsloth import FastLanguageModel
+from akasha_resident import connect
 
 # POINTING TO YOUR VERIFIED 1.7B ADAPTERS
 ADAPTER_DIR = "titan_dora_adapters"
 
 print("📡 INITIALIZING ANCHOR PROBER: DIMENSIONAL EXTRACTION...")
 
-model, tokenizer = FastLanguageModel.from_pretrained(
-    model_name = ADAPTER_DIR,
-    load_in_4bit = True,
-)
+worker = connect(model_name=ADAPTER_DIR, adapters=())
 
 def probe_activations(prompt):
     print(f"🔍 Probing Latent Space for: {prompt[:50]}...")
-    inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
     
-    # We use a hook to capture the 'Hidden States' (the actual neurons firing)
-    with torch.no_grad():
-        outputs = model(**inputs, output_hidden_states=True)
-        
     # Layer 28 is the 'Final Thought' layer. We extract its 2048-dim vector.
-    final_layer_state = outputs.hidden_states[-1]
+    # The worker captures the 'Hidden States' (the actual neurons firing)
+    probe = worker.probe(prompt, k=20, layer=-1, last_token=False)
     
     # Calculate 'Density Score' (Mean Absolute Activation)
-    density_score = torch.abs(final_layer_state).mean().item()
-    print(f"📊 Manifold Density Score: {density_score:.4f}")
+    print(f"📊 Manifold Density Score: {probe['density']:.4f}")
     
     # Return the coordinates of the strongest 1% of neurons (The Anchors)
-    top_neurons = torch.topk(final_layer_state.flatten(), k=20).indices
-    return top_neurons
+    return probe["indices"]
 
 if __name__ == "__main__":
     # TASK: The 1-Trillion Parameter Hardware Test
     test_task = "Write a PyTorch kernel for 4-bit dequantization in a single CUDA stream with shared memory offsets."
     
     anchors = probe_activations(test_task)
-    print(f"📍 FOUND ANCHOR POINTS (Top Neuron Indices): {anchors.tolist()}")
+    print(f"📍 FOUND ANCHOR POINTS (Top Neuron Indices): {anchors}")
     
     print("\n[NEXT STEP]: We must freeze these indices into a 'Static Bias Map'.")
@@ -1,40 +1,175 @@
 import os
-import re
+import sys
+import time
+import numpy as np
+from akasha_blueprints import BlueprintStore, BlueprintWriter, BLUEPRINTS_32B, BLUEPRINTS_1_7B
 
 # 2026 Qwen 3 ARCHITECTURE SPECS
 W_32B = 5120
 W_1_7B = 2048
 
-def project_anchors():
-    if not os.path.exists("32b_blueprints.txt"):
-        print("❌ ERROR: 32b_blueprints.txt not found. Run autopsy first.")
+# Mapping strategies (32B address -> 1.7B address, src_dim = the container's dimension):
+#   linear  : round(idx * 2048 / src_dim)               (the original rescale)
+#   block   : floor(idx * 2048 / src_dim), i.e. pool contiguous src_dim/2048-wide blocks
+#   learned : dense [src_dim, 2048] matrix from a .npy file, scores flow through it
+# Indices outside [0, src_dim) are an error, never clipped onto the last target.
+STRATEGIES = ("linear", "block", "learned")
+LEARNED_CHUNK = 1024  # sets per dense matmul chunk for the learned map
+
+def _targets(indices, strategy, src_dim, dst_dim):
+    if strategy == "linear":
+        # int(round(idx * dst_dim / src_dim)) (rint is round-half-even like round()). The last source
+        # addresses round up to dst_dim itself, one past the end: those fold onto the last target
+        return np.minimum(np.rint(indices.astype(np.float64) * dst_dim / src_dim), dst_dim - 1).astype(np.int64)
+    if strategy == "block":
+        return indices.astype(np.int64) * dst_dim // src_dim
+    raise ValueError(f"unknown strategy {strategy!r} (use one of {STRATEGIES})")
+
+def _learned(set_ids, indices, scores, n_sets, weights):
+    """Scatter each set into a dense source vector and push it through the learned map, chunk by chunk."""
+    src_dim, dst_dim = weights.shape
+    out_sets, out_targets, out_scores = [], [], []
+    bounds = np.searchsorted(set_ids, np.arange(0, n_sets + LEARNED_CHUNK, LEARNED_CHUNK))
+    for c, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        first = c * LEARNED_CHUNK
+        rows = min(LEARNED_CHUNK, n_sets - first)
+        if rows <= 0:
+            break
+        dense = np.zeros((rows, src_dim), dtype=np.float32)
+        np.add.at(dense, (set_ids[lo:hi] - first, indices[lo:hi]), scores[lo:hi])
+        projected = dense @ weights
+        r, t = np.nonzero(projected)
+        out_sets.append(r + first)
+        out_targets.append(t)
+        out_scores.append(projected[r, t])
+    if not out_sets:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32)
+    return np.concatenate(out_sets), np.concatenate(out_targets), np.concatenate(out_scores)
+
+def project_batch(indices, offsets, scores=None, strategy="linear", src_dim=W_32B, dst_dim=W_1_7B,
+                  reduce="sum", weights=None, top=None):
+    """
+    Project many blueprint sets at once.
+    indices/scores are the concatenated sets, offsets[i]:offsets[i+1] delimits set i.
+    Colliding targets inside a set are merged and their scores aggregated (`reduce`: sum | max).
+    Each output set is ordered by aggregated score (ties: first appearance), optionally cut to `top`.
+    Returns (indices, scores, offsets) in the same concatenated layout.
+    """
+    indices = np.asarray(indices)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_sets = len(offsets) - 1
+    # Without scores every anchor counts once, so collisions still add up
+    scores = np.ones(len(indices), np.float32) if scores is None else np.asarray(scores, np.float32)
+    set_ids = np.repeat(np.arange(n_sets), np.diff(offsets))
+    if weights is not None:
+        src_dim = np.shape(weights)[0]
+    if len(indices) and (indices.min() < 0 or indices.max() >= src_dim):
+        raise ValueError(f"anchor indices span [{indices.min()}, {indices.max()}], outside the source dimension "
+                         f"{src_dim}: project from the container's own dimension")
+
+    if strategy == "learned":
+        if weights is None:
+            raise ValueError("strategy='learned' needs a [src_dim, dst_dim] weights matrix")
+        weights = np.asarray(weights, np.float32)
+        set_ids, targets, scores = _learned(set_ids, indices, scores, n_sets, weights)
+        first_seen = np.arange(len(targets))
+        dst_dim = weights.shape[1]
+    else:
+        targets = _targets(indices, strategy, src_dim, dst_dim)
+        first_seen = np.arange(len(targets))
+
+    # Group by (set, target): stable sort keeps the earliest occurrence first in each group
+    keys = set_ids.astype(np.int64) * dst_dim + targets
+    order = np.argsort(keys, kind="stable")
+    keys, scores, first_seen = keys[order], scores[order], first_seen[order]
+    starts = np.flatnonzero(np.diff(keys, prepend=-1))
+    if reduce not in ("sum", "max"):
+        raise ValueError(f"unknown reduce {reduce!r} (use sum | max)")
+    if len(starts):
+        merged = (np.add if reduce == "sum" else np.maximum).reduceat(scores, starts)
+    else:
+        merged = scores[:0]
+    unique_keys, first_seen = keys[starts], first_seen[starts]
+    out_sets, out_targets = unique_keys // dst_dim, unique_keys % dst_dim
+
+    # Rank inside each set: score desc, then first appearance
+    rank_order = np.lexsort((first_seen, -merged, out_sets))
+    out_sets, out_targets, merged = out_sets[rank_order], out_targets[rank_order], merged[rank_order]
+    counts = np.bincount(out_sets, minlength=n_sets)
+    if top is not None:
+        set_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rank = np.arange(len(out_sets)) - set_starts[out_sets]
+        keep = rank < top
+        out_sets, out_targets, merged = out_sets[keep], out_targets[keep], merged[keep]
+        counts = np.minimum(counts, top)
+    new_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    return out_targets.astype(np.int32), merged.astype(np.float32), new_offsets
+
+def project(indices, scores=None, **kwargs):
+    """Single-set convenience wrapper around project_batch."""
+    targets, merged, _ = project_batch(indices, [0, len(indices)], scores, **kwargs)
+    return targets, merged
+
+def project_anchors(path=BLUEPRINTS_32B, out_path=BLUEPRINTS_1_7B, strategy="linear", reduce="sum",
+                    weights=None, top=None):
+    if not os.path.exists(path):
+        print(f"❌ ERROR: {path} not found. Run autopsy first.")
         return
 
-    with open("32b_blueprints.txt", "r") as f:
-        raw_data = f.read()
-        
-    # REGEX CLEANING: Find all sequences of digits, ignoring [ ] and other symbols
-    clean_indices = re.findall(r'\d+', raw_data)
-    indices_32b = [int(i) for i in clean_indices]
-
-    print(f"🛰️  Processing {len(indices_32b)} server-tier anchors...")
-
-    # Dimensional Remapping Math: 5120 -> 2048
-    projected = []
-    for idx in indices_32b:
-        # Scale the address from the 32B map to the 1.7B map
-        new_idx = int(round(idx * (W_1_7B / W_32B)))
-        if new_idx not in projected:
-            projected.append(new_idx)
-            
-    return projected[:40]
+    # Memory-mapped container: no text parsing, every task's set at once
+    store = BlueprintStore(path)
+    print(f"🛰️  Processing {len(store.indices)} server-tier anchors across {len(store)} tasks ({strategy})...")
+
+    # Dimensional Remapping Math: container dimension (hidden 5120, or the vocab for logit
+    # blueprints) -> 2048, all sets in one vectorised pass
+    if weights is not None and np.shape(weights)[0] != store.dimension:
+        raise ValueError(f"learned map has {np.shape(weights)[0]} source rows, {path} has dimension {store.dimension}")
+    indices, scores, offsets = project_batch(
+        store.indices, store.offsets, store.scores, strategy=strategy, src_dim=store.dimension, dst_dim=W_1_7B,
+        reduce=reduce, weights=weights, top=top,
+    )
+    dst_dim = W_1_7B if weights is None else np.shape(weights)[1]
+    plans = {}
+    with BlueprintWriter(out_path, dst_dim, store.source, projected_from=store.dimension, strategy=strategy, reduce=reduce) as writer:
+        for i in range(len(store)):
+            tid = store.task_ids[i].decode("ascii")
+            lo, hi = offsets[i], offsets[i + 1]
+            writer.add(tid, indices[lo:hi], scores[lo:hi])
+            plans[tid] = indices[lo:hi].tolist()
+
+    return plans
+
+def benchmark(n_anchors=2_000_000, n_sets=20_000):
+    rng = np.random.default_rng(3407)
+    indices = rng.integers(0, W_32B, n_anchors).astype(np.int32)
+    scores = rng.standard_normal(n_anchors).astype(np.float32)
+    offsets = np.linspace(0, n_anchors, n_sets + 1).astype(np.int64)
+    for strategy in ("linear", "block"):
+        start = time.perf_counter()
+        out, _, out_offsets = project_batch(indices, offsets, scores, strategy=strategy)
+        elapsed = time.perf_counter() - start
+        print(f"   {strategy:7s}: {n_anchors:,} anchors / {n_sets:,} sets -> {len(out):,} targets in {elapsed * 1000:.0f} ms")
 
 if __name__ == "__main__":
-    local_blueprints = project_anchors()
+    # python akasha_projector.py [--strategy linear|block|learned] [--map W.npy] [--reduce sum|max] [--top 40] [--bench]
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    if "--bench" in args:
+        print("🛰️  PROJECTOR BENCHMARK")
+        benchmark()
+        sys.exit(0)
+
+    weights = np.load(option("--map", None)) if "--map" in args else None
+    top = int(option("--top", 0)) or None
+    local_blueprints = project_anchors(strategy=option("--strategy", "learned" if weights is not None else "linear"),
+                                       reduce=option("--reduce", "sum"), weights=weights, top=top)
     if local_blueprints:
         print("\n" + "="*50)
         print("🏗️  PROJECTED 1.7B CONSTRUCTION PLAN (THE 95%):")
         print("="*50)
-        print(local_blueprints)
+        for tid, plan in list(local_blueprints.items())[:5]:
+            print(f"{tid}: {plan[:40]}")
         print("="*50)
-        print("\n[SUCCESS]: Copy these 40 local coordinates into your master loop.")
+        print(f"\n[SUCCESS]: {len(local_blueprints)} local plans saved to {BLUEPRINTS_1_7B} (load_anchors() reads them).")
@@ -0,0 +1,412 @@
+import os
+import sys
+import json
+import socket
+import threading
+import socketserver
+import torch
+from akasha_batcher import ContinuousBatcher, NUM_SLOTS
+from akasha_steering import SteeringVector
+from akasha_anchor_cache import AnchorCache, content_hash, model_hash, tokenizer_hash
+from akasha_gen_cache import GenerationCache, steering_hash
+from akasha_memory import MemoryPolicy
+
+# ==================================================
+# 🏛️  PROJECT AKASHA: RESIDENT WORKER
+# Load the 1.7B specialist ONCE, serve every script.
+# ==================================================
+#
+#   python akasha_resident.py serve           -> real titan_dora_adapters on GPU
+#   python akasha_resident.py serve --tiny    -> random tiny Qwen3 on CPU (smoke test)
+#   python akasha_resident.py serve --multi   -> per-row adapter routing (mixed-role batches)
+#   python akasha_resident.py ping            -> check the worker is alive
+#
+# Scripts call `connect()`. If the worker socket is up they get a thin client,
+# otherwise they fall back to loading the model in-process (old behaviour).
+
+ADAPTER_DIR = "titan_dora_adapters"
+MAX_SEQ_LENGTH = 2048
+SOCKET_PATH = os.environ.get("AKASHA_SOCKET", "/tmp/akasha_worker.sock")
+ROLE_ADAPTERS = ("architect", "builder", "scholar")
+# Each role can point at its own adapter directory (AKASHA_ADAPTER_BUILDER=..., etc.)
+ADAPTER_PATHS = {name: os.environ.get(f"AKASHA_ADAPTER_{name.upper()}", ADAPTER_DIR) for name in ROLE_ADAPTERS}
+
+# Tiny randomly initialised Qwen3 (CPU testable, same tokenizer as the Titan adapters)
+TINY_CONFIG = dict(
+    hidden_size = 64,
+    intermediate_size = 128,
+    num_hidden_layers = 2,
+    num_attention_heads = 4,
+    num_key_value_heads = 2,
+    head_dim = 16,
+    max_position_embeddings = MAX_SEQ_LENGTH,
+)
+
+# ==================================================
+# 1. LOADING (the expensive part we only want to pay once)
+# ==================================================
+def load_worker(model_name=ADAPTER_DIR, adapters=ROLE_ADAPTERS, tiny=False, multi=False):
+    """
+    Returns (model, tokenizer). `tiny=True` builds a random Qwen3 on CPU.
+    `multi=True` loads the bare base once and routes adapters per row (model.adapter_registry).
+    """
+    if multi:
+        return load_multi_worker(model_name, adapters, tiny)
+    if tiny:
+        from transformers import AutoTokenizer, Qwen3Config, Qwen3ForCausalLM
+        tokenizer = AutoTokenizer.from_pretrained(ADAPTER_DIR)
+        torch.manual_seed(3407)
+        config = Qwen3Config(
+            vocab_size = len(tokenizer),
+            eos_token_id = tokenizer.eos_token_id,
+            pad_token_id = tokenizer.pad_token_id,
+            **TINY_CONFIG,
+        )
+        model = Qwen3ForCausalLM(config).eval()
+        return model, tokenizer
+
+    from unsloth import FastLanguageModel
+    from akasha_merge import merged_artefact
+    # No adapter swapping needed -> the pre-folded DoRA checkpoint (akasha_merge.py export), if cached
+    merged = None if adapters else merged_artefact(model_name)
+    model, tokenizer = FastLanguageModel.from_pretrained(
+        model_name = merged or model_name,
+        max_seq_length = MAX_SEQ_LENGTH,
+        load_in_4bit = True,
+    )
+    if merged:
+        print(f"[✔] Using merged DoRA artefact: {merged}")
+        model.akasha_source = merged
+    for name in adapters:
+        model.load_adapter(model_name, adapter_name=name)
+    FastLanguageModel.for_inference(model)
+    return model, tokenizer
+
+def load_multi_worker(model_name=ADAPTER_DIR, adapters=ROLE_ADAPTERS, tiny=False):
+    from akasha_adapters import AdapterRegistry, random_dora_state
+    if tiny:
+        model, tokenizer = load_worker(tiny=True)
+        states = {name: random_dora_state(model, seed=i) for i, name in enumerate(adapters)}
+        registry = AdapterRegistry(model)
+        for name, state in states.items():
+            registry.register(name, config={"r": 16, "lora_alpha": 16, "use_dora": True}, state=state)
+    else:
+        # Plain transformers + bitsandbytes: the routed Linear wrappers replace
+        # what Unsloth's fused inference kernels would otherwise bypass
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        with open(os.path.join(model_name, "adapter_config.json")) as f:
+            base_name = json.load(f)["base_model_name_or_path"]
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForCausalLM.from_pretrained(base_name, device_map="auto", torch_dtype=torch.bfloat16).eval()
+        registry = AdapterRegistry(model)
+        for name in adapters:
+            registry.register(name, ADAPTER_PATHS.get(name, model_name))
+    model.adapter_registry = registry
+    return model, tokenizer
+
+# ==================================================
+# 2. THE WORKER (in-process implementation of generate/probe/steer)
+# ==================================================
+class ResidentWorker:
+    def __init__(self, model, tokenizer, batch_slots=NUM_SLOTS, source=None, anchor_cache=True, gen_cache=True):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = next(model.parameters()).device
+        source = getattr(model, "akasha_source", source)
+        # Content hashes of what is actually loaded: anchors are only reused for identical weights
+        self.model_id = content_hash(source) if source and os.path.exists(source) else model_hash(model)
+        self.tokenizer_id = tokenizer_hash(tokenizer)
+        self.anchor_cache = AnchorCache() if anchor_cache else None
+        # Deterministic decodes (greedy / near-greedy) are served from disk on repeat
+        self.gen_cache = GenerationCache() if gen_cache else None
+        # Between-stage flushes only reach gc / empty_cache past the allocator threshold
+        self.memory = MemoryPolicy(self.device)
+        # Hooks and set_adapter are global model state: steered runs hold this
+        # lock for their whole decode, the batcher takes it once per token
+        self.lock = threading.Lock()
+        # Multi-adapter mode: rows pick their adapter, no set_adapter / batch splitting
+        self.adapters = getattr(model, "adapter_registry", None)
+        self.batcher = None
+        if batch_slots:
+            self.batcher = ContinuousBatcher(
+                model, tokenizer, num_slots=batch_slots, max_len=MAX_SEQ_LENGTH,
+                lock=self.lock, set_adapter=self._set_adapter,
+                route=self.adapters.route if self.adapters is not None else None,
+            )
+
+    def _encode(self, prompt=None, messages=None):
+        if messages is not None:
+            input_ids = self.tokenizer.apply_chat_template(
+                messages, tokenize=True, add_generation_prompt=True, return_tensors="pt",
+            )
+            return {"input_ids": input_ids.to(self.device)}
+        return self.tokenizer(prompt, return_tensors="pt").to(self.device)
+
+    def _set_adapter(self, adapter):
+        if self.adapters is not None:
+            self.adapters.route([adapter])
+        elif adapter is not None and hasattr(self.model, "set_adapter"):
+            self.model.set_adapter(adapter)
+
+    def _adapter_id(self, adapter):
+        """Adapter name + content hash of its weights, when it was registered from a directory."""
+        source = self.adapters.sources.get(adapter) if self.adapters is not None else None
+        if isinstance(source, str) and os.path.exists(source):
+            return f"{adapter}:{content_hash(source)}"
+        return adapter  # single-adapter mode: the adapter dir is already in model_id
+
+    def _cache_key(self, input_ids, adapter, params, steering=None):
+        if self.gen_cache is None:
+            return None
+        # Unset do_sample falls back to generation_config.do_sample (True for Qwen3) in the batcher
+        # and in model.generate alike, so a bare temperature=0.8 is a sampled decode
+        sampling_default = bool(getattr(getattr(self.model, "generation_config", None), "do_sample", False))
+        return self.gen_cache.key(input_ids, self.model_id, self._adapter_id(adapter), steering, params, sampling_default)
+
+    def _prefix_len(self, input_ids, prompt=None, messages=None, prefix=None):
+        """
+        Number of leading tokens the batcher may serve from its prefix KV cache.
+        prefix=str  -> that text starts `prompt` (e.g. the "### ANCHOR: ..." role line)
+        prefix=True -> the leading system turn of `messages`
+        0 when the prefix does not tokenise to an exact head of the full prompt.
+        """
+        if not prefix:
+            return 0
+        if messages is not None:
+            if prefix is not True or messages[0]["role"] != "system":
+                return 0
+            prefix_ids = self.tokenizer.apply_chat_template(messages[:1], tokenize=True, add_generation_prompt=False)
+        else:
+            prefix_ids = self.tokenizer(prefix).input_ids
+        n = len(prefix_ids)
+        return n if input_ids[:n] == list(prefix_ids) else 0
+
+    def generate(self, prompt=None, messages=None, adapter=None, anchors=None,
+                 strength=5.0, layer=-1, max_new_tokens=400, prefix=None, **gen_kwargs):
+        """Plain (or steered, when `anchors` is given) generation. Returns new text only."""
+        if not anchors and self.batcher is not None:
+            items = [prompt] if messages is None else None
+            chats = [messages] if messages is not None else None
+            return self.generate_many(items, chats, adapter=adapter, max_new_tokens=max_new_tokens,
+                                      prefix=prefix, **gen_kwargs)[0]
+        inputs = self._encode(prompt, messages)
+        vector, layers, steering = None, (), None
+        if anchors:
+            # Dense bias built once; the hook is a single add per decode step
+            vector = SteeringVector(anchors, strength, self.model.config.hidden_size)
+            layers = layer if isinstance(layer, (list, tuple)) else (layer,)
+            steering = steering_hash(vector, layers)
+
+        key = self._cache_key(inputs["input_ids"][0].tolist(), adapter, dict(gen_kwargs, max_new_tokens=max_new_tokens),
+                              steering)
+        cached = self.gen_cache.get(key) if key else None
+        if cached is not None:
+            return cached
+
+        with self.lock, torch.no_grad():
+            self._set_adapter(adapter)
+            handles = vector.attach(self.model, layers) if vector is not None else []
+            try:
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens = max_new_tokens,
+                    eos_token_id = self.tokenizer.eos_token_id,
+                    pad_token_id = self.tokenizer.pad_token_id,
+                    use_cache = True,
+                    **gen_kwargs,
+                )
+            finally:
+                for handle in handles: handle.remove()
+            prompt_len = inputs["input_ids"].shape[1]
+            text = self.tokenizer.decode(outputs[0][prompt_len:], skip_special_tokens=True)
+        if key:
+            self.gen_cache.put(key, text)
+        return text
+
+    def generate_many(self, prompts=None, messages=None, adapter=None, max_new_tokens=400, prefix=None, **gen_kwargs):
+        """
+        Submit every prompt (or chat) to the continuous batcher at once; results keep input order.
+        `prefix` marks a shared head (role text, or True for the system turn) whose KV is reused.
+        `adapter` / `prefix` may also be lists, one entry per prompt (mixed-role batches).
+        """
+        items = [(p, None) for p in prompts] if prompts is not None else [(None, m) for m in messages]
+        adapters = adapter if isinstance(adapter, (list, tuple)) else [adapter] * len(items)
+        prefixes = prefix if isinstance(prefix, (list, tuple)) else [prefix] * len(items)
+        if self.batcher is None:
+            return [self.generate(p, m, adapter=a, max_new_tokens=max_new_tokens, **gen_kwargs)
+                    for (p, m), a in zip(items, adapters)]
+        # Cache hits are answered right away; only the misses join the batch
+        results, requests = [None] * len(items), []
+        params = dict(gen_kwargs, max_new_tokens=max_new_tokens)
+        for i, ((p, m), a, pre) in enumerate(zip(items, adapters, prefixes)):
+            input_ids = self._encode(p, m)["input_ids"][0].tolist()
+            key = self._cache_key(input_ids, a, params)
+            results[i] = self.gen_cache.get(key) if key else None
+            if results[i] is not None:
+                continue
+            requests.append((i, key, self.batcher.submit(
+                input_ids,
+                adapter = a,
+                max_new_tokens = max_new_tokens,
+                eos_token_id = self.tokenizer.eos_token_id,
+                prefix_len = self._prefix_len(input_ids, p, m, pre),
+                **gen_kwargs,
+            )))
+        for i, key, request in requests:
+            results[i] = self.tokenizer.decode(request.result(), skip_special_tokens=True)
+            if key:
+                self.gen_cache.put(key, results[i])
+        return results
+
+    def steer(self, prompt, anchors, strength=5.0, layer=-1, **gen_kwargs):
+        return self.generate(prompt, anchors=anchors, strength=strength, layer=layer, **gen_kwargs)
+
+    def probe(self, prompt, k=20, layer=-1, last_token=True, adapter=None):
+        """
+        Top-k neuron coordinates of `layer`.
+        last_token=True  -> indices into the hidden dim of the final position
+        last_token=False -> indices into the flattened (seq, hidden) block
+        Repeat prompts are served from the on-disk anchor cache without a forward pass.
+        """
+        def forward():
+            with self.lock, torch.no_grad():
+                self._set_adapter(adapter)
+                inputs = self._encode(prompt)
+                outputs = self.model(**inputs, output_hidden_states=True)
+                state = outputs.hidden_states[layer]
+                density = torch.abs(state).mean().item()
+                flat = state[:, -1, :].flatten() if last_token else state.flatten()
+                top_values, top_indices = torch.topk(flat, k=k)
+                return {
+                    "indices": top_indices.tolist(),
+                    "values": top_values.float().tolist(),
+                    "density": density,
+                }
+
+        if self.anchor_cache is None:
+            return forward()
+        model_id = f"{self.model_id}:{adapter}"
+        cache_layer = f"{layer}:{'last' if last_token else 'all'}"
+        return self.anchor_cache.lookup(prompt, self.tokenizer_id, model_id, cache_layer, k, forward)
+
+    def flush(self, force=False):
+        return self.memory.flush(force=force)
+
+    def ping(self):
+        info = {"pid": os.getpid(), "device": str(self.device)}
+        if self.batcher is not None:
+            info["prefix_cache"] = self.batcher.prefixes.stats()
+        if self.adapters is not None:
+            info["adapters"] = self.adapters.stats()
+        if self.gen_cache is not None:
+            info["gen_cache"] = self.gen_cache.stats()
+        info["memory"] = self.memory.stats()
+        return info
+
+# ==================================================
+# 3. THE WIRE (newline-delimited JSON over a Unix socket)
+# ==================================================
+OPS = ("generate", "generate_many", "steer", "probe", "flush", "ping")
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request["op"]
+                if op not in OPS:
+                    raise ValueError(f"unknown op: {op}")
+                result = getattr(self.server.worker, op)(**request.get("kwargs", {}))
+                reply = {"ok": True, "result": result}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(worker, path=SOCKET_PATH):
+    if os.path.exists(path):
+        os.unlink(path)
+    server = _Server(path, _Handler)
+    server.worker = worker
+    print(f"[✔] Resident worker listening on {path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+class ResidentClient:
+    """Same API as ResidentWorker, executed by the long-lived worker process."""
+
+    def __init__(self, path=SOCKET_PATH, timeout=None):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.stream = self.sock.makefile("rwb")
+
+    def _call(self, op, **kwargs):
+        self.stream.write((json.dumps({"op": op, "kwargs": kwargs}) + "\n").encode("utf-8"))
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError(f"Resident worker at {self.path} hung up")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise RuntimeError(f"Resident worker error: {reply['error']}")
+        return reply["result"]
+
+    def generate(self, prompt=None, messages=None, **kwargs):
+        return self._call("generate", prompt=prompt, messages=messages, **kwargs)
+
+    def generate_many(self, prompts=None, messages=None, **kwargs):
+        return self._call("generate_many", prompts=prompts, messages=messages, **kwargs)
+
+    def steer(self, prompt, anchors, **kwargs):
+        return self._call("steer", prompt=prompt, anchors=list(anchors), **kwargs)
+
+    def probe(self, prompt, **kwargs):
+        return self._call("probe", prompt=prompt, **kwargs)
+
+    def flush(self, force=False):
+        return self._call("flush", force=force)
+
+    def ping(self):
+        return self._call("ping")
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+def connect(path=SOCKET_PATH, fallback=True, **load_kwargs):
+    """Thin client to the resident worker, or an in-process worker if none is running."""
+    try:
+        client = ResidentClient(path)
+        info = client.ping()
+        print(f"[✔] Attached to resident worker (pid {info['pid']}, {info['device']}).")
+        return client
+    except (FileNotFoundError, ConnectionRefusedError, ConnectionError):
+        if not fallback:
+            raise
+    print("[!] No resident worker found. Loading specialist in-process...")
+    source = None if load_kwargs.get("tiny") else load_kwargs.get("model_name", ADAPTER_DIR)
+    return ResidentWorker(*load_worker(**load_kwargs), source=source)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    tiny = "--tiny" in args
+    multi = "--multi" in args
+    path = args[args.index("--socket") + 1] if "--socket" in args else SOCKET_PATH
+    command = args[0] if args and not args[0].startswith("--") else "serve"
+
+    if command == "serve":
+        print("🏛️  AKASHA RESIDENT: LOADING SPECIALIST ONCE...")
+        serve(ResidentWorker(*load_worker(tiny=tiny, multi=multi), source=None if tiny else ADAPTER_DIR), path)
+    elif command == "ping":
+        print(ResidentClient(path, timeout=5).ping())
+    else:
+        print(f"❌ Unknown command: {command} (use serve | ping)")
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from akasha_gguf import F32, Q4_K, Q6_K, QK_K, GGML_BLOCKS, GGUFReader, write_gguf
+
+# ==================================================
+# SCALAR REFERENCE (straight port of ggml's dequantize_row_* loops)
+# ==================================================
+def _reference_q4_k(block):
+    d = float(np.frombuffer(block[0:2], np.float16)[0])
+    dmin = float(np.frombuffer(block[2:4], np.float16)[0])
+    scales, q = [int(x) for x in block[4:16]], [int(x) for x in block[16:]]
+
+    def scale_min(j):
+        if j < 4:
+            return scales[j] & 63, scales[j + 4] & 63
+        return (scales[j + 4] & 0xF) | ((scales[j - 4] >> 6) << 4), (scales[j + 4] >> 4) | ((scales[j] >> 6) << 4)
+
+    y, idx = [], 0
+    for j in range(0, QK_K, 64):
+        sc1, m1 = scale_min(idx)
+        sc2, m2 = scale_min(idx + 1)
+        chunk = q[j // 2:j // 2 + 32]
+        y += [d * sc1 * (b & 0xF) - dmin * m1 for b in chunk]
+        y += [d * sc2 * (b >> 4) - dmin * m2 for b in chunk]
+        idx += 2
+    return np.array(y, dtype=np.float32)
+
+def _reference_q6_k(block):
+    ql, qh = [int(x) for x in block[0:128]], [int(x) for x in block[128:192]]
+    sc = [int(x) for x in np.frombuffer(block[192:208], np.int8)]
+    d = float(np.frombuffer(block[208:210], np.float16)[0])
+    y = np.zeros(QK_K, dtype=np.float32)
+    for n in range(2):
+        for l in range(32):
+            s = n * 8 + l // 16
+            h = qh[n * 32 + l]
+            a, b = ql[n * 64 + l], ql[n * 64 + l + 32]
+            y[n * 128 + l] = d * sc[s] * (((a & 0xF) | ((h & 3) << 4)) - 32)
+            y[n * 128 + l + 32] = d * sc[s + 2] * (((b & 0xF) | (((h >> 2) & 3) << 4)) - 32)
+            y[n * 128 + l + 64] = d * sc[s + 4] * (((a >> 4) | (((h >> 4) & 3) << 4)) - 32)
+            y[n * 128 + l + 96] = d * sc[s + 6] * (((b >> 4) | (((h >> 6) & 3) << 4)) - 32)
+    return y
+
+def _random_blocks(rng, ggml_type, n_blocks):
+    block_bytes = GGML_BLOCKS[ggml_type][1]
+    raw = rng.integers(0, 256, size=(n_blocks, block_bytes), dtype=np.uint8)
+    # Keep the f16 scales finite and small
+    d = rng.uniform(0.001, 0.05, size=n_blocks).astype(np.float16).view(np.uint8).reshape(n_blocks, 2)
+    if ggml_type == Q4_K:
+        raw[:, 0:2] = d
+        raw[:, 2:4] = d
+    elif ggml_type == Q6_K:
+        raw[:, 208:210] = d
+    return raw.tobytes()
+
+def _expected(tensor, raw, reference):
+    block_bytes = GGML_BLOCKS[tensor.ggml_type][1]
+    return np.concatenate([
+        reference(np.frombuffer(raw[i:i + block_bytes], np.uint8))
+        for i in range(0, len(raw), block_bytes)
+    ]).reshape(tensor.n_rows, tensor.row_length)
+
+# ==================================================
+# SYNTHETIC GGUF ROUND TRIP
+# ==================================================
+@pytest.fixture(scope="module")
+def synthetic(tmp_path_factory):
+    rng = np.random.default_rng(3407)
+    dense = rng.standard_normal((3, 64)).astype(np.float32)
+    tensors = {
+        "output_norm.weight": (F32, (64, 3), dense.tobytes()),
+        "blk.0.attn_q.weight": (Q4_K, (512, 4), _random_blocks(rng, Q4_K, 8)),
+        "blk.0.ffn_down.weight": (Q6_K, (256, 6), _random_blocks(rng, Q6_K, 6)),
+    }
+    path = tmp_path_factory.mktemp("gguf") / "synthetic.gguf"
+    write_gguf(str(path), {"general.architecture": "qwen3", "qwen3.embedding_length": 64,
+                           "tokenizer.ggml.tokens": ["<a>", "<b>"]}, tensors)
+    with GGUFReader(str(path)) as reader:
+        yield reader, tensors, dense
+
+def test_metadata_round_trip(synthetic):
+    reader, _, _ = synthetic
+    assert reader.metadata["general.architecture"] == "qwen3"
+    assert reader.metadata["qwen3.embedding_length"] == 64
+    assert list(reader.metadata["tokenizer.ggml.tokens"]) == ["<a>", "<b>"]
+
+def test_f32_round_trip(synthetic):
+    reader, _, dense = synthetic
+    assert np.array_equal(reader.tensor("output_norm.weight").dequantize(), dense)
+
+@pytest.mark.parametrize("name, reference", [
+    ("blk.0.attn_q.weight", _reference_q4_k),
+    ("blk.0.ffn_down.weight", _reference_q6_k),
+])
+def test_dequantize_matches_ggml_loops(synthetic, name, reference):
+    reader, tensors, _ = synthetic
+    tensor = reader.tensor(name)
+    expected = _expected(tensor, tensors[name][2], reference)
+    assert np.allclose(tensor.dequantize(), expected, atol=1e-5)
+    for index in (0, tensor.n_rows - 1):
+        assert np.allclose(tensor.row(index), expected[index], atol=1e-5)
@@ -0,0 +1,56 @@
+import pytest
+import torch
+
+from titan_padding import (
+    left_pack_padding,
+    align_logprobs_with_mask,
+    _argsort_left_pack_padding,
+    _grid_align_logprobs_with_mask,
+    _padded_batch,
+)
+
+PAD_ID = 0
+
+def _random_batches(trials=200, seed=3407):
+    generator = torch.Generator().manual_seed(seed)
+    for trial in range(trials):
+        batch = int(torch.randint(1, 9, (1,), generator=generator))
+        seq_len = int(torch.randint(1, 65, (1,), generator=generator))
+        ids = _padded_batch(batch, seq_len, PAD_ID, generator)
+        if trial % 10 == 0:
+            ids[0] = PAD_ID  # an all-pad row
+        logprob_len = int(torch.randint(1, seq_len + 8, (1,), generator=generator))
+        yield trial, ids, torch.randn(batch, logprob_len, generator=generator)
+
+def test_left_pack_padding_matches_argsort():
+    for trial, ids, _ in _random_batches():
+        assert torch.equal(left_pack_padding(ids, PAD_ID), _argsort_left_pack_padding(ids, PAD_ID)), trial
+
+def test_left_pack_padding_keeps_token_order():
+    ids = torch.tensor([[0, 0, 5, 0, 7, 9, 0], [3, 0, 0, 4, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0]])
+    assert left_pack_padding(ids, PAD_ID).tolist() == [
+        [5, 7, 9, 0, 0, 0, 0],
+        [3, 4, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0],
+    ]
+
+@pytest.mark.parametrize("pad_value", [0.0, float("-inf")])
+def test_align_logprobs_matches_index_grid(pad_value):
+    for trial, ids, logprobs in _random_batches():
+        mask = (ids != PAD_ID).long()
+        ours = align_logprobs_with_mask(logprobs, mask, pad_value)
+        ref = _grid_align_logprobs_with_mask(logprobs, mask, pad_value)
+        assert ours.shape == ref.shape and torch.equal(ours, ref), trial
+
+def test_align_logprobs_drops_overflow():
+    mask = torch.tensor([[0, 0, 1, 1], [1, 1, 1, 1]])
+    logprobs = torch.tensor([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    assert align_logprobs_with_mask(logprobs, mask).tolist() == [[0.0, 0.0, 1.0, 2.0], [4.0, 5.0, 6.0, 0.0]]
+
+def test_single_token_rows():
+    ids = torch.tensor([[7], [0]])
+    assert torch.equal(left_pack_padding(ids, PAD_ID), _argsort_left_pack_padding(ids, PAD_ID))
+    mask = (ids != PAD_ID).long()
+    for logprob_len in (1, 3):
+        logprobs = torch.randn(2, logprob_len)
+        assert torch.equal(align_logprobs_with_mask(logprobs, mask), _grid_align_logprobs_with_mask(logprobs, mask))
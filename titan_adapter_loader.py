@@ -1,6 +1,4 @@
-import torch
-from unsloth import FastLanguageModel
-from transformers import TextStreamer
+from akasha_resident import connect
 
 # --- TITAN CONFIGURATION ---
 # We point to the ADAPTER directory. Unsloth is smart enough to find the base model automatically.
@@ -13,16 +11,9 @@ class TitanEngine:
         print(f"=== TITAN ENGINE: ONLINE ===")
         print(f"[+] Mounting Titan Adapter from: {ADAPTER_DIR}...")
         
-        # 1. Load the Adapter & Base Model
-        self.model, self.tokenizer = FastLanguageModel.from_pretrained(
-            model_name = ADAPTER_DIR, 
-            max_seq_length = MAX_SEQ_LENGTH,
-            dtype = None,
-            load_in_4bit = LOAD_IN_4BIT,
-        )
-        
-        # Enable 2x faster inference
-        FastLanguageModel.for_inference(self.model)
+        # 1. Attach to the resident worker (or load Adapter & Base Model in-process,
+        #    with 2x faster inference enabled)
+        self.worker = connect(model_name = ADAPTER_DIR, adapters = ())
         print("[+] Titan Adapter Mounted. System Ready.")
 
     def engage(self, role: str, instruction: str):
@@ -41,23 +32,14 @@ class TitanEngine:
             {"role": "user", "content": instruction}
         ]
         
-        inputs = self.tokenizer.apply_chat_template(
-            messages,
-            tokenize = True,
-            add_generation_prompt = True,
-            return_tensors = "pt",
-        ).to("cuda")
-
-        streamer = TextStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
-        
         print(f"\n--- [{role} ACTIVATED] ---")
-        self.model.generate(
-            inputs,
-            streamer = streamer,
+        response = self.worker.generate(
+            messages = messages,
             max_new_tokens = 512,
-            use_cache = True,
             temperature = 0.1,
+            prefix = True,   # reuse the cached KV of this role's system turn
         )
+        print(response)
         print("\n--- [END TRANSMISSION] ---")
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+import sys
+import numpy as np
+import torch
+
+# ==================================================
+# 🪣 TITAN FORGE: LENGTH-BUCKETED, TOKEN-BUDGET BATCHES
+# Batch by tokens, not by rows. Pad a 400-token sample to 420, not to 2450.
+# ==================================================
+#
+# For the packing=False path. Each epoch:
+#   1. shuffle all sample indices (seed + epoch, so every run is identical)
+#   2. cut the shuffled order into buckets of `bucket_size` samples
+#   3. sort each bucket by length and greedily fill batches while
+#      rows * longest_row <= max_tokens
+#   4. shuffle the batch order
+# Buckets keep randomness between epochs; sorting inside a bucket keeps the
+# rows of one batch close in length.
+#
+# Plugged into the SFT trainer via `max_tokens_per_batch` (see
+# unsloth_compiled_cache/UnslothSFTTrainer.py: get_train_dataloader).
+#
+#   python titan_batching.py [titan_dataset_complete.jsonl] [--max-tokens 4096]   -> padding report
+
+SEED = 3407
+BUCKET_SIZE = 256
+MAX_TOKENS_PER_BATCH = 4096
+
+class TokenBudgetBatchSampler(torch.utils.data.Sampler):
+    def __init__(self, lengths, max_tokens=MAX_TOKENS_PER_BATCH, seed=SEED, bucket_size=BUCKET_SIZE,
+                 shuffle=True, max_batch_size=None):
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        if len(self.lengths) and self.lengths.max() > max_tokens:
+            # A sample longer than the budget still gets a batch of its own
+            print(f"[!] Longest sample ({self.lengths.max()} tokens) exceeds max_tokens={max_tokens}; it is batched alone.")
+        self.max_tokens = max_tokens
+        self.seed = seed
+        self.bucket_size = bucket_size
+        self.shuffle = shuffle
+        self.max_batch_size = max_batch_size
+        self.epoch = 0
+        self._cache = None
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def batches(self):
+        if self._cache is not None and self._cache[0] == self.epoch:
+            return self._cache[1]
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        batches = []
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            batch, longest = [], 0
+            for i in bucket.tolist():
+                longest_if_added = max(longest, int(self.lengths[i]))
+                full = self.max_batch_size is not None and len(batch) >= self.max_batch_size
+                if batch and (longest_if_added * (len(batch) + 1) > self.max_tokens or full):
+                    batches.append(batch)
+                    batch, longest_if_added = [], int(self.lengths[i])
+                batch.append(i)
+                longest = longest_if_added
+            if batch:
+                batches.append(batch)
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        self._cache = (self.epoch, batches)
+        return batches
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        return len(self.batches())
+
+def dataset_lengths(dataset):
+    """Token count per sample: a `lengths` attribute, or the length of every `input_ids` row."""
+    lengths = getattr(dataset, "lengths", None)
+    if lengths is not None:
+        return np.asarray(lengths)
+    return np.array([len(ids) for ids in dataset["input_ids"]])
+
+class TokenizedDataset(torch.utils.data.Dataset):
+    """One tokenised sample per item (packing=False path)."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.lengths = np.array([len(d) for d in docs])
+        self.column_names = ["input_ids"]
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __getitem__(self, i):
+        if i == "input_ids":
+            return self.docs
+        if i >= len(self):
+            raise IndexError(i)
+        return {"input_ids": self.docs[i]}
+
+class PaddedCollator:
+    """Right-pad to the longest row of the batch; padding gets no attention and no loss."""
+
+    def __init__(self, pad_id):
+        self.pad_id = pad_id
+
+    def __call__(self, rows):
+        longest = max(len(r["input_ids"]) for r in rows)
+        input_ids = torch.full((len(rows), longest), self.pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), longest), dtype=torch.long)
+        for i, r in enumerate(rows):
+            n = len(r["input_ids"])
+            input_ids[i, :n] = torch.as_tensor(np.asarray(r["input_ids"]), dtype=torch.long)
+            attention_mask[i, :n] = 1
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "labels": input_ids.masked_fill(attention_mask == 0, -100),
+        }
+
+# ==================================================
+# PADDING EFFICIENCY
+# ==================================================
+def padding_efficiency(lengths, batches):
+    """Real tokens / tokens actually computed (every row padded to its batch's longest)."""
+    lengths = np.asarray(lengths)
+    computed = sum(len(b) * lengths[b].max() for b in batches)
+    return float(lengths.sum() / max(computed, 1))
+
+def bucketing_report(lengths, batch_size=2, max_tokens=MAX_TOKENS_PER_BATCH, seed=SEED):
+    """Fraction of real tokens: random fixed-size batches vs. token-budget length buckets (no packing)."""
+    lengths = np.asarray(lengths)
+    order = np.random.default_rng(seed).permutation(len(lengths))
+    fixed = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    bucketed = TokenBudgetBatchSampler(lengths, max_tokens, seed).batches()
+    return {
+        "fixed": padding_efficiency(lengths, fixed),
+        "fixed_batches": len(fixed),
+        "bucketed": padding_efficiency(lengths, bucketed),
+        "bucketed_batches": len(bucketed),
+        "mean_batch_size": float(np.mean([len(b) for b in bucketed])) if bucketed else 0.0,
+    }
+
+if __name__ == "__main__":
+    from transformers import AutoTokenizer
+    from titan_pack import tokenize_corpus, DATASET_FILE, TOKENIZER_DIR, SEQ_LEN
+
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    dataset = args[0] if args and not args[0].startswith("--") else DATASET_FILE
+    max_tokens = int(option("--max-tokens", MAX_TOKENS_PER_BATCH))
+    tokenizer = AutoTokenizer.from_pretrained(option("--tokenizer", TOKENIZER_DIR))
+    lengths = [len(d) for d in tokenize_corpus(dataset, tokenizer, SEQ_LEN)]
+
+    report = bucketing_report(lengths, batch_size=int(option("--batch-size", 2)), max_tokens=max_tokens)
+    print(f"🪣 {len(lengths)} samples, {min(lengths)}-{max(lengths)} tokens")
+    print(f"   fixed batch size : {report['fixed']:.1%} real tokens over {report['fixed_batches']} batches")
+    print(f"   token budget {max_tokens}: {report['bucketed']:.1%} real tokens over {report['bucketed_batches']} batches "
+          f"(avg {report['mean_batch_size']:.1f} rows)")
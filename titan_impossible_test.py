@@ -1,6 +1,4 @@
-import torch
-from unsloth import FastLanguageModel
-from transformers import TextStreamer
+from akasha_resident import connect
 
 # --- TITAN SETUP ---
 ADAPTER_DIR = "titan_dora_adapters" 
@@ -9,12 +7,7 @@ MAX_SEQ_LENGTH = 2048
 class ImpossibleTest:
     def __init__(self):
         print("=== MOUNTING TITAN FOR IMPOSSIBLE GAUNTLET ===")
-        self.model, self.tokenizer = FastLanguageModel.from_pretrained(
-            model_name = ADAPTER_DIR,
-            max_seq_length = MAX_SEQ_LENGTH,
-            load_in_4bit = True,
-        )
-        FastLanguageModel.for_inference(self.model)
+        self.worker = connect(model_name = ADAPTER_DIR, adapters = ())
 
     def probe(self, title, question):
         print(f"\n\n{'='*50}")
@@ -24,10 +17,8 @@ class ImpossibleTest:
             {"role": "system", "content": "You are the Titan Visionary. You synthesize novel, mathematically sound solutions for unsolved engineering paradoxes."},
             {"role": "user", "content": question}
         ]
-        inputs = self.tokenizer.apply_chat_template(messages, tokenize=True, add_generation_prompt=True, return_tensors="pt").to("cuda")
-        streamer = TextStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
         # Higher temperature (0.8) to force the model to 'innovate' rather than just repeat
-        self.model.generate(inputs, streamer=streamer, max_new_tokens=1024, temperature=0.8)
+        print(self.worker.generate(messages=messages, max_new_tokens=1024, temperature=0.8))
 
 if __name__ == "__main__":
     tester = ImpossibleTest()
@@ -0,0 +1,217 @@
+import os
+import sys
+import time
+import torch
+
+# ==================================================
+# 🧮 TITAN FORGE: BUDGETED LOG-SOFTMAX / CROSS-ENTROPY
+# 151,936 vocab entries per token. Never hold them all in float32 at once.
+# ==================================================
+#
+# log p(y_t) = x[t, y_t] - logsumexp(x[t, :]) is computed over slices of rows
+# whose float32 working set fits LOGITS_BUDGET_BYTES:
+#     rows per slice = budget / (vocab * 4 bytes * WORKSPACE)
+# so a 4096-token row batch on Qwen3 (151,936 x 4096 x 4 B = 2.5 GB of float32
+# logits) runs as ~10 slices of ~0.25 GB instead of one.
+#
+# The backward pass is fused: only the per-row logsumexp is kept, and
+#     d/dx = g * (onehot(y) - softmax(x))
+# is recomputed slice by slice and written straight into the gradient buffer
+# (in the logits' own dtype). linear_* variants start from hidden states and
+# the lm_head weight, so even the bf16 logits never exist for the whole batch.
+#
+# Shared by the SFT, DPO, GRPO and KTO trainers in unsloth_compiled_cache/.
+#
+#   python titan_logsoftmax.py [--vocab 151936] [--budget-mb 256]   -> equivalence + memory/throughput benchmark
+
+LOGITS_BUDGET_BYTES = int(os.environ.get("AKASHA_LOGITS_BUDGET", 256 * 1024 * 1024))
+WORKSPACE = 3  # float32 slice + exp + gradient temporaries, per element
+
+def chunk_rows(vocab, budget_bytes=None, workspace=WORKSPACE):
+    """Rows of `vocab` logits whose float32 working set fits the budget (at least 1)."""
+    budget_bytes = LOGITS_BUDGET_BYTES if budget_bytes is None else budget_bytes
+    return max(1, int(budget_bytes // (vocab * 4 * workspace)))
+
+def chunk_count(rows, vocab, budget_bytes=None, workspace=WORKSPACE):
+    return max(1, -(-rows // chunk_rows(vocab, budget_bytes, workspace)))
+
+def _slices(shape, step):
+    """(batch, start, end) over a [B, T, V] tensor: every slice is a contiguous run of rows."""
+    for b in range(shape[0]):
+        for start in range(0, shape[1], step):
+            yield b, start, min(start + step, shape[1])
+
+# ==================================================
+# 1. FROM LOGITS
+# ==================================================
+class _SelectiveLogSoftmax(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, logits, index, step):
+        out = torch.empty(index.shape, dtype=torch.float32, device=logits.device)
+        lse = torch.empty(index.shape, dtype=torch.float32, device=logits.device)
+        for b, s, e in _slices(logits.shape, step):
+            chunk = logits[b, s:e].float()
+            lse[b, s:e] = torch.logsumexp(chunk, dim=-1)
+            out[b, s:e] = chunk.gather(-1, index[b, s:e].unsqueeze(-1)).squeeze(-1) - lse[b, s:e]
+        ctx.save_for_backward(logits, index, lse)
+        ctx.step = step
+        return out
+
+    @staticmethod
+    def backward(ctx, grad):
+        logits, index, lse = ctx.saved_tensors
+        grad_logits = torch.empty(logits.shape, dtype=logits.dtype, device=logits.device)
+        for b, s, e in _slices(logits.shape, ctx.step):
+            g = grad[b, s:e].float().unsqueeze(-1)
+            chunk = (logits[b, s:e].float() - lse[b, s:e].unsqueeze(-1)).exp_().mul_(-g)
+            chunk.scatter_add_(-1, index[b, s:e].unsqueeze(-1), g)
+            grad_logits[b, s:e] = chunk
+        return grad_logits, None, None
+
+def selective_log_softmax(logits, index, budget_bytes=None):
+    """log_softmax(logits).gather(-1, index) in float32, one budget-sized slice of rows at a time."""
+    squeeze = logits.dim() == 2
+    if squeeze:
+        logits, index = logits.unsqueeze(0), index.unsqueeze(0)
+    out = _SelectiveLogSoftmax.apply(logits, index.long(), chunk_rows(logits.shape[-1], budget_bytes))
+    return out.squeeze(0) if squeeze else out
+
+# ==================================================
+# 2. FROM HIDDEN STATES (lm_head fused in)
+# ==================================================
+class _LinearSelectiveLogSoftmax(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, hidden, weight, index, step):
+        out = torch.empty(index.shape, dtype=torch.float32, device=hidden.device)
+        lse = torch.empty(index.shape, dtype=torch.float32, device=hidden.device)
+        for b, s, e in _slices(hidden.shape, step):
+            chunk = (hidden[b, s:e].to(weight.dtype) @ weight.t()).float()
+            lse[b, s:e] = torch.logsumexp(chunk, dim=-1)
+            out[b, s:e] = chunk.gather(-1, index[b, s:e].unsqueeze(-1)).squeeze(-1) - lse[b, s:e]
+        ctx.save_for_backward(hidden, weight, index, lse)
+        ctx.step = step
+        return out
+
+    @staticmethod
+    def backward(ctx, grad):
+        hidden, weight, index, lse = ctx.saved_tensors
+        grad_hidden = torch.empty(hidden.shape, dtype=hidden.dtype, device=hidden.device)
+        grad_weight = torch.zeros(weight.shape, dtype=torch.float32, device=weight.device) \
+            if ctx.needs_input_grad[1] else None
+        for b, s, e in _slices(hidden.shape, ctx.step):
+            h = hidden[b, s:e].to(weight.dtype)
+            g = grad[b, s:e].float().unsqueeze(-1)
+            chunk = ((h @ weight.t()).float() - lse[b, s:e].unsqueeze(-1)).exp_().mul_(-g)
+            chunk.scatter_add_(-1, index[b, s:e].unsqueeze(-1), g)
+            chunk = chunk.to(weight.dtype)
+            grad_hidden[b, s:e] = chunk @ weight
+            if grad_weight is not None:
+                grad_weight += (chunk.t() @ h).float()
+        return grad_hidden, None if grad_weight is None else grad_weight.to(weight.dtype), None, None
+
+def linear_selective_log_softmax(hidden, weight, index, budget_bytes=None):
+    """selective_log_softmax(hidden @ weight.T, index) without materialising the logits."""
+    squeeze = hidden.dim() == 2
+    if squeeze:
+        hidden, index = hidden.unsqueeze(0), index.unsqueeze(0)
+    out = _LinearSelectiveLogSoftmax.apply(hidden, weight, index.long(), chunk_rows(weight.shape[0], budget_bytes))
+    return out.squeeze(0) if squeeze else out
+
+# ==================================================
+# 3. CAUSAL-LM LOSS
+# ==================================================
+def _shift(labels, ignore_index):
+    # Next-token targets without slicing the logits (which would copy them)
+    return torch.cat([labels[:, 1:], labels.new_full((labels.shape[0], 1), ignore_index)], dim=1)
+
+def _reduce(logps, labels, ignore_index, num_items_in_batch):
+    valid = labels != ignore_index
+    total = -(logps * valid).sum()
+    return total / (num_items_in_batch if num_items_in_batch is not None else valid.sum().clamp(min=1))
+
+def cross_entropy(logits, labels, ignore_index=-100, num_items_in_batch=None, budget_bytes=None, shift=True):
+    """Mean (or sum / num_items_in_batch) next-token NLL over the labels that are not ignore_index."""
+    labels = _shift(labels, ignore_index) if shift else labels
+    logps = selective_log_softmax(logits, labels.clamp(min=0), budget_bytes)
+    return _reduce(logps, labels, ignore_index, num_items_in_batch)
+
+def linear_cross_entropy(hidden, weight, labels, ignore_index=-100, num_items_in_batch=None, budget_bytes=None,
+                         shift=True):
+    labels = _shift(labels, ignore_index) if shift else labels
+    logps = linear_selective_log_softmax(hidden, weight, labels.clamp(min=0), budget_bytes)
+    return _reduce(logps, labels, ignore_index, num_items_in_batch)
+
+# ==================================================
+# 4. BENCHMARK
+# ==================================================
+def _reference(logits, index):
+    return torch.gather(logits.float().log_softmax(-1), -1, index.unsqueeze(-1)).squeeze(-1)
+
+def benchmark(vocab=151_936, hidden_size=2048, seq_lens=(512, 1024, 2048, 4096), budget_bytes=None, repeats=3):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.bfloat16
+    budget_bytes = LOGITS_BUDGET_BYTES if budget_bytes is None else budget_bytes
+    torch.manual_seed(3407)
+    weight = (torch.randn(vocab, hidden_size, device=device) * hidden_size ** -0.5).to(dtype)
+
+    # Equivalence on a small slice first (a budget that forces several slices)
+    hidden = torch.randn(2, 64, hidden_size, device=device, dtype=dtype, requires_grad=True)
+    labels = torch.randint(0, vocab, (2, 64), device=device)
+    logits = (hidden @ weight.t()).detach().requires_grad_(True)
+    ref = _reference(logits, labels)
+    ref.sum().backward()
+    ours_logits = logits.detach().requires_grad_(True)
+    ours = selective_log_softmax(ours_logits, labels, budget_bytes=vocab * 4 * WORKSPACE * 8)
+    ours.sum().backward()
+    fused = linear_selective_log_softmax(hidden, weight, labels, budget_bytes=vocab * 4 * WORKSPACE * 8)
+    print(f"   max |logp diff|   : chunked {(ours - ref).abs().max().item():.2e}, "
+          f"fused {(fused - ref).abs().max().item():.2e}")
+    print(f"   max |grad diff|   : {(ours_logits.grad.float() - logits.grad.float()).abs().max().item():.2e}")
+
+    def run(fn, seq_len):
+        x = torch.randn(1, seq_len, hidden_size, device=device, dtype=dtype)
+        y = torch.randint(0, vocab, (1, seq_len), device=device)
+        if device == "cuda":
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        base = torch.cuda.memory_allocated() if device == "cuda" else 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            h = x.detach().requires_grad_(True)
+            fn(h, y).backward()
+        if device == "cuda":
+            torch.cuda.synchronize()
+        peak = (torch.cuda.max_memory_allocated() - base) if device == "cuda" else None
+        return (time.perf_counter() - start) / repeats, peak
+
+    def full(h, y):
+        return -_reference(h @ weight.t(), y).mean()
+
+    def chunked(h, y):
+        return linear_cross_entropy(h, weight, y, budget_bytes=budget_bytes, shift=False)
+
+    print(f"   {'seq':>6} | {'full fp32 logits':>16} | {'full':>22} | {'budgeted':>22}")
+    for seq_len in seq_lens:
+        rows = [f"{seq_len:>6}", f"{seq_len * vocab * 4 / 2**20:>13.0f} MB"]
+        for fn in (full, chunked):
+            try:
+                seconds, peak = run(fn, seq_len)
+                mem = f"{peak / 2**20:.0f} MB peak" if peak is not None else f"{seq_len / seconds:.0f} tok/s"
+                rows.append(f"{seconds * 1000:>8.1f} ms {mem:>12}")
+            except RuntimeError as e:  # the unchunked path is the one expected to run out of memory
+                rows.append(f"{'OOM' if 'memory' in str(e).lower() else 'error':>22}")
+        print(" | ".join(rows))
+    if device == "cpu":
+        step = chunk_rows(vocab, budget_bytes)
+        print(f"   (CPU: budgeted working set ~{step * vocab * 4 * WORKSPACE / 2**20:.0f} MB per slice of {step} rows)")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    vocab = int(option("--vocab", 151_936))
+    budget = int(float(option("--budget-mb", LOGITS_BUDGET_BYTES / 2**20)) * 2**20)
+    print(f"🧮 BUDGETED LOG-SOFTMAX (vocab {vocab}, budget {budget / 2**20:.0f} MB, "
+          f"{chunk_rows(vocab, budget)} rows per slice)")
+    benchmark(vocab=vocab, budget_bytes=budget)
@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import time
+import bisect
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import torch
+import titan_tokenize
+from akasha_anchor_cache import content_hash, tokenizer_hash
+
+# ==================================================
+# 📦 TITAN FORGE: PRE-TOKENISED, PACKED DATASET CACHE
+# Tokenise once. Fill every 2048-token row. Never attend across samples.
+# ==================================================
+#
+# Stage (run once per corpus / tokenizer / template, then it is a cache hit):
+#   python titan_pack.py [titan_dataset_complete.jsonl] [--seq-len 2048] [--tokenizer titan_dora_adapters]
+#
+# Output directory (.akasha_cache/packed/<key>/):
+#   tokens.bin     int32 [rows, seq_len]   packed token ids (pad id in the tail)
+#   positions.bin  int16 [rows, seq_len]   position inside its own sample, -1 = padding
+#   meta.json      rows, seq_len, documents, fill ratio, hashes
+# A position of 0 marks where a new sample starts: the collator turns that into
+# restarted position_ids, a block-diagonal causal mask and no label across the seam.
+#
+# key = sha256(corpus content, tokenizer files, template, seq_len, FORMAT)
+
+PACKED_DIR = os.environ.get("AKASHA_PACKED", ".akasha_cache/packed")
+FORMAT = 1
+SEQ_LEN = 2048
+DATASET_FILE = "./titan_dataset_complete.jsonl"
+TOKENIZER_DIR = "titan_dora_adapters"
+TEMPLATE = (
+    "<|im_start|>user\n{instruction}<|im_end|>\n"
+    "<|im_start|>assistant\n{output}<|im_end|>{eos}"
+)
+
+def render(instruction, output, eos):
+    return TEMPLATE.format(instruction=instruction, output=output, eos=eos)
+
+def template_hash(eos):
+    return hashlib.sha256(render("{instruction}", "{output}", eos).encode("utf-8")).hexdigest()
+
+def pack_key(dataset_path, tokenizer, seq_len=SEQ_LEN):
+    parts = (content_hash(dataset_path), tokenizer_hash(tokenizer), template_hash(tokenizer.eos_token), seq_len, FORMAT)
+    return hashlib.sha256(":".join(map(str, parts)).encode("utf-8")).hexdigest()[:16]
+
+def tokenize_corpus(dataset_path, tokenizer, seq_len=SEQ_LEN, workers=None):
+    """Rendered + tokenised samples, each cut to seq_len (process pool + content-addressed shards, see titan_tokenize)."""
+    return titan_tokenize.tokenize_corpus(dataset_path, tokenizer, TEMPLATE, max_length=seq_len, workers=workers).docs()
+
+# ==================================================
+# 1. BIN PACKING (best-fit decreasing)
+# ==================================================
+def pack(lengths, seq_len=SEQ_LEN):
+    """Group document indices into rows of at most seq_len tokens. Returns a list of index lists."""
+    order = np.argsort(-np.asarray(lengths), kind="stable")
+    rows = []
+    free = []  # sorted (remaining capacity, row id)
+    for i in order.tolist():
+        need = int(lengths[i])
+        # Tightest row that still fits this document
+        at = bisect.bisect_left(free, (need, -1))
+        if at < len(free):
+            remaining, row = free.pop(at)
+            rows[row].append(i)
+        else:
+            row, remaining = len(rows), seq_len
+            rows.append([i])
+        remaining -= need
+        if remaining > 0:
+            bisect.insort(free, (remaining, row))
+    return rows
+
+def build_packed(dataset_path, tokenizer, seq_len=SEQ_LEN, root=PACKED_DIR, docs=None, force=False):
+    """Tokenise + pack the corpus into the memmap cache. Returns the directory (cache hit: no work)."""
+    out_dir = os.path.join(root, pack_key(dataset_path, tokenizer, seq_len))
+    if os.path.exists(os.path.join(out_dir, "meta.json")) and not force:
+        return out_dir
+
+    start = time.perf_counter()
+    docs = tokenize_corpus(dataset_path, tokenizer, seq_len) if docs is None else docs
+    lengths = np.array([len(d) for d in docs], dtype=np.int64)
+    rows = pack(lengths, seq_len)
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    os.makedirs(root, exist_ok=True)
+    work = tempfile.mkdtemp(dir=root, prefix=".pack-")
+    try:
+        tokens = np.memmap(os.path.join(work, "tokens.bin"), dtype="<i4", mode="w+", shape=(len(rows), seq_len))
+        positions = np.memmap(os.path.join(work, "positions.bin"), dtype="<i2", mode="w+", shape=(len(rows), seq_len))
+        tokens[:] = pad_id
+        positions[:] = -1
+        for r, members in enumerate(rows):
+            cursor = 0
+            for i in members:
+                n = len(docs[i])
+                tokens[r, cursor:cursor + n] = docs[i]
+                positions[r, cursor:cursor + n] = np.arange(n)
+                cursor += n
+        tokens.flush()
+        positions.flush()
+        del tokens, positions
+        meta = {
+            "format": FORMAT,
+            "rows": len(rows),
+            "seq_len": seq_len,
+            "documents": len(docs),
+            "tokens": int(lengths.sum()),
+            "fill": float(lengths.sum() / max(len(rows) * seq_len, 1)),
+            "pad_id": int(pad_id),
+            "dataset": os.path.abspath(dataset_path),
+            "dataset_hash": content_hash(dataset_path),
+            "tokenizer_hash": tokenizer_hash(tokenizer),
+            "template_hash": template_hash(tokenizer.eos_token),
+        }
+        with open(os.path.join(work, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(work, out_dir)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    print(f"[✔] Packed {len(docs)} samples into {len(rows)} rows of {seq_len} "
+          f"({meta['fill']:.1%} full) in {time.perf_counter() - start:.2f}s -> {out_dir}")
+    return out_dir
+
+# ==================================================
+# 2. TRAINER SIDE (memory-mapped rows + cross-document masking)
+# ==================================================
+class PackedDataset(torch.utils.data.Dataset):
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        shape = (self.meta["rows"], self.meta["seq_len"])
+        self.tokens = np.memmap(os.path.join(path, "tokens.bin"), dtype="<i4", mode="r", shape=shape)
+        self.positions = np.memmap(os.path.join(path, "positions.bin"), dtype="<i2", mode="r", shape=shape)
+        self.column_names = ["input_ids", "positions"]
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def __getitem__(self, i):
+        # Column access (dataset["input_ids"]) for code that inspects the corpus, row access for the loader
+        if i == "input_ids":
+            return self.tokens
+        if i == "positions":
+            return self.positions
+        if i >= len(self):
+            raise IndexError(i)
+        return {"input_ids": np.array(self.tokens[i]), "positions": np.array(self.positions[i])}
+
+class PackedCollator:
+    """
+    Rows -> input_ids, labels, position_ids and a 4D additive attention mask in which
+    every token only sees earlier tokens of its OWN sample.
+    """
+
+    def __init__(self, dtype=torch.bfloat16):
+        self.dtype = dtype
+
+    def __call__(self, rows):
+        input_ids = torch.from_numpy(np.stack([r["input_ids"] for r in rows]).astype(np.int64))
+        positions = torch.from_numpy(np.stack([r["positions"] for r in rows]).astype(np.int64))
+        padding = positions < 0
+        starts = positions == 0
+
+        labels = input_ids.masked_fill(padding | starts, -100)  # no loss across the seam or on padding
+        position_ids = positions.clamp(min=0)
+
+        doc = torch.cumsum(starts.long(), dim=1).masked_fill(padding, -1)
+        seq_len = input_ids.shape[1]
+        causal = torch.ones(seq_len, seq_len, dtype=torch.bool).tril()
+        visible = (doc.unsqueeze(2) == doc.unsqueeze(1)) & causal & ~padding.unsqueeze(2)
+        visible |= torch.eye(seq_len, dtype=torch.bool)  # padding rows see themselves (no all -inf row)
+        mask = torch.zeros(visible.shape, dtype=self.dtype).masked_fill_(~visible, torch.finfo(self.dtype).min)
+        return {
+            "input_ids": input_ids,
+            "labels": labels,
+            "position_ids": position_ids,
+            "attention_mask": mask.unsqueeze(1),
+        }
+
+def padding_report(lengths, seq_len=SEQ_LEN, batch_size=2, seed=3407):
+    """Fraction of real tokens: random fixed-size batches padded to their longest row vs. packed rows."""
+    lengths = np.minimum(np.asarray(lengths), seq_len)
+    order = np.random.default_rng(seed).permutation(len(lengths))
+    padded = sum(len(chunk) * lengths[chunk].max() for chunk in np.array_split(order, max(1, -(-len(order) // batch_size))))
+    rows = pack(lengths, seq_len)
+    return {"unpacked": float(lengths.sum() / padded), "packed": float(lengths.sum() / (len(rows) * seq_len))}
+
+if __name__ == "__main__":
+    from transformers import AutoTokenizer
+
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    dataset = args[0] if args and not args[0].startswith("--") else DATASET_FILE
+    seq_len = int(option("--seq-len", SEQ_LEN))
+    tokenizer = AutoTokenizer.from_pretrained(option("--tokenizer", TOKENIZER_DIR))
+
+    print("📦 TITAN FORGE: PACKING DATASET...")
+    docs = tokenize_corpus(dataset, tokenizer, seq_len)
+    path = build_packed(dataset, tokenizer, seq_len, docs=docs, force="--force" in args)
+    report = padding_report([len(d) for d in docs], seq_len)
+    print(f"    real-token share: {report['unpacked']:.1%} (packing=False, batch 2) -> {report['packed']:.1%} (packed)")
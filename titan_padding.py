@@ -0,0 +1,93 @@
+import sys
+import time
+import torch
+
+# ==================================================
+# 🧷 TITAN FORGE: LINEAR-TIME PAD SHUFFLING FOR RL TRAINERS
+# Moving pads is a prefix sum, not a sort.
+# ==================================================
+#
+# Shared by every trainer in unsloth_compiled_cache/ (GRPO, RLOO, PPO, DPO, ...):
+#
+#   left_pack_padding         tokens to the front, pads to the back, order kept.
+#                             Was: stable argsort over the mask (O(T log T) per row).
+#                             Now: destination of every position from one cumsum, one scatter.
+#   align_logprobs_with_mask  logprob[b, j] -> out[b, first_real_token[b] + j].
+#                             Was: full-size index grids + boolean-mask gathers.
+#                             Now: one scatter into an output with a single spill column that
+#                             swallows the out-of-range writes.
+#
+#   python titan_padding.py                  -> CPU micro-benchmark against the old implementations
+#   python -m pytest tests/test_padding.py   -> equivalence against the old implementations
+
+def left_pack_padding(tensor, pad_id):
+    """Moves all padding tokens in each sequence of a batch to the right (token order preserved)."""
+    keep = tensor != pad_id
+    kept = keep.cumsum(dim=1)
+    # Token j goes to (tokens before it); pad j goes after all tokens, behind the pads before it
+    columns = torch.arange(tensor.shape[1], device=tensor.device)
+    dest = torch.where(keep, kept - 1, kept[:, -1:] + columns - kept)
+    return torch.empty_like(tensor).scatter_(1, dest, tensor)
+
+def align_logprobs_with_mask(logprob_tensor, attention_mask, pad_value=0.0):
+    """Shift each row of `logprob_tensor` right to the row's first attended position; pad_value elsewhere."""
+    batch_size, logprob_seq_len = logprob_tensor.shape
+    mask_seq_len = attention_mask.shape[1]
+    left_pad_counts = torch.argmax(attention_mask, dim=1, keepdim=True)
+    dest = (left_pad_counts + torch.arange(logprob_seq_len, device=logprob_tensor.device)).clamp_(max=mask_seq_len)
+    out = torch.full((batch_size, mask_seq_len + 1), pad_value, dtype=logprob_tensor.dtype, device=logprob_tensor.device)
+    return out.scatter_(1, dest, logprob_tensor)[:, :mask_seq_len]
+
+# ==================================================
+# PREVIOUS IMPLEMENTATIONS (reference for tests/test_padding.py and the benchmark)
+# ==================================================
+def _argsort_left_pack_padding(tensor, pad_id):
+    mask = (tensor != pad_id)
+    sorted_indices = torch.argsort(mask, dim=1, descending=True, stable=True)
+    return torch.gather(tensor, 1, sorted_indices)
+
+def _grid_align_logprobs_with_mask(logprob_tensor, attention_mask, pad_value=0.0):
+    device = logprob_tensor.device
+    batch_size, logprob_seq_len = logprob_tensor.shape
+    mask_seq_len = attention_mask.shape[1]
+    padded_logprobs = torch.full(attention_mask.shape, fill_value=pad_value, dtype=logprob_tensor.dtype, device=device)
+    left_pad_counts = torch.argmax(attention_mask, dim=1)
+    cols = torch.arange(logprob_seq_len, device=device)
+    dest_indices = left_pad_counts.unsqueeze(1) + cols
+    row_indices = torch.arange(batch_size, device=device).unsqueeze(1).expand_as(dest_indices)
+    valid_mask = dest_indices < mask_seq_len
+    padded_logprobs[row_indices[valid_mask], dest_indices[valid_mask]] = logprob_tensor[valid_mask]
+    return padded_logprobs
+
+def _padded_batch(batch, seq_len, pad_id, generator):
+    """Left-padded prompts + right-padded completions, with pads sprinkled inside as well."""
+    ids = torch.randint(1, 32_000, (batch, seq_len), generator=generator)
+    left = torch.randint(0, seq_len // 2 + 1, (batch, 1), generator=generator)
+    right = torch.randint(0, seq_len // 4 + 1, (batch, 1), generator=generator)
+    columns = torch.arange(seq_len)
+    ids[(columns < left) | (columns >= seq_len - right)] = pad_id
+    ids[torch.rand(batch, seq_len, generator=generator) < 0.02] = pad_id
+    return ids
+
+def benchmark(shapes=((8, 2048), (16, 4096), (64, 1024), (256, 512)), repeats=20, seed=3407):
+    generator = torch.Generator().manual_seed(seed)
+    print(f"   {'batch x seq':>12} | {'left_pack argsort':>17} | {'cumsum':>9} | {'align grid':>10} | {'scatter':>9}")
+    for batch, seq_len in shapes:
+        ids = _padded_batch(batch, seq_len, 0, generator)
+        mask = (ids != 0).long()
+        logprobs = torch.randn(batch, seq_len // 2, generator=generator)
+        timings = []
+        for fn, args in ((_argsort_left_pack_padding, (ids, 0)), (left_pack_padding, (ids, 0)),
+                         (_grid_align_logprobs_with_mask, (logprobs, mask)), (align_logprobs_with_mask, (logprobs, mask))):
+            fn(*args)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                fn(*args)
+            timings.append((time.perf_counter() - start) / repeats * 1000)
+        print(f"   {f'{batch} x {seq_len}':>12} | {timings[0]:>14.3f} ms | {timings[1]:>6.3f} ms | "
+              f"{timings[2]:>7.3f} ms | {timings[3]:>6.3f} ms  "
+              f"({timings[0] / timings[1]:.1f}x, {timings[2] / timings[3]:.1f}x)")
+
+if __name__ == "__main__":
+    print("🧷 PAD SHUFFLING: cumsum scatter vs. argsort / index grids (CPU)")
+    benchmark(repeats=int(sys.argv[1]) if len(sys.argv) > 1 else 20)
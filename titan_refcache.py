@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+from akasha_anchor_cache import content_hash
+
+# ==================================================
+# 🪞 TITAN FORGE: REFERENCE LOG-PROB STORE (DPO / KTO / BCO)
+# The reference model never changes. Run it over each preference pair once, ever.
+# ==================================================
+#
+# precompute_ref_log_probs=True in the DPO, KTO and BCO trainers
+# (unsloth_compiled_cache/) reads and fills this store: rows already in it skip
+# the reference forward entirely (this run, next epoch and every later run),
+# only new rows are computed and appended.
+#
+# One store per (trainer, reference checkpoint, length settings, columns). The checkpoint
+# is its name_or_path + hub revision + a hash of the base weights: the checkpoint
+# directory when it is local, otherwise every in-memory parameter except the LoRA /
+# DoRA ones, so adapter init and resume state never move the key.
+#   .akasha_cache/ref_logps/<key>/
+#       keys.bin     16-byte row digests (sha256 of the row's token ids), append-only
+#       values.bin   float32 [rows, len(columns)], memory-mapped
+#       meta.json    rows, columns  <- written last; it is the commit point of an append
+#
+#   python titan_refcache.py [.akasha_cache/ref_logps]   -> list stores
+
+REF_LOGPS_DIR = os.environ.get("AKASHA_REF_LOGPS", ".akasha_cache/ref_logps")
+DIGEST_BYTES = 16
+# Trainer settings that change the reference log-probs of an identical row
+KEY_SETTINGS = ("max_length", "max_prompt_length", "max_completion_length", "truncation_mode",
+                "padding_free", "use_logits_to_keep", "is_encoder_decoder")
+
+def row_fields(dataset):
+    """Columns that identify a tokenised row: every *input_ids column, plus the KTO/BCO label."""
+    return sorted(c for c in dataset.column_names if c.endswith("input_ids") or c == "label")
+
+def row_digest(row, fields):
+    payload = json.dumps([row[f] for f in fields], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).digest()[:DIGEST_BYTES]
+
+def reference_hash(reference):
+    """name_or_path, revision and base-weight hash of the reference model (adapter parameters excluded)."""
+    path = getattr(reference, "name_or_path", None) or getattr(reference.config, "_name_or_path", "")
+    revision = getattr(reference.config, "_commit_hash", None)
+    if path and os.path.exists(path):
+        return f"{path}@{revision}:{content_hash(path)}"
+    digest = hashlib.sha256()
+    for name, param in reference.named_parameters():
+        if "lora_" in name:
+            continue
+        # PEFT wraps adapted Linears: ".base_layer" names the same weight as the plain checkpoint
+        digest.update(f"{name.replace('.base_layer', '')}:{param.dtype}:{tuple(param.shape)}".encode("utf-8"))
+        data = param.detach().reshape(-1).cpu()  # one tensor at a time, off the GPU
+        digest.update((data.float() if data.is_floating_point() else data).numpy().tobytes())  # bf16 has no NumPy dtype
+    return f"{path}@{revision}:{digest.hexdigest()}"
+
+def reference_key(trainer, columns):
+    """Hash of the reference weights (ref model, or the base under the disabled adapter) + what shapes the logps."""
+    if getattr(trainer, "ref_model", None) is not None:
+        reference = trainer.accelerator.unwrap_model(trainer.ref_model)
+    else:
+        reference = trainer.accelerator.unwrap_model(trainer.model)
+        reference = reference.get_base_model() if hasattr(reference, "get_base_model") else reference
+    settings = {name: getattr(trainer.args, name, getattr(trainer, name, None)) for name in KEY_SETTINGS}
+    parts = (type(trainer).__name__, reference_hash(reference), getattr(trainer, "ref_adapter_name", None),
+             json.dumps(settings, sort_keys=True, default=str), ",".join(columns))
+    return hashlib.sha256(":".join(map(str, parts)).encode("utf-8")).hexdigest()[:16]
+
+# ==================================================
+# 1. THE STORE
+# ==================================================
+class RefLogpStore:
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        os.makedirs(path, exist_ok=True)
+        self.reload()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def reload(self):
+        meta = {"rows": 0, "columns": self.columns}
+        if os.path.exists(self._file("meta.json")):
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+        if meta["columns"] != self.columns:
+            raise ValueError(f"{self.path} holds columns {meta['columns']}, expected {self.columns}")
+        self.rows = meta["rows"]
+        keys = np.fromfile(self._file("keys.bin"), dtype=np.uint8, count=self.rows * DIGEST_BYTES) \
+            if self.rows else np.zeros(0, np.uint8)
+        self.index = {k.tobytes(): i for i, k in enumerate(keys.reshape(-1, DIGEST_BYTES))}
+
+    def lookup(self, digests):
+        """Slot of every digest, -1 where the row has never been computed."""
+        return np.array([self.index.get(d, -1) for d in digests], dtype=np.int64)
+
+    def values(self, slots):
+        if not len(slots):
+            return np.zeros((0, len(self.columns)), np.float32)
+        data = np.memmap(self._file("values.bin"), dtype="<f4", mode="r", shape=(self.rows, len(self.columns)))
+        return np.asarray(data[slots])
+
+    def append(self, digests, values):
+        values = np.asarray(values, dtype="<f4").reshape(len(digests), len(self.columns))
+        fresh, seen = [], set()
+        for i, d in enumerate(digests):
+            if d not in self.index and d not in seen:
+                fresh.append(i)
+                seen.add(d)
+        if not fresh:
+            return 0
+        # Bytes past meta["rows"] are leftovers of an interrupted append: overwrite them
+        for name, payload, width in (("keys.bin", b"".join(digests[i] for i in fresh), DIGEST_BYTES),
+                                     ("values.bin", values[fresh].tobytes(), 4 * len(self.columns))):
+            with open(self._file(name), "r+b" if os.path.exists(self._file(name)) else "w+b") as f:
+                f.truncate(self.rows * width)
+                f.seek(self.rows * width)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"rows": self.rows + len(fresh), "columns": self.columns}, f)
+        os.replace(tmp, self._file("meta.json"))
+        for offset, i in enumerate(fresh):
+            self.index[digests[i]] = self.rows + offset
+        self.rows += len(fresh)
+        return len(fresh)
+
+# ==================================================
+# 2. TRAINER HOOK
+# ==================================================
+def precompute_columns(trainer, dataset, columns, compute, root=REF_LOGPS_DIR):
+    """
+    Add the reference log-prob `columns` to `dataset`, running `compute(subset) -> [array per column]`
+    only on rows the store has not seen for this reference model.
+    """
+    fields = row_fields(dataset)
+    digests = [row_digest(row, fields) for row in dataset.select_columns(fields)]
+    store = RefLogpStore(os.path.join(root, reference_key(trainer, columns)), columns)
+    slots = store.lookup(digests)
+    missing = np.flatnonzero(slots < 0)
+    if len(missing):
+        computed = np.stack([np.asarray(c, dtype=np.float32) for c in compute(dataset.select(missing))], axis=1)
+        if trainer.accelerator.is_main_process:
+            store.append([digests[i] for i in missing], computed)
+        trainer.accelerator.wait_for_everyone()
+        store.reload()
+        slots = store.lookup(digests)
+    print(f"[✔] Reference logps: {len(digests) - len(missing)}/{len(digests)} rows from {store.path}, "
+          f"{len(missing)} computed")
+    values = store.values(slots)
+    for j, name in enumerate(columns):
+        dataset = dataset.add_column(name=name, column=values[:, j])
+    return dataset
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else REF_LOGPS_DIR
+    if not os.path.isdir(root):
+        print(f"❌ No reference log-prob stores under {root}")
+        sys.exit(0)
+    print(f"🪞 Reference log-prob stores under {root}:")
+    for name in sorted(os.listdir(root)):
+        meta_path = os.path.join(root, name, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            size = os.path.getsize(os.path.join(root, name, "values.bin")) / 1024
+            print(f"   {name}: {meta['rows']} rows x {meta['columns']} ({size:.0f} KiB)")
@@ -0,0 +1,307 @@
+import sys
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import torch
+
+# ==================================================
+# 🌾 TITAN FORGE: STREAMING GRPO ROLLOUTS (MUD FARMING)
+# Score a completion the moment it finishes. Hold a window, not the whole harvest.
+# ==================================================
+#
+# Collect-then-score keeps num_generations x batch rollouts alive until the last
+# one is generated, then runs every reward function over all of them. Here:
+#   1. the decode loop hands a row to the scorer as soon as it hits EOS
+#   2. reward functions run in a thread (or process) pool while decoding goes on
+#   3. each group's mean/std is accumulated online (Welford); when its
+#      num_generations members are scored, its advantages are emitted and the
+#      rollouts leave memory
+# At most `window` rollouts are in flight (generated, not yet emitted): submit()
+# blocks on the oldest score when the window is full. window >= num_generations.
+#
+# Advantages match the trainer (UnslothGRPOTrainer._generate_and_score_completions):
+#   (r - group mean) / (std + 1e-4), std = group std ("group"), running std of every
+#   reward so far ("batch"), or not divided ("none").
+#
+# In the trainer: GRPOConfig(rollout_window=N) generates the batch N rows (whole groups)
+# at a time and submits every window to this scorer, so reward functions score one
+# window while the next is generating. Group-scaled ("group" / "none") advantages come
+# from the running stats; "batch" divides by the final whole-batch std in the trainer,
+# so rollout_window never changes the objective.
+#
+#   python titan_rollout.py [--window 32] [--workers 4]   -> tiny Qwen3 on CPU, collect-then-score vs. streaming
+
+SEED = 3407
+ROLLOUT_WINDOW = 64
+REWARD_WORKERS = 4
+
+class RunningStats:
+    """Welford mean / unbiased variance."""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def update(self, x):
+        if math.isnan(x):
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float("nan")
+
+class Rollout:
+    __slots__ = ("group", "index", "key", "prompt", "completion", "completion_ids", "kwargs", "rewards", "reward",
+                 "advantage")
+
+    def __init__(self, group, index, prompt, completion, completion_ids, kwargs, key=None):
+        self.group, self.index, self.key = group, index, key
+        self.prompt, self.completion, self.completion_ids, self.kwargs = prompt, completion, completion_ids, kwargs
+        self.rewards, self.reward, self.advantage = None, None, None
+
+def _score(reward_funcs, weights, prompt, completion, completion_ids, kwargs, shared):
+    # Module-level so a ProcessPoolExecutor can pickle it (reward functions must be top-level then)
+    rewards = []
+    for func in reward_funcs:
+        out = func(prompts=[prompt], completions=[completion], completion_ids=[completion_ids],
+                   **{k: [v] for k, v in kwargs.items()}, **shared)[0]
+        rewards.append(float("nan") if out is None else float(out))
+    total = sum(w * r for w, r in zip(weights, rewards) if not math.isnan(r))
+    return rewards, total
+
+# ==================================================
+# 1. THE SCORER
+# ==================================================
+class StreamingRolloutScorer:
+    def __init__(self, reward_funcs, num_generations, reward_weights=None, window=ROLLOUT_WINDOW,
+                 workers=REWARD_WORKERS, executor="thread", scale_rewards="group", shared_kwargs=None):
+        """shared_kwargs are passed to every reward call as-is (e.g. trainer_state), not per row."""
+        if window < num_generations:
+            raise ValueError(f"window ({window}) must hold at least one group ({num_generations} generations)")
+        if scale_rewards not in ("group", "batch", "none"):
+            raise ValueError(f"Invalid value for scale_rewards: {scale_rewards}. Must be one of 'batch', 'group', or 'none'.")
+        self.reward_funcs = list(reward_funcs)
+        self.weights = list(reward_weights) if reward_weights is not None else [1.0] * len(self.reward_funcs)
+        self.num_generations = num_generations
+        self.window = window
+        self.scale_rewards = scale_rewards
+        self.shared_kwargs = dict(shared_kwargs or {})
+        self.pool = (ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor)(workers)
+        self.pending = deque()   # (rollout, future), submission order
+        self.groups = {}         # group -> (RunningStats, [scored rollouts])
+        self.ready = deque()     # finished groups
+        self.batch_stats = RunningStats()
+        self.func_stats = [RunningStats() for _ in self.reward_funcs]
+        self.held = 0
+        self.peak_held = 0
+        self.scored = 0
+
+    def submit(self, group, prompt, completion, completion_ids, key=None, **kwargs):
+        """
+        Queue one finished completion for scoring (`key` identifies it to the caller, e.g. its batch row).
+        Blocks while `window` rollouts are in flight.
+        """
+        while self.held >= self.window and self.pending:
+            self._collect(block=True)
+        rollout = Rollout(group, 0, prompt, completion, completion_ids, kwargs, key)
+        future = self.pool.submit(_score, self.reward_funcs, self.weights, prompt, completion, completion_ids, kwargs,
+                                  self.shared_kwargs)
+        self.pending.append((rollout, future))
+        self.held += 1
+        self.peak_held = max(self.peak_held, self.held)
+        self._collect(block=False)
+
+    def _collect(self, block):
+        if block and self.pending:
+            wait([f for _, f in self.pending], return_when=FIRST_COMPLETED)
+        still = deque()
+        for rollout, future in self.pending:
+            if not future.done():
+                still.append((rollout, future))
+                continue
+            rollout.rewards, rollout.reward = future.result()
+            self.scored += 1
+            for stats, r in zip(self.func_stats, rollout.rewards):
+                stats.update(r)
+            self.batch_stats.update(rollout.reward)
+            stats, members = self.groups.setdefault(rollout.group, (RunningStats(), []))
+            rollout.index = len(members)
+            stats.update(rollout.reward)
+            members.append(rollout)
+            if len(members) == self.num_generations:
+                self._finish(rollout.group)
+        self.pending = still
+
+    def _finish(self, group):
+        stats, members = self.groups.pop(group)
+        std = stats.std if self.scale_rewards == "group" else self.batch_stats.std
+        for rollout in members:
+            rollout.advantage = rollout.reward - stats.mean
+            if self.scale_rewards != "none":
+                rollout.advantage /= (0.0 if math.isnan(std) else std) + 1e-4
+        self.held -= len(members)
+        self.ready.append((group, members))
+
+    def results(self):
+        """Groups whose advantages are final: [(group, [Rollout])], each emitted once."""
+        self._collect(block=False)
+        while self.ready:
+            yield self.ready.popleft()
+
+    def close(self):
+        """Wait for every queued score; returns the last groups. Incomplete groups are dropped."""
+        while self.pending:
+            self._collect(block=True)
+        self.pool.shutdown()
+        return list(self.results())
+
+    def metrics(self):
+        return {
+            "scored": self.scored,
+            "peak_in_flight": self.peak_held,
+            "reward": self.batch_stats.mean,
+            "reward_std": self.batch_stats.std,
+            **{f"rewards/{getattr(f, '__name__', i)}/mean": s.mean for i, (f, s) in enumerate(zip(self.reward_funcs, self.func_stats))},
+        }
+
+def score_batch(reward_funcs, prompts, completions, completion_ids, reward_kwargs, workers=REWARD_WORKERS,
+                chunk=ROLLOUT_WINDOW):
+    """
+    Trainer-side scoring (whole batch already generated): every (reward function, chunk of rows) is
+    one task in a thread pool, so slow verifiers run side by side. Returns rewards[row][func] (None kept).
+    """
+    rows = len(prompts)
+    out = [[None] * len(reward_funcs) for _ in range(rows)]
+    with ThreadPoolExecutor(workers) as pool:
+        tasks = {}
+        for i, func in enumerate(reward_funcs):
+            for start in range(0, rows, chunk):
+                end = min(start + chunk, rows)
+                kwargs = {k: (v[start:end] if isinstance(v, list) else v) for k, v in reward_kwargs.items()}
+                future = pool.submit(func, prompts=prompts[start:end], completions=completions[start:end],
+                                     completion_ids=completion_ids[start:end], **kwargs)
+                tasks[future] = (i, start)
+        for future, (i, start) in tasks.items():
+            for offset, reward in enumerate(future.result()):
+                out[start + offset][i] = reward
+    return out
+
+# ==================================================
+# 2. STREAMING DECODE
+# ==================================================
+@torch.no_grad()
+def stream_rollouts(model, prompt_ids, scorer, num_generations, max_new_tokens=64, eos_token_id=None,
+                    pad_token_id=0, temperature=1.0, decode=None, seed=SEED):
+    """
+    Sample `num_generations` completions per prompt, submitting each row to `scorer` as soon as it
+    finishes. Prompts are decoded window // num_generations at a time. Yields finished groups.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    device = next(model.parameters()).device
+    per_batch = max(1, scorer.window // num_generations)
+    for first in range(0, len(prompt_ids), per_batch):
+        groups = list(range(first, min(first + per_batch, len(prompt_ids))))
+        rows = [prompt_ids[g] for g in groups for _ in range(num_generations)]
+        owner = [g for g in groups for _ in range(num_generations)]
+        longest = max(len(r) for r in rows)
+        ids = torch.tensor([[pad_token_id] * (longest - len(r)) + list(r) for r in rows], device=device)
+        mask = torch.tensor([[0] * (longest - len(r)) + [1] * len(r) for r in rows], device=device)
+
+        finished = [False] * len(rows)
+        generated = [[] for _ in rows]
+        past, step_ids = None, ids
+        for t in range(max_new_tokens):
+            position_ids = (mask.cumsum(-1) - 1).clamp(min=0)[:, -step_ids.shape[1]:]
+            out = model(input_ids=step_ids, attention_mask=mask, position_ids=position_ids,
+                        past_key_values=past, use_cache=True)
+            past = out.past_key_values
+            probs = torch.softmax(out.logits[:, -1].float().cpu() / temperature, dim=-1)
+            next_ids = torch.multinomial(probs, 1, generator=generator).squeeze(1)
+            for r, token in enumerate(next_ids.tolist()):
+                if finished[r]:
+                    continue
+                generated[r].append(token)
+                if token == eos_token_id or t == max_new_tokens - 1:
+                    finished[r] = True
+                    prompt = decode(rows[r]) if decode else rows[r]
+                    completion = decode(generated[r]) if decode else generated[r]
+                    scorer.submit(owner[r], prompt, completion, generated[r])
+                    generated[r] = None  # the scorer owns it now
+            yield from scorer.results()
+            if all(finished):
+                break
+            step_ids = next_ids.unsqueeze(1).to(device)
+            mask = torch.cat([mask, torch.ones_like(mask[:, :1])], dim=1)
+        del past
+    yield from scorer.close()
+
+# ==================================================
+# 3. CPU BENCHMARK (tiny policy)
+# ==================================================
+def _distinct_reward(prompts, completions, completion_ids, **kwargs):
+    return [len(set(ids)) / max(len(ids), 1) for ids in completion_ids]
+
+def _verifier_reward(prompts, completions, completion_ids, **kwargs):
+    time.sleep(0.002 * len(completion_ids))  # a slow external check (sandboxed run, 32B judge, ...)
+    return [float(sum(ids) % 7 == 0) for ids in completion_ids]
+
+def benchmark(prompts=32, num_generations=8, max_new_tokens=48, window=32, workers=4):
+    from transformers import Qwen3Config, Qwen3ForCausalLM
+
+    torch.manual_seed(SEED)
+    config = Qwen3Config(vocab_size=512, hidden_size=128, intermediate_size=384, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, head_dim=32)
+    model = Qwen3ForCausalLM(config).eval()
+    eos = 1
+    rng = torch.Generator().manual_seed(SEED)
+    prompt_ids = [torch.randint(2, 512, (int(torch.randint(4, 24, (1,), generator=rng)),), generator=rng).tolist()
+                  for _ in range(prompts)]
+    funcs = [_distinct_reward, _verifier_reward]
+
+    # Collect-then-score: the same decode batches, but every rollout is held until the end
+    start = time.perf_counter()
+    collected = []
+    class _Collect:
+        def __init__(self):
+            self.window = window
+        def submit(self, group, prompt, completion, completion_ids, key=None):
+            collected.append((group, completion_ids))
+        def results(self):
+            return iter(())
+        def close(self):
+            return []
+    list(stream_rollouts(model, prompt_ids, _Collect(), num_generations, max_new_tokens, eos))
+    collected.sort(key=lambda x: x[0])
+    rewards = torch.tensor([
+        sum(f(None, None, [ids])[0] for f in funcs) for _, ids in collected
+    ])
+    grouped = rewards.view(-1, num_generations)
+    baseline = (rewards - grouped.mean(1).repeat_interleave(num_generations)) / \
+               (grouped.std(1).repeat_interleave(num_generations) + 1e-4)
+    base_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scorer = StreamingRolloutScorer(funcs, num_generations, window=window, workers=workers)
+    streamed = {}
+    for group, members in stream_rollouts(model, prompt_ids, scorer, num_generations, max_new_tokens, eos):
+        streamed[group] = sorted(r.advantage for r in members)
+    stream_time = time.perf_counter() - start
+
+    diff = max(abs(a - b) for g in range(prompts)
+               for a, b in zip(streamed[g], sorted(baseline[g * num_generations:(g + 1) * num_generations].tolist())))
+    print(f"   collect-then-score: {base_time:6.2f}s, {len(collected)} rollouts held at peak")
+    print(f"   streaming         : {stream_time:6.2f}s, {scorer.peak_held} rollouts held at peak "
+          f"(window {window}, {workers} reward workers)")
+    print(f"   max |advantage diff|: {diff:.2e}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    print("🌾 STREAMING GRPO ROLLOUTS (CPU, tiny Qwen3)")
+    benchmark(window=int(option("--window", 32)), workers=int(option("--workers", 4)))
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import random
+import torch
+
+# ==================================================
+# 🌊 TITAN FORGE: STREAMING JSONL READER
+# Millions of "mud" samples, never more than a shuffle buffer in RAM.
+# ==================================================
+#
+# Sharding is by BYTE RANGE: shard k of n owns the lines that START inside
+# [size*k/n, size*(k+1)/n). No line counting, no index file, and every shard
+# can seek straight to its range. Shards = ranks x DataLoader workers.
+#
+# Each record is validated when it is read (not up front). Bad lines raise
+# SchemaError with the byte offset, or are skipped and counted (on_error="skip").
+#
+# Resumption is exact: the state of a shard is the read cursor (a byte offset),
+# the byte offsets of the records sitting in the shuffle buffer and the RNG
+# state. Restoring re-reads those few records by seeking to them.
+#
+#   python titan_stream.py [titan_dataset_complete.jsonl]   -> validate + shard stats
+
+SCHEMA = {"instruction": str, "output": str}
+SHUFFLE_BUFFER = 10_000
+SEED = 3407
+
+class SchemaError(ValueError):
+    pass
+
+def validate(record, schema=SCHEMA, where=""):
+    if not isinstance(record, dict):
+        raise SchemaError(f"{where}: expected a JSON object, got {type(record).__name__}")
+    for field, kind in schema.items():
+        if field not in record:
+            raise SchemaError(f"{where}: missing field {field!r}")
+        if not isinstance(record[field], kind):
+            raise SchemaError(f"{where}: field {field!r} is {type(record[field]).__name__}, expected {kind.__name__}")
+        if kind is str and not record[field].strip():
+            raise SchemaError(f"{where}: field {field!r} is empty")
+    return record
+
+def shard_range(path, shard=0, num_shards=1):
+    size = os.path.getsize(path)
+    return size * shard // num_shards, size * (shard + 1) // num_shards
+
+def _align(f, offset):
+    """First line start at or after `offset` (a line starting exactly at `offset` belongs to this range)."""
+    if offset == 0:
+        return 0
+    f.seek(offset - 1)
+    f.readline()
+    return f.tell()
+
+def read_at(path, offset, schema=SCHEMA):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return validate(json.loads(f.readline()), schema, f"{path}@{offset}")
+
+def iter_records(path, start=0, end=None, schema=SCHEMA, on_error="raise", stats=None):
+    """Yield (offset, record) for every line starting in [start, end), validated lazily."""
+    with open(path, "rb") as f:
+        offset = _align(f, start)
+        f.seek(offset)
+        end = os.path.getsize(path) if end is None else end
+        while offset < end:
+            line = f.readline()
+            if not line:
+                break
+            here, offset = offset, f.tell()
+            if not line.strip():
+                continue
+            try:
+                record = validate(json.loads(line), schema, f"{path}@{here}")
+            except (SchemaError, json.JSONDecodeError) as e:
+                if on_error != "skip":
+                    raise SchemaError(str(e)) from e
+                if stats is not None:
+                    stats["skipped"] = stats.get("skipped", 0) + 1
+                continue
+            yield here, record
+
+# ==================================================
+# 1. ONE SHARD (shuffle buffer + resumable state)
+# ==================================================
+class ShardReader:
+    def __init__(self, path, shard=0, num_shards=1, schema=SCHEMA, shuffle_buffer=SHUFFLE_BUFFER,
+                 seed=SEED, epoch=0, on_error="raise"):
+        self.path = path
+        self.schema = schema
+        self.start, self.end = shard_range(path, shard, num_shards)
+        self.shuffle_buffer = shuffle_buffer
+        self.on_error = on_error
+        self.rng = random.Random(f"{seed}:{epoch}:{shard}:{num_shards}")
+        self.cursor = self.start
+        self.buffer = []  # [(offset, record)]
+        self.stats = {"skipped": 0}
+
+    def state_dict(self):
+        return {
+            "cursor": self.cursor,
+            "buffer": [offset for offset, _ in self.buffer],
+            "rng": self.rng.getstate(),
+            "stats": dict(self.stats),
+        }
+
+    def load_state_dict(self, state):
+        self.cursor = state["cursor"]
+        self.buffer = [(offset, read_at(self.path, offset, self.schema)) for offset in state["buffer"]]
+        version, internal, gauss = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+        self.stats = dict(state.get("stats", {"skipped": 0}))
+
+    def __iter__(self):
+        for offset, record in iter_records(self.path, self.cursor, self.end, self.schema, self.on_error, self.stats):
+            # Resume point = the line after this one (it is already in the buffer or emitted)
+            self.cursor = offset + 1
+            if self.shuffle_buffer <= 1:
+                yield record
+                continue
+            self.buffer.append((offset, record))
+            if len(self.buffer) >= self.shuffle_buffer:
+                yield self._pop()
+        self.cursor = self.end
+        while self.buffer:
+            yield self._pop()
+
+    def _pop(self):
+        i = self.rng.randrange(len(self.buffer))
+        self.buffer[i], self.buffer[-1] = self.buffer[-1], self.buffer[i]
+        return self.buffer.pop()[1]
+
+# ==================================================
+# 2. THE DATASET (ranks x DataLoader workers)
+# ==================================================
+class JsonlStream(torch.utils.data.IterableDataset):
+    """
+    Streaming instruction/output corpus. Rank/world size default to the
+    torchrun environment (RANK, WORLD_SIZE); DataLoader workers split each
+    rank's share further. `transform` maps a record to a training example.
+    """
+
+    def __init__(self, path, schema=SCHEMA, shuffle_buffer=SHUFFLE_BUFFER, seed=SEED, rank=None,
+                 world_size=None, transform=None, on_error="raise"):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Dataset not found at {path}")
+        self.path = path
+        self.schema = schema
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.rank = int(os.environ.get("RANK", 0)) if rank is None else rank
+        self.world_size = int(os.environ.get("WORLD_SIZE", 1)) if world_size is None else world_size
+        self.transform = transform
+        self.on_error = on_error
+        self.epoch = 0
+        self.resume = {}   # shard -> state
+        self.readers = {}  # shard -> live ShardReader (in-process iteration only)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _shard(self):
+        info = torch.utils.data.get_worker_info()
+        workers, worker = (info.num_workers, info.id) if info is not None else (1, 0)
+        return self.rank * workers + worker, self.world_size * workers
+
+    def __iter__(self):
+        shard, num_shards = self._shard()
+        reader = ShardReader(self.path, shard, num_shards, self.schema, self.shuffle_buffer,
+                             self.seed, self.epoch, self.on_error)
+        if shard in self.resume:
+            reader.load_state_dict(self.resume.pop(shard))
+        self.readers[shard] = reader
+        for record in reader:
+            yield self.transform(record) if self.transform else record
+
+    def state_dict(self):
+        """Resumable position of every shard iterated in this process (JSON-serialisable)."""
+        return {"epoch": self.epoch, "shards": {str(k): r.state_dict() for k, r in self.readers.items()}}
+
+    def load_state_dict(self, state):
+        self.epoch = state["epoch"]
+        self.resume = {int(k): v for k, v in state["shards"].items()}
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "titan_dataset_complete.jsonl"
+    shards = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"🌊 Validating {path} ({os.path.getsize(path) / 1024:.0f} KiB) across {shards} byte-range shards...")
+    total = 0
+    for shard in range(shards):
+        stats = {}
+        count = sum(1 for _ in iter_records(path, *shard_range(path, shard, shards), on_error="skip", stats=stats))
+        total += count
+        print(f"   shard {shard}: {count} records, {stats.get('skipped', 0)} invalid")
+    print(f"[✔] {total} valid records")
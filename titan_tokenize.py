@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from akasha_anchor_cache import tokenizer_hash
+from titan_stream import iter_records, SCHEMA
+
+# ==================================================
+# 🏭 TITAN FORGE: PARALLEL TOKENISATION + SHARD CACHE
+# Every core tokenises once. The SFT path reads the shards.
+# ==================================================
+#
+# The corpus is cut into CHUNKS of ~CHUNK_BYTES at line boundaries, counted from
+# the start of the file (so appending samples leaves earlier chunks untouched).
+# Each chunk is rendered with the chat template and batch-encoded by a fast
+# tokenizer in a process pool, one worker per core.
+#
+# Shards are CONTENT-ADDRESSED:
+#     key = sha256(chunk bytes, tokenizer files, template)
+#     .akasha_cache/tokens/<key>/  tokens.bin int32 [n_tokens] | offsets.bin int64 [n_docs + 1] | meta.json
+# An unchanged corpus with an unchanged tokenizer (vocab.json, merges.txt,
+# chat_template.jinja, ...) and template does zero tokenisation: every chunk is a hit.
+#
+# Scope: SFT only. The shards hold instruction/output samples rendered with ONE
+# template, read by titan_pack / titan_batching for train_titan_dora_qwen3.py. The
+# DPO, KTO, ... trainers in unsloth_compiled_cache/ still tokenise their own
+# prompt/chosen/rejected columns.
+#
+#   python titan_tokenize.py [titan_dataset_complete.jsonl] [--workers N] [--tokenizer titan_dora_adapters]
+
+TOKENS_DIR = os.environ.get("AKASHA_TOKENS", ".akasha_cache/tokens")
+CHUNK_BYTES = 8 * 1024 * 1024
+ENCODE_BATCH = 1024
+TOKENIZER_DIR = "titan_dora_adapters"
+
+def chunk_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """[(start, end)] byte ranges of ~chunk_bytes, each ending right after a newline."""
+    size = os.path.getsize(path)
+    ranges, start = [], 0
+    with open(path, "rb") as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size) if start + chunk_bytes < size else size
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def chunk_key(path, start, end, tokenizer_id, template_id):
+    digest = hashlib.sha256(f"{tokenizer_id}:{template_id}:".encode("utf-8"))
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()[:24]
+
+# ==================================================
+# 1. WORKERS
+# ==================================================
+_worker = {}
+
+def _init_worker(tokenizer, template, max_length):
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"  # the pool is the parallelism
+    _worker.update(tokenizer=tokenizer, template=template, max_length=max_length)
+
+def _tokenize_chunk(path, start, end, out_dir):
+    tokenizer, template, max_length = _worker["tokenizer"], _worker["template"], _worker["max_length"]
+    eos = tokenizer.eos_token
+    lengths, pieces, batch = [], [], []
+
+    def flush():
+        for ids in tokenizer(batch, add_special_tokens=False)["input_ids"]:
+            ids = ids[:max_length] if max_length else ids
+            pieces.append(np.asarray(ids, dtype="<i4"))
+            lengths.append(len(ids))
+        batch.clear()
+
+    for _, record in iter_records(path, start, end, SCHEMA):
+        batch.append(template.format(instruction=record["instruction"], output=record["output"], eos=eos))
+        if len(batch) == ENCODE_BATCH:
+            flush()
+    if batch:
+        flush()
+
+    root = os.path.dirname(out_dir)
+    work = tempfile.mkdtemp(dir=root, prefix=".shard-")
+    try:
+        tokens = np.concatenate(pieces) if pieces else np.zeros(0, "<i4")
+        tokens.tofile(os.path.join(work, "tokens.bin"))
+        np.concatenate([[0], np.cumsum(lengths)]).astype("<i8").tofile(os.path.join(work, "offsets.bin"))
+        with open(os.path.join(work, "meta.json"), "w") as f:
+            json.dump({"docs": len(lengths), "tokens": int(tokens.size), "source": os.path.abspath(path),
+                       "range": [start, end]}, f)
+        if os.path.exists(out_dir):
+            shutil.rmtree(work)  # another run got there first
+        else:
+            os.replace(work, out_dir)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    return len(lengths)
+
+# ==================================================
+# 2. SHARD READER
+# ==================================================
+class TokenShard:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.offsets = np.fromfile(os.path.join(path, "offsets.bin"), dtype="<i8")
+        self.tokens = (np.memmap(os.path.join(path, "tokens.bin"), dtype="<i4", mode="r")
+                       if self.meta["tokens"] else np.zeros(0, "<i4"))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+class TokenizedCorpus:
+    """All shards of a corpus in file order; docs are zero-copy memmap views."""
+
+    def __init__(self, shard_dirs):
+        self.shards = [TokenShard(d) for d in shard_dirs]
+        self.lengths = np.concatenate([s.lengths for s in self.shards]) if self.shards else np.zeros(0, np.int64)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __iter__(self):
+        for shard in self.shards:
+            for i in range(len(shard)):
+                yield shard[i]
+
+    def docs(self):
+        return list(self)
+
+def tokenize_corpus(path, tokenizer, template, max_length=None, workers=None, root=TOKENS_DIR,
+                    chunk_bytes=CHUNK_BYTES):
+    """Tokenise `path` into content-addressed shards (only chunks not cached yet). Returns a TokenizedCorpus."""
+    os.makedirs(root, exist_ok=True)
+    tokenizer_id = tokenizer_hash(tokenizer)
+    template_id = hashlib.sha256(f"{template}:{tokenizer.eos_token}:{max_length}".encode("utf-8")).hexdigest()
+    ranges = chunk_ranges(path, chunk_bytes)
+    shard_dirs = [os.path.join(root, chunk_key(path, s, e, tokenizer_id, template_id)) for s, e in ranges]
+    todo = [(s, e, d) for (s, e), d in zip(ranges, shard_dirs) if not os.path.exists(os.path.join(d, "meta.json"))]
+
+    start = time.perf_counter()
+    if todo:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(tokenizer, template, max_length)) as pool:
+            futures = [pool.submit(_tokenize_chunk, path, s, e, d) for s, e, d in todo]
+            docs = sum(f.result() for f in futures)
+        print(f"[✔] Tokenised {docs} samples in {len(todo)}/{len(ranges)} new shards "
+              f"({workers} workers) in {time.perf_counter() - start:.2f}s")
+    else:
+        print(f"[✔] All {len(ranges)} token shards cached; no tokenisation needed")
+    return TokenizedCorpus(shard_dirs)
+
+if __name__ == "__main__":
+    from transformers import AutoTokenizer
+    from titan_pack import TEMPLATE, DATASET_FILE
+
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    corpus_path = args[0] if args and not args[0].startswith("--") else DATASET_FILE
+    tokenizer = AutoTokenizer.from_pretrained(option("--tokenizer", TOKENIZER_DIR))
+    workers = int(option("--workers", 0)) or None
+    corpus = tokenize_corpus(corpus_path, tokenizer, TEMPLATE, workers=workers)
+    print(f"🏭 {len(corpus)} samples, {int(corpus.lengths.sum())} tokens across {len(corpus.shards)} shards")
@@ -6,10 +6,11 @@ Designed to run in WSL2 with files copied to ~/akasha_lab/
 """
 from unsloth import FastLanguageModel
 import torch
-from datasets import load_dataset
 from trl import SFTTrainer
 from transformers import TrainingArguments
 import os
+from titan_pack import build_packed, tokenize_corpus, PackedDataset, PackedCollator
+from titan_batching import TokenizedDataset, PaddedCollator, bucketing_report
 
 # ==============================================================================
 # 1. CONFIGURATION (Linux/WSL2 Compatible)
@@ -21,6 +22,9 @@ DATASET_FILE = "./titan_dataset_complete.jsonl"  # Relative path
 OUTPUT_DIR = "./titan_dora_adapters"
 MAX_SEQ_LENGTH = 2048
 LOAD_IN_4BIT = True  # 4-bit for VRAM efficiency on 1.7B
+PACKING = True  # False -> one sample per row, length-bucketed batches under a token budget
+MAX_TOKENS_PER_BATCH = 4096  # only used with PACKING = False
+LOGITS_BUDGET_BYTES = 256 * 1024 * 1024  # float32 logits in flight for the loss (151k vocab), None -> model's own loss
 
 print("=" * 60)
 print("TITAN FORGE: INITIALIZING (WSL2 Mode)")
@@ -70,26 +74,25 @@ model = FastLanguageModel.get_peft_model(
 # ==============================================================================
 # 4. PREPARE DATA
 # ==============================================================================
-print("[+] Loading Dataset...")
-dataset = load_dataset("json", data_files=DATASET_FILE, split="train")
-print(f"    Loaded {len(dataset)} examples")
-
-def formatting_prompts_func(examples):
-    instructions = examples["instruction"]
-    outputs      = examples["output"]
-    texts = []
-    
-    eos = tokenizer.eos_token 
-
-    for instruction, output in zip(instructions, outputs):
-        text = (
-            f"<|im_start|>user\n{instruction}<|im_end|>\n"
-            f"<|im_start|>assistant\n{output}<|im_end|>{eos}" 
-        )
-        texts.append(text)
-    return { "text" : texts }
-
-dataset = dataset.map(formatting_prompts_func, batched = True)
+# Tokenised + bin-packed ONCE into a memory-mapped cache (keyed by corpus, tokenizer
+# and template hash); every later launch is a cache hit. See titan_pack.py.
+if PACKING:
+    print("[+] Loading Packed Dataset...")
+    packed_dir = build_packed(DATASET_FILE, tokenizer, MAX_SEQ_LENGTH)
+    dataset = PackedDataset(packed_dir)
+    # Rows are already packed: block-diagonal mask + restarted position_ids per sample
+    data_collator = PackedCollator(torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16)
+    print(f"    {dataset.meta['documents']} examples packed into {len(dataset)} rows "
+          f"({dataset.meta['fill']:.1%} real tokens)")
+else:
+    # One sample per row; the trainer groups similar lengths under MAX_TOKENS_PER_BATCH (titan_batching.py)
+    print("[+] Loading Tokenised Dataset...")
+    dataset = TokenizedDataset(tokenize_corpus(DATASET_FILE, tokenizer, MAX_SEQ_LENGTH))
+    data_collator = PaddedCollator(tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id)
+    report = bucketing_report(dataset.lengths, batch_size=2, max_tokens=MAX_TOKENS_PER_BATCH)
+    print(f"    Loaded {len(dataset)} examples")
+    print(f"    Padding efficiency: {report['fixed']:.1%} (batch size 2) -> {report['bucketed']:.1%} "
+          f"({MAX_TOKENS_PER_BATCH} tokens/batch, avg {report['mean_batch_size']:.1f} rows)")
 
 # ==============================================================================
 # 5. START TRAINING
@@ -98,29 +101,37 @@ print("\n" + "=" * 60)
 print("STARTING QWEN 3 1.7B DoRA TRAINING")
 print("=" * 60)
 
+training_args = TrainingArguments(
+    per_device_train_batch_size = 2,
+    remove_unused_columns = False,
+    gradient_accumulation_steps = 4,
+    warmup_steps = 5,
+    max_steps = 60,
+    learning_rate = 2e-4,
+    fp16 = not torch.cuda.is_bf16_supported(),
+    bf16 = torch.cuda.is_bf16_supported(),
+    logging_steps = 1,
+    optim = "adamw_8bit",
+    weight_decay = 0.01,
+    lr_scheduler_type = "linear",
+    seed = 3407,
+    output_dir = OUTPUT_DIR,
+)
+if not PACKING:
+    # Replaces per_device_train_batch_size with a token budget (UnslothSFTTrainer.get_train_dataloader)
+    training_args.max_tokens_per_batch = MAX_TOKENS_PER_BATCH
+# Loss from hidden states in budget-sized slices (titan_logsoftmax.py)
+training_args.logits_budget_bytes = LOGITS_BUDGET_BYTES
+
 trainer = SFTTrainer(
     model = model,
     tokenizer = tokenizer,
     train_dataset = dataset,
-    dataset_text_field = "text",
+    data_collator = data_collator,
+    dataset_kwargs = {"skip_prepare_dataset": True},
     max_seq_length = MAX_SEQ_LENGTH,
-    dataset_num_proc = 2,
     packing = False,
-    args = TrainingArguments(
-        per_device_train_batch_size = 2,
-        gradient_accumulation_steps = 4,
-        warmup_steps = 5,
-        max_steps = 60,
-        learning_rate = 2e-4,
-        fp16 = not torch.cuda.is_bf16_supported(),
-        bf16 = torch.cuda.is_bf16_supported(),
-        logging_steps = 1,
-        optim = "adamw_8bit",
-        weight_decay = 0.01,
-        lr_scheduler_type = "linear",
-        seed = 3407,
-        output_dir = OUTPUT_DIR,
-    ),
+    args = training_args,
 )
 
 trainer.train()
@@ -158,11 +158,9 @@ def left_pack_padding(tensor: torch.Tensor, pad_id: int) -> torch.Tensor:
     """
     Moves all padding tokens in each sequence of a batch to the right.
     """
-    mask = (tensor != pad_id)
-    # Must do stable=True since binary mark is unordered
-    sorted_indices = torch.argsort(mask, dim=1, descending=True, stable=True)
-    packed_tensor = torch.gather(tensor, 1, sorted_indices)
-    return packed_tensor
+    # Linear-time cumsum scatter instead of a stable argsort (titan_padding)
+    from titan_padding import left_pack_padding as cumsum_left_pack_padding
+    return cumsum_left_pack_padding(tensor, pad_id)
 
 def align_logprobs_with_mask(
     logprob_tensor: torch.Tensor,
@@ -172,44 +170,9 @@ def align_logprobs_with_mask(
     """
     Aligns a log probability tensor with a given attention mask.
     """
-
-    device = logprob_tensor.device
-    batch_size, logprob_seq_len = logprob_tensor.shape
-    mask_seq_len = attention_mask.shape[1]
-
-    padded_logprobs = torch.full(
-        attention_mask.shape,
-        fill_value=pad_value,
-        dtype=logprob_tensor.dtype,
-        device=device
-    )
-
-    left_pad_counts = torch.argmax(attention_mask, dim=1)
-
-    cols = torch.arange(logprob_seq_len, device=device)
-    dest_indices = left_pad_counts.unsqueeze(1) + cols
-
-    # Create destination row indices
-    # Shape: [batch_size, logprob_seq_len]
-    row_indices = torch.arange(batch_size, device=device).unsqueeze(1).expand_as(dest_indices)
-
-    # --- 4. Filter out-of-bounds indices and perform assignment ---
-    # Create a mask to identify only the indices that are within the bounds
-    # of the target tensor's sequence length.
-    valid_mask = dest_indices < mask_seq_len
-
-    # Use this mask to select only the valid row indices, column indices,
-    # and the corresponding values from the logprob tensor.
-    # This flattens the selected elements into 1D tensors.
-    valid_rows = row_indices[valid_mask]
-    valid_cols = dest_indices[valid_mask]
-    valid_vals = logprob_tensor[valid_mask]
-
-    # Place the valid values into their correct positions in the padded tensor
-    # using a single, efficient advanced indexing operation.
-    padded_logprobs[valid_rows, valid_cols] = valid_vals
-
-    return padded_logprobs
+    # One scatter with a spill column instead of index grids + boolean masking (titan_padding)
+    from titan_padding import align_logprobs_with_mask as scatter_align_logprobs_with_mask
+    return scatter_align_logprobs_with_mask(logprob_tensor, attention_mask, pad_value)
 @dataclass
 class UnslothBCOConfig(BCOConfig):
     """
@@ -1211,19 +1174,22 @@ class _UnslothBCOTrainer(BaseTrainer):
                 "shuffle": False,
             }
 
-            # prepare dataloader
-            data_loader = self.accelerator.prepare(DataLoader(self.train_dataset, **dataloader_params))
-            reference_completion_logps = []
+            def compute(dataset):
+                # prepare dataloader
+                data_loader = self.accelerator.prepare(DataLoader(dataset, **dataloader_params))
+                reference_completion_logps = []
 
-            for padded_batch in tqdm(iterable=data_loader, desc="Train dataset reference log probs"):
-                reference_completion_logp = self.compute_reference_log_probs(padded_batch)
+                for padded_batch in tqdm(iterable=data_loader, desc="Train dataset reference log probs"):
+                    reference_completion_logp = self.compute_reference_log_probs(padded_batch)
 
-                reference_completion_logp = self.accelerator.gather_for_metrics(reference_completion_logp)
-                reference_completion_logps.append(reference_completion_logp.cpu())
+                    reference_completion_logp = self.accelerator.gather_for_metrics(reference_completion_logp)
+                    reference_completion_logps.append(reference_completion_logp.cpu())
 
-            self.train_dataset = self.train_dataset.add_column(
-                name="reference_logps", column=torch.cat(reference_completion_logps).float().numpy()
-            )
+                return [torch.cat(reference_completion_logps).float().numpy()]
+
+            # Rows seen before (any run, same reference model) come from the on-disk store (titan_refcache)
+            from titan_refcache import precompute_columns
+            self.train_dataset = precompute_columns(self, self.train_dataset, ["reference_logps"], compute)
 
             self._precomputed_train_ref_log_probs = True
 
@@ -1253,20 +1219,22 @@ class _UnslothBCOTrainer(BaseTrainer):
                 "shuffle": False,
             }
 
-            # prepare dataloader
-            data_loader = self.accelerator.prepare(DataLoader(eval_dataset, **dataloader_params))
+            def compute(dataset):
+                # prepare dataloader
+                data_loader = self.accelerator.prepare(DataLoader(dataset, **dataloader_params))
 
-            reference_completion_logps = []
+                reference_completion_logps = []
 
-            for padded_batch in tqdm(iterable=data_loader, desc="Eval dataset reference log probs"):
-                reference_completion_logp = self.compute_reference_log_probs(padded_batch)
+                for padded_batch in tqdm(iterable=data_loader, desc="Eval dataset reference log probs"):
+                    reference_completion_logp = self.compute_reference_log_probs(padded_batch)
 
-                reference_completion_logp = self.accelerator.gather_for_metrics(reference_completion_logp)
-                reference_completion_logps.append(reference_completion_logp.cpu())
+                    reference_completion_logp = self.accelerator.gather_for_metrics(reference_completion_logp)
+                    reference_completion_logps.append(reference_completion_logp.cpu())
 
-            eval_dataset = eval_dataset.add_column(
-                name="reference_logps", column=torch.cat(reference_completion_logps).float().numpy()
-            )
+                return [torch.cat(reference_completion_logps).float().numpy()]
+
+            from titan_refcache import precompute_columns
+            eval_dataset = precompute_columns(self, eval_dataset, ["reference_logps"], compute)
 
             # Save calculated reference_chosen_logps and reference_rejected_logps to the eval_dataset for subsequent runs
             if self.eval_dataset is not None:
@@ -90,23 +90,10 @@ torch_compile_options = {
     "triton.cudagraphs" : False,
 }
 
-@torch.compile(dynamic = True, fullgraph = True, options = torch_compile_options,)
 def chunked_selective_log_softmax(logits, index):
-    # Split into 4 chunks only
-    chunked_logits = torch.chunk(logits.reshape(-1, logits.shape[-1]), chunks = 4, dim = 0)
-    chunked_index  = torch.chunk(index.reshape(-1), chunks = 4, dim = 0)
-    all_per_token_logps = []
-    # Below loop does the same as selective_log_softmax(chunk_logits, chunk_index)
-    for chunk_logits, chunk_index in zip(chunked_logits, chunked_index):
-        chunk_logits = chunk_logits.to(torch.float32)
-        selected_logits = torch.gather(chunk_logits, dim = -1, index = chunk_index.unsqueeze(-1)).squeeze(-1)
-        logsumexp_values = torch.logsumexp(chunk_logits, dim = -1)
-        per_token_logps = selected_logits - logsumexp_values
-        all_per_token_logps.append(per_token_logps)
-    pass
-    all_per_token_logps = torch.concat(all_per_token_logps)
-    all_per_token_logps = all_per_token_logps.reshape((logits.shape[0], logits.shape[1]))
-    return all_per_token_logps
+    # Chunk count from a logits memory budget, fused slice-by-slice backward (titan_logsoftmax)
+    from titan_logsoftmax import selective_log_softmax as budgeted_selective_log_softmax
+    return budgeted_selective_log_softmax(logits, index)
 
 def calculate_pad_tokens_in_prompt(
     input_ids: torch.Tensor,
@@ -158,11 +145,9 @@ def left_pack_padding(tensor: torch.Tensor, pad_id: int) -> torch.Tensor:
     """
     Moves all padding tokens in each sequence of a batch to the right.
     """
-    mask = (tensor != pad_id)
-    # Must do stable=True since binary mark is unordered
-    sorted_indices = torch.argsort(mask, dim=1, descending=True, stable=True)
-    packed_tensor = torch.gather(tensor, 1, sorted_indices)
-    return packed_tensor
+    # Linear-time cumsum scatter instead of a stable argsort (titan_padding)
+    from titan_padding import left_pack_padding as cumsum_left_pack_padding
+    return cumsum_left_pack_padding(tensor, pad_id)
 
 def align_logprobs_with_mask(
     logprob_tensor: torch.Tensor,
@@ -172,44 +157,9 @@ def align_logprobs_with_mask(
     """
     Aligns a log probability tensor with a given attention mask.
     """
-
-    device = logprob_tensor.device
-    batch_size, logprob_seq_len = logprob_tensor.shape
-    mask_seq_len = attention_mask.shape[1]
-
-    padded_logprobs = torch.full(
-        attention_mask.shape,
-        fill_value=pad_value,
-        dtype=logprob_tensor.dtype,
-        device=device
-    )
-
-    left_pad_counts = torch.argmax(attention_mask, dim=1)
-
-    cols = torch.arange(logprob_seq_len, device=device)
-    dest_indices = left_pad_counts.unsqueeze(1) + cols
-
-    # Create destination row indices
-    # Shape: [batch_size, logprob_seq_len]
-    row_indices = torch.arange(batch_size, device=device).unsqueeze(1).expand_as(dest_indices)
-
-    # --- 4. Filter out-of-bounds indices and perform assignment ---
-    # Create a mask to identify only the indices that are within the bounds
-    # of the target tensor's sequence length.
-    valid_mask = dest_indices < mask_seq_len
-
-    # Use this mask to select only the valid row indices, column indices,
-    # and the corresponding values from the logprob tensor.
-    # This flattens the selected elements into 1D tensors.
-    valid_rows = row_indices[valid_mask]
-    valid_cols = dest_indices[valid_mask]
-    valid_vals = logprob_tensor[valid_mask]
-
-    # Place the valid values into their correct positions in the padded tensor
-    # using a single, efficient advanced indexing operation.
-    padded_logprobs[valid_rows, valid_cols] = valid_vals
-
-    return padded_logprobs
+    # One scatter with a spill column instead of index grids + boolean masking (titan_padding)
+    from titan_padding import align_logprobs_with_mask as scatter_align_logprobs_with_mask
+    return scatter_align_logprobs_with_mask(logprob_tensor, attention_mask, pad_value)
 @dataclass
 class UnslothDPOConfig(DPOConfig):
     """
@@ -1332,29 +1282,30 @@ class _UnslothDPOTrainer(BaseTrainer):
                 "shuffle": False,
             }
 
-            # prepare dataloader
-            data_loader = self.accelerator.prepare(DataLoader(self.train_dataset, **dataloader_params))
+            def compute(dataset):
+                # prepare dataloader
+                data_loader = self.accelerator.prepare(DataLoader(dataset, **dataloader_params))
 
-            ref_chosen_logps = []
-            ref_rejected_logps = []
-            for padded_batch in tqdm(iterable=data_loader, desc="Train dataset reference log probs"):
-                ref_chosen_logp, ref_rejected_logp = self.compute_ref_log_probs(padded_batch)
-                ref_chosen_logp, ref_rejected_logp = self.accelerator.gather_for_metrics(
-                    (ref_chosen_logp, ref_rejected_logp)
-                )
-                ref_chosen_logps.append(ref_chosen_logp.cpu())
-                ref_rejected_logps.append(ref_rejected_logp.cpu())
+                ref_chosen_logps = []
+                ref_rejected_logps = []
+                for padded_batch in tqdm(iterable=data_loader, desc="Train dataset reference log probs"):
+                    ref_chosen_logp, ref_rejected_logp = self.compute_ref_log_probs(padded_batch)
+                    ref_chosen_logp, ref_rejected_logp = self.accelerator.gather_for_metrics(
+                        (ref_chosen_logp, ref_rejected_logp)
+                    )
+                    ref_chosen_logps.append(ref_chosen_logp.cpu())
+                    ref_rejected_logps.append(ref_rejected_logp.cpu())
 
-                # Unnecessary cache clearing to avoid OOM
-                empty_cache()
-                self.accelerator.free_memory()
+                    # Unnecessary cache clearing to avoid OOM
+                    empty_cache()
+                    self.accelerator.free_memory()
 
-            all_ref_chosen_logps = torch.cat(ref_chosen_logps).float().numpy()
-            all_ref_rejected_logps = torch.cat(ref_rejected_logps).float().numpy()
+                return torch.cat(ref_chosen_logps).float().numpy(), torch.cat(ref_rejected_logps).float().numpy()
 
-            self.train_dataset = self.train_dataset.add_column(name="ref_chosen_logps", column=all_ref_chosen_logps)
-            self.train_dataset = self.train_dataset.add_column(
-                name="ref_rejected_logps", column=all_ref_rejected_logps
+            # Rows seen before (any run, same reference model) come from the on-disk store (titan_refcache)
+            from titan_refcache import precompute_columns
+            self.train_dataset = precompute_columns(
+                self, self.train_dataset, ["ref_chosen_logps", "ref_rejected_logps"], compute
             )
 
             self._precomputed_train_ref_log_probs = True
@@ -1386,24 +1337,24 @@ class _UnslothDPOTrainer(BaseTrainer):
                 "shuffle": False,
             }
 
-            # prepare dataloader
-            data_loader = self.accelerator.prepare(DataLoader(eval_dataset, **dataloader_params))
+            def compute(dataset):
+                # prepare dataloader
+                data_loader = self.accelerator.prepare(DataLoader(dataset, **dataloader_params))
 
-            ref_chosen_logps = []
-            ref_rejected_logps = []
-            for padded_batch in tqdm(iterable=data_loader, desc="Eval dataset reference log probs"):
-                ref_chosen_logp, ref_rejected_logp = self.compute_ref_log_probs(padded_batch)
-                ref_chosen_logp, ref_rejected_logp = self.accelerator.gather_for_metrics(
-                    (ref_chosen_logp, ref_rejected_logp)
-                )
-                ref_chosen_logps.append(ref_chosen_logp.cpu())
-                ref_rejected_logps.append(ref_rejected_logp.cpu())
+                ref_chosen_logps = []
+                ref_rejected_logps = []
+                for padded_batch in tqdm(iterable=data_loader, desc="Eval dataset reference log probs"):
+                    ref_chosen_logp, ref_rejected_logp = self.compute_ref_log_probs(padded_batch)
+                    ref_chosen_logp, ref_rejected_logp = self.accelerator.gather_for_metrics(
+                        (ref_chosen_logp, ref_rejected_logp)
+                    )
+                    ref_chosen_logps.append(ref_chosen_logp.cpu())
+                    ref_rejected_logps.append(ref_rejected_logp.cpu())
 
-            all_ref_chosen_logps = torch.cat(ref_chosen_logps).float().numpy()
-            all_ref_rejected_logps = torch.cat(ref_rejected_logps).float().numpy()
+                return torch.cat(ref_chosen_logps).float().numpy(), torch.cat(ref_rejected_logps).float().numpy()
 
-            eval_dataset = eval_dataset.add_column(name="ref_chosen_logps", column=all_ref_chosen_logps)
-            eval_dataset = eval_dataset.add_column(name="ref_rejected_logps", column=all_ref_rejected_logps)
+            from titan_refcache import precompute_columns
+            eval_dataset = precompute_columns(self, eval_dataset, ["ref_chosen_logps", "ref_rejected_logps"], compute)
 
             # Save calculated ref_chosen_logps and ref_rejected_logps to the eval_dataset for subsequent runs
             if self.eval_dataset is not None:
@@ -2134,7 +2085,7 @@ class _UnslothDPOTrainer(BaseTrainer):
 
         # Compute the log probabilities of the labels
         labels[~loss_mask] = 0  # dummy token; we'll ignore the losses on these tokens later
-        per_token_logps = selective_log_softmax(logits, labels)
+        per_token_logps = chunked_selective_log_softmax(logits, labels)
         per_token_logps[~loss_mask] = 0
         per_token_logps = torch.roll(per_token_logps, shifts=1, dims=1)
 
@@ -2142,7 +2093,7 @@ class _UnslothDPOTrainer(BaseTrainer):
             # Unflatten the per_token_logps (shape: [1, sum_seq_len] -> [batch_size, seq_len])
             batch_size, seq_len = attention_mask.shape
             per_token_logps_ = torch.zeros(
-                batch_size, seq_len, device=outputs.logits.device, dtype=outputs.logits.dtype
+                batch_size, seq_len, device=outputs.logits.device, dtype=per_token_logps.dtype
             )
             per_token_logps_[attention_mask.bool()] = per_token_logps
             per_token_logps = per_token_logps_
@@ -90,23 +90,10 @@ torch_compile_options = {
     "triton.cudagraphs" : False,
 }
 
-@torch.compile(dynamic = True, fullgraph = True, options = torch_compile_options,)
 def chunked_selective_log_softmax(logits, index):
-    # Split into 4 chunks only
-    chunked_logits = torch.chunk(logits.reshape(-1, logits.shape[-1]), chunks = 4, dim = 0)
-    chunked_index  = torch.chunk(index.reshape(-1), chunks = 4, dim = 0)
-    all_per_token_logps = []
-    # Below loop does the same as selective_log_softmax(chunk_logits, chunk_index)
-    for chunk_logits, chunk_index in zip(chunked_logits, chunked_index):
-        chunk_logits = chunk_logits.to(torch.float32)
-        selected_logits = torch.gather(chunk_logits, dim = -1, index = chunk_index.unsqueeze(-1)).squeeze(-1)
-        logsumexp_values = torch.logsumexp(chunk_logits, dim = -1)
-        per_token_logps = selected_logits - logsumexp_values
-        all_per_token_logps.append(per_token_logps)
-    pass
-    all_per_token_logps = torch.concat(all_per_token_logps)
-    all_per_token_logps = all_per_token_logps.reshape((logits.shape[0], logits.shape[1]))
-    return all_per_token_logps
+    # Chunk count from a logits memory budget, fused slice-by-slice backward (titan_logsoftmax)
+    from titan_logsoftmax import selective_log_softmax as budgeted_selective_log_softmax
+    return budgeted_selective_log_softmax(logits, index)
 
 def calculate_pad_tokens_in_prompt(
     input_ids: torch.Tensor,
@@ -158,11 +145,9 @@ def left_pack_padding(tensor: torch.Tensor, pad_id: int) -> torch.Tensor:
     """
     Moves all padding tokens in each sequence of a batch to the right.
     """
-    mask = (tensor != pad_id)
-    # Must do stable=True since binary mark is unordered
-    sorted_indices = torch.argsort(mask, dim=1, descending=True, stable=True)
-    packed_tensor = torch.gather(tensor, 1, sorted_indices)
-    return packed_tensor
+    # Linear-time cumsum scatter instead of a stable argsort (titan_padding)
+    from titan_padding import left_pack_padding as cumsum_left_pack_padding
+    return cumsum_left_pack_padding(tensor, pad_id)
 
 def align_logprobs_with_mask(
     logprob_tensor: torch.Tensor,
@@ -172,44 +157,9 @@ def align_logprobs_with_mask(
     """
     Aligns a log probability tensor with a given attention mask.
     """
-
-    device = logprob_tensor.device
-    batch_size, logprob_seq_len = logprob_tensor.shape
-    mask_seq_len = attention_mask.shape[1]
-
-    padded_logprobs = torch.full(
-        attention_mask.shape,
-        fill_value=pad_value,
-        dtype=logprob_tensor.dtype,
-        device=device
-    )
-
-    left_pad_counts = torch.argmax(attention_mask, dim=1)
-
-    cols = torch.arange(logprob_seq_len, device=device)
-    dest_indices = left_pad_counts.unsqueeze(1) + cols
-
-    # Create destination row indices
-    # Shape: [batch_size, logprob_seq_len]
-    row_indices = torch.arange(batch_size, device=device).unsqueeze(1).expand_as(dest_indices)
-
-    # --- 4. Filter out-of-bounds indices and perform assignment ---
-    # Create a mask to identify only the indices that are within the bounds
-    # of the target tensor's sequence length.
-    valid_mask = dest_indices < mask_seq_len
-
-    # Use this mask to select only the valid row indices, column indices,
-    # and the corresponding values from the logprob tensor.
-    # This flattens the selected elements into 1D tensors.
-    valid_rows = row_indices[valid_mask]
-    valid_cols = dest_indices[valid_mask]
-    valid_vals = logprob_tensor[valid_mask]
-
-    # Place the valid values into their correct positions in the padded tensor
-    # using a single, efficient advanced indexing operation.
-    padded_logprobs[valid_rows, valid_cols] = valid_vals
-
-    return padded_logprobs
+    # One scatter with a spill column instead of index grids + boolean masking (titan_padding)
+    from titan_padding import align_logprobs_with_mask as scatter_align_logprobs_with_mask
+    return scatter_align_logprobs_with_mask(logprob_tensor, attention_mask, pad_value)
 def grpo_compute_loss(
     ref_logits,
     new_logits,
@@ -568,7 +518,12 @@ def grpo_accumulated_loss(
     kwargs["use_vllm"] = trainer.use_vllm
     # Find closest multiple
     factors = [i for i in range(1, bsz + 1) if bsz % i == 0]
-    if n_chunks == -1: n_chunks = bsz
+    if n_chunks == -1:
+        # Fewest row chunks whose float32 new/old/ref logits fit the logits budget (titan_logsoftmax)
+        from titan_logsoftmax import chunk_rows, WORKSPACE
+        vocab = trainer.model.get_output_embeddings().weight.shape[0]
+        rows_per_chunk = max(1, chunk_rows(vocab, workspace = WORKSPACE + 2) // (logits_to_keep + 1))
+        n_chunks = -(-bsz // rows_per_chunk)
     n_chunks = factors[min(np.searchsorted(factors, n_chunks), len(factors)-1)]
 
     if not hasattr(trainer, '_autocast_dtype'):
@@ -1122,6 +1077,14 @@ class UnslothGRPOConfig(GRPOConfig):
         default = -1,
         metadata = {'help': 'Chunk size to reduce memory usage. -1 is most efficient.'},
     )
+    reward_workers : Optional[int] = field(
+        default = None,
+        metadata = {'help': 'Threads scoring reward functions side by side (titan_rollout). None scores them one after another.'},
+    )
+    rollout_window : Optional[int] = field(
+        default = None,
+        metadata = {'help': 'Stream rollouts (titan_rollout): generate the batch this many rows (whole groups) at a time, scoring each window in the reward_workers pool while the next one generates, with at most this many unscored rollouts held. Single process, text-only, function rewards. None generates the whole batch, then scores it.'},
+    )
     
     def __init__(
         self,
@@ -1305,6 +1268,8 @@ class UnslothGRPOConfig(GRPOConfig):
         wandb_log_unique_prompts = False,
         vllm_sampling_params = None,
         unsloth_num_chunks = -1,
+        reward_workers = None,
+        rollout_window = None,
         
         **kwargs,
     ):
@@ -1527,6 +1492,8 @@ class UnslothGRPOConfig(GRPOConfig):
             wandb_log_unique_prompts = wandb_log_unique_prompts,**kwargs)
         self.vllm_sampling_params = vllm_sampling_params
         self.unsloth_num_chunks = unsloth_num_chunks
+        self.reward_workers = reward_workers
+        self.rollout_window = rollout_window
         
 pass
 
@@ -2293,6 +2260,17 @@ class _UnslothGRPOTrainer(BaseTrainer):
         # This allows for dynamic reward shaping based on training progress.
         reward_kwargs["trainer_state"] = self.state
 
+        pooled = None
+        reward_workers = getattr(self.args, "reward_workers", None)
+        if reward_workers and not any(isinstance(f, nn.Module) for f in self.reward_funcs):
+            # Every (reward function, chunk of rows) runs side by side in a thread pool (titan_rollout)
+            from titan_rollout import score_batch
+            pooled = score_batch(
+                self.reward_funcs, prompts, completions, completion_ids_list, reward_kwargs,
+                workers = reward_workers,
+                chunk = len(prompts),
+            )
+
         for i, (reward_func, reward_processing_class, reward_func_name) in enumerate(
             zip(self.reward_funcs, self.reward_processing_classes, self.reward_func_names)
         ):
@@ -2310,9 +2288,12 @@ class _UnslothGRPOTrainer(BaseTrainer):
                     with torch.inference_mode():
                         rewards_per_func[:, i] = reward_func(**reward_inputs).logits[:, 0]  # Shape (B*G,)
                 else:
-                    output_reward_func = reward_func(
-                        prompts=prompts, completions=completions, completion_ids=completion_ids_list, **reward_kwargs
-                    )
+                    if pooled is not None:
+                        output_reward_func = [row[i] for row in pooled]
+                    else:
+                        output_reward_func = reward_func(
+                            prompts=prompts, completions=completions, completion_ids=completion_ids_list, **reward_kwargs
+                        )
                     # Convert None values to NaN
                     output_reward_func = [reward if reward is not None else torch.nan for reward in output_reward_func]
 
@@ -2591,11 +2572,15 @@ class _UnslothGRPOTrainer(BaseTrainer):
         return prompt_ids, completion_ids, logprobs, forward_kwargs
 
     def _generate(self, prompts: list[str], images: Optional[list]):
+        prompt_ids, completion_ids, logprobs, forward_kwargs = self._generate_single_turn(prompts, images)
+        total_completion_tokens = self._log_completion_metrics(prompt_ids, completion_ids)
+        return prompt_ids, completion_ids, total_completion_tokens, logprobs, forward_kwargs
+
+    def _log_completion_metrics(self, prompt_ids, completion_ids):
+        """Token count + completion length metrics of one whole batch. Returns the total completion tokens."""
         device = self.accelerator.device
         mode = "train" if self.model.training else "eval"
 
-        prompt_ids, completion_ids, logprobs, forward_kwargs = self._generate_single_turn(prompts, images)
-
         # Get completion length per sequence, used for logging
         prompt_lengths = torch.tensor([len(ids) for ids in prompt_ids], device=device)
         completion_lengths = torch.tensor([len(ids) for ids in completion_ids], device=device)
@@ -2626,7 +2611,67 @@ class _UnslothGRPOTrainer(BaseTrainer):
         self._metrics[mode]["completions/min_terminated_length"].append(term_completion_lengths.float().min().item())
         self._metrics[mode]["completions/max_terminated_length"].append(term_completion_lengths.float().max().item())
 
-        return prompt_ids, completion_ids, total_completion_tokens, logprobs, forward_kwargs
+        return total_completion_tokens
+
+    def _stream_generate_and_score(self, inputs, prompts):
+        """
+        rollout_window set: generate the batch window rows (whole groups) at a time and hand every finished
+        window to titan_rollout's StreamingRolloutScorer, which scores it in a thread pool while the next window
+        generates and keeps online (Welford) group statistics. Completion metrics are logged once, over the whole
+        batch. Returns (the _generate outputs, (completions, rewards_per_func, advantages)), or None when
+        streaming does not apply.
+        """
+        window = getattr(self.args, "rollout_window", None)
+        if not window or self.accelerator.num_processes > 1 or any(isinstance(f, nn.Module) for f in self.reward_funcs):
+            return None
+        from titan_rollout import StreamingRolloutScorer, REWARD_WORKERS
+        device = self.accelerator.device
+        mode = "train" if self.model.training else "eval"
+        window = max(self.num_generations, window // self.num_generations * self.num_generations)
+        keys = [key for key in inputs[0] if key not in ["prompt", "completion", "completion_ids"]]
+        conversational = is_conversational(inputs[0])
+        scorer = StreamingRolloutScorer(
+            self.reward_funcs, self.num_generations,
+            reward_weights = self.reward_weights.tolist(),
+            window = window,
+            workers = getattr(self.args, "reward_workers", None) or REWARD_WORKERS,
+            scale_rewards = self.scale_rewards,
+            shared_kwargs = {"trainer_state": self.state},
+        )
+        prompt_ids_list, completion_ids_list, sampling_logps_list, completions = [], [], [], []
+        forward_kwargs, scored = {}, {}
+        try:
+            for start in range(0, len(prompts), window):
+                end = min(start + window, len(prompts))
+                prompt_ids, completion_ids, logps, forward_kwargs = self._generate_single_turn(prompts[start:end], None)
+                prompt_ids_list.extend(prompt_ids)
+                completion_ids_list.extend(completion_ids)
+                sampling_logps_list = None if logps is None or sampling_logps_list is None else sampling_logps_list + list(logps)
+                texts = self.processing_class.batch_decode(completion_ids, skip_special_tokens=True)
+                for row, prompt, text, ids in zip(range(start, end), prompts[start:end], texts, completion_ids):
+                    if conversational:
+                        bootstrap = prompt.pop()["content"] if prompt[-1]["role"] == "assistant" else ""
+                        completion = [{"role": "assistant", "content": bootstrap + text}]
+                    else:
+                        completion = text
+                    completions.append(completion)
+                    # Scored in the pool while the next window generates
+                    scorer.submit(row // self.num_generations, prompt, completion, ids, key=row,
+                                  **{key: inputs[row][key] for key in keys})
+                for _, members in scorer.results():
+                    scored.update((r.key, r) for r in members)
+            for _, members in scorer.close():
+                scored.update((r.key, r) for r in members)
+        finally:
+            scorer.pool.shutdown()
+
+        num_items_in_batch = self._log_completion_metrics(prompt_ids_list, completion_ids_list)
+        rollouts = [scored[row] for row in range(len(prompts))]
+        rewards_per_func = torch.tensor([r.rewards for r in rollouts], dtype=torch.float32, device=device)
+        advantages = torch.tensor([r.advantage for r in rollouts], dtype=torch.float32, device=device)
+        self._metrics[mode]["rollouts/peak_in_flight"].append(scorer.peak_held)
+        generated = (prompt_ids_list, completion_ids_list, num_items_in_batch, sampling_logps_list, forward_kwargs)
+        return generated, (completions, rewards_per_func, advantages)
 
     def _generate_and_score_completions(
         self, inputs: list[dict[str, Union[torch.Tensor, Any]]]
@@ -2646,13 +2691,19 @@ class _UnslothGRPOTrainer(BaseTrainer):
         if images is not None and all(img_list == [] for img_list in images):
             images = None
 
+        # Text-only batches with rollout_window set are generated and scored window by window (titan_rollout)
+        streamed = self._stream_generate_and_score(inputs, prompts) if images is None else None
+        if streamed is not None:
+            generated, streamed = streamed
+        else:
+            generated = self._generate(prompts, images)
         (
             prompt_ids_list,
             completion_ids_list,
             num_items_in_batch,
             sampling_per_token_logps_list,
             forward_kwargs,
-        ) = self._generate(prompts, images)
+        ) = generated
 
         # Convert lists of token IDs to padded tensors
         prompt_ids = [torch.tensor(ids, device=device) for ids in prompt_ids_list]
@@ -2764,7 +2815,9 @@ class _UnslothGRPOTrainer(BaseTrainer):
         # Decode
         prompts_text = self.processing_class.batch_decode(prompt_ids, skip_special_tokens=True)
         completions_text = self.processing_class.batch_decode(completion_ids, skip_special_tokens=True)
-        if is_conversational(inputs[0]):
+        if streamed is not None:
+            completions = streamed[0]  # built (and the assistant bootstrap popped) while streaming
+        elif is_conversational(inputs[0]):
             completions = []
             for prompt, completion in zip(prompts, completions_text):
                 bootstrap = prompt.pop()["content"] if prompt[-1]["role"] == "assistant" else ""
@@ -2775,7 +2828,10 @@ class _UnslothGRPOTrainer(BaseTrainer):
         # Calculate rewards for each reward function. rewards_per_func aggregates rewards across all processes. This is
         # important because rewards will be normalized per group, and completions are distributed. We will later slice
         # rewards_per_func to extract each process's subset.
-        rewards_per_func = self._calculate_rewards(inputs, prompts, completions, completion_ids_list)
+        if streamed is not None:
+            rewards_per_func = streamed[1]
+        else:
+            rewards_per_func = self._calculate_rewards(inputs, prompts, completions, completion_ids_list)
 
         # Apply weights to each reward function's output and sum
         rewards = (rewards_per_func * self.reward_weights.to(device).unsqueeze(0)).nansum(dim=1)
@@ -2802,6 +2858,10 @@ class _UnslothGRPOTrainer(BaseTrainer):
         is_std_zero = torch.isclose(std_rewards, torch.zeros_like(std_rewards))
         if self.scale_rewards != "none":
             advantages = advantages / (std_rewards + 1e-4)
+        if streamed is not None and self.scale_rewards != "batch":
+            # Online group statistics: identical for "group" / "none". "batch" keeps the whole-batch std above,
+            # computed from the streamed rewards (a running std would scale early groups by a few rewards only)
+            advantages = streamed[2]
 
         # Slice to keep only the local part of the data
         process_slice = slice(
@@ -90,23 +90,10 @@ torch_compile_options = {
     "triton.cudagraphs" : False,
 }
 
-@torch.compile(dynamic = True, fullgraph = True, options = torch_compile_options,)
 def chunked_selective_log_softmax(logits, index):
-    # Split into 4 chunks only
-    chunked_logits = torch.chunk(logits.reshape(-1, logits.shape[-1]), chunks = 4, dim = 0)
-    chunked_index  = torch.chunk(index.reshape(-1), chunks = 4, dim = 0)
-    all_per_token_logps = []
-    # Below loop does the same as selective_log_softmax(chunk_logits, chunk_index)
-    for chunk_logits, chunk_index in zip(chunked_logits, chunked_index):
-        chunk_logits = chunk_logits.to(torch.float32)
-        selected_logits = torch.gather(chunk_logits, dim = -1, index = chunk_index.unsqueeze(-1)).squeeze(-1)
-        logsumexp_values = torch.logsumexp(chunk_logits, dim = -1)
-        per_token_logps = selected_logits - logsumexp_values
-        all_per_token_logps.append(per_token_logps)
-    pass
-    all_per_token_logps = torch.concat(all_per_token_logps)
-    all_per_token_logps = all_per_token_logps.reshape((logits.shape[0], logits.shape[1]))
-    return all_per_token_logps
+    # Chunk count from a logits memory budget, fused slice-by-slice backward (titan_logsoftmax)
+    from titan_logsoftmax import selective_log_softmax as budgeted_selective_log_softmax
+    return budgeted_selective_log_softmax(logits, index)
 
 def calculate_pad_tokens_in_prompt(
     input_ids: torch.Tensor,
@@ -158,11 +145,9 @@ def left_pack_padding(tensor: torch.Tensor, pad_id: int) -> torch.Tensor:
     """
     Moves all padding tokens in each sequence of a batch to the right.
     """
-    mask = (tensor != pad_id)
-    # Must do stable=True since binary mark is unordered
-    sorted_indices = torch.argsort(mask, dim=1, descending=True, stable=True)
-    packed_tensor = torch.gather(tensor, 1, sorted_indices)
-    return packed_tensor
+    # Linear-time cumsum scatter instead of a stable argsort (titan_padding)
+    from titan_padding import left_pack_padding as cumsum_left_pack_padding
+    return cumsum_left_pack_padding(tensor, pad_id)
 
 def align_logprobs_with_mask(
     logprob_tensor: torch.Tensor,
@@ -172,44 +157,9 @@ def align_logprobs_with_mask(
     """
     Aligns a log probability tensor with a given attention mask.
     """
-
-    device = logprob_tensor.device
-    batch_size, logprob_seq_len = logprob_tensor.shape
-    mask_seq_len = attention_mask.shape[1]
-
-    padded_logprobs = torch.full(
-        attention_mask.shape,
-        fill_value=pad_value,
-        dtype=logprob_tensor.dtype,
-        device=device
-    )
-
-    left_pad_counts = torch.argmax(attention_mask, dim=1)
-
-    cols = torch.arange(logprob_seq_len, device=device)
-    dest_indices = left_pad_counts.unsqueeze(1) + cols
-
-    # Create destination row indices
-    # Shape: [batch_size, logprob_seq_len]
-    row_indices = torch.arange(batch_size, device=device).unsqueeze(1).expand_as(dest_indices)
-
-    # --- 4. Filter out-of-bounds indices and perform assignment ---
-    # Create a mask to identify only the indices that are within the bounds
-    # of the target tensor's sequence length.
-    valid_mask = dest_indices < mask_seq_len
-
-    # Use this mask to select only the valid row indices, column indices,
-    # and the corresponding values from the logprob tensor.
-    # This flattens the selected elements into 1D tensors.
-    valid_rows = row_indices[valid_mask]
-    valid_cols = dest_indices[valid_mask]
-    valid_vals = logprob_tensor[valid_mask]
-
-    # Place the valid values into their correct positions in the padded tensor
-    # using a single, efficient advanced indexing operation.
-    padded_logprobs[valid_rows, valid_cols] = valid_vals
-
-    return padded_logprobs
+    # One scatter with a spill column instead of index grids + boolean masking (titan_padding)
+    from titan_padding import align_logprobs_with_mask as scatter_align_logprobs_with_mask
+    return scatter_align_logprobs_with_mask(logprob_tensor, attention_mask, pad_value)
 @dataclass
 class UnslothSFTConfig(SFTConfig):
     """
@@ -304,6 +254,14 @@ class UnslothSFTConfig(SFTConfig):
         default = None,
         metadata = {'help': 'Maximum sequence length to truncate to.'},
     )
+    max_tokens_per_batch : Optional[int] = field(
+        default = None,
+        metadata = {'help': 'Token budget per batch. Enables length-bucketed dynamic batching instead of a fixed per_device_train_batch_size.'},
+    )
+    logits_budget_bytes : Optional[int] = field(
+        default = None,
+        metadata = {'help': 'Float32 logits memory budget. Computes the loss from hidden states in budget-sized slices (titan_logsoftmax).'},
+    )
     def __init__(
         self,
         output_dir = None,
@@ -456,6 +414,8 @@ class UnslothSFTConfig(SFTConfig):
         vllm_sampling_params = None,
         unsloth_num_chunks = -1,
         max_seq_length = None,
+        max_tokens_per_batch = None,
+        logits_budget_bytes = None,
         **kwargs,
     ):
         if learning_rate < 1e-7: print(f'Unsloth: Your learning rate of `{learning_rate}` is too small and less than 1e-7! Consider increasing it, otherwise gradient updates will be close to 0!')
@@ -629,6 +589,8 @@ class UnslothSFTConfig(SFTConfig):
         self.vllm_sampling_params = vllm_sampling_params
         self.unsloth_num_chunks = unsloth_num_chunks
         self.max_seq_length = max_seq_length
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.logits_budget_bytes = logits_budget_bytes
 pass
 
 class _UnslothSFTTrainer(BaseTrainer):
@@ -663,7 +625,11 @@ class _UnslothSFTTrainer(BaseTrainer):
             dict_args = args.to_dict()
             dict_args["hub_token"] = args.hub_token  # to_dict hides the hub_token
             dict_args.pop("push_to_hub_token")
+            max_tokens_per_batch = getattr(args, "max_tokens_per_batch", None)
+            logits_budget_bytes = getattr(args, "logits_budget_bytes", None)
             args = SFTConfig(**dict_args)
+            args.max_tokens_per_batch = max_tokens_per_batch
+            args.logits_budget_bytes = logits_budget_bytes
 
         # Model
         if isinstance(model, str):
@@ -1085,6 +1051,35 @@ class _UnslothSFTTrainer(BaseTrainer):
         pass
         return dataset
     
+    def get_train_dataloader(self):
+        # Length-bucketed batches under a token budget (titan_batching) when `max_tokens_per_batch` is set
+        max_tokens = getattr(self.args, "max_tokens_per_batch", None)
+        if not max_tokens or self.train_dataset is None or isinstance(self.train_dataset, IterableDataset):
+            return super().get_train_dataloader()
+        from torch.utils.data import DataLoader
+        from titan_batching import TokenBudgetBatchSampler, dataset_lengths
+
+        train_dataset = self.train_dataset
+        data_collator = self.data_collator
+        if isinstance(train_dataset, Dataset):
+            train_dataset = self._remove_unused_columns(train_dataset, description="training")
+        else:
+            data_collator = self._get_collator_with_removed_columns(data_collator, description="training")
+        batch_sampler = TokenBudgetBatchSampler(
+            dataset_lengths(train_dataset),
+            max_tokens = max_tokens,
+            seed = self.args.data_seed if self.args.data_seed is not None else self.args.seed,
+        )
+        dataloader = DataLoader(
+            train_dataset,
+            batch_sampler = batch_sampler,
+            collate_fn = data_collator,
+            num_workers = self.args.dataloader_num_workers,
+            pin_memory = self.args.dataloader_pin_memory,
+            persistent_workers = self.args.dataloader_persistent_workers and self.args.dataloader_num_workers > 0,
+        )
+        return self.accelerator.prepare(dataloader)
+
     def _set_signature_columns_if_needed(self):
         # If `self.args.remove_unused_columns` is True, non-signature columns are removed.
         # By default, this method sets `self._signature_columns` to the model's expected inputs (usually, "input_ids"
@@ -1099,6 +1094,9 @@ class _UnslothSFTTrainer(BaseTrainer):
     def compute_loss(
         self, model, inputs, return_outputs = False, num_items_in_batch = None
     ):
+        budget = getattr(self.args, "logits_budget_bytes", None)
+        if budget and not return_outputs and "labels" in inputs:
+            return self._budgeted_loss(model, inputs, budget, num_items_in_batch)
         outputs = super().compute_loss(
             model,
             inputs,
@@ -1107,6 +1105,29 @@ class _UnslothSFTTrainer(BaseTrainer):
         )
         return outputs
 
+    def _budgeted_loss(self, model, inputs, budget, num_items_in_batch):
+        # Next-token NLL from hidden states + lm_head in budget-sized slices; the full logits never exist.
+        # Metrics that need the logits (entropy, token accuracy) are not logged on this path.
+        from titan_logsoftmax import cross_entropy, linear_cross_entropy
+        inputs = dict(inputs)
+        labels = inputs.pop("labels")
+        os.environ["UNSLOTH_RETURN_HIDDEN_STATES"] = "1"
+        try:
+            outputs = model(**inputs)
+        finally:
+            # Must force not returning hidden states but logits otherwise gibberish
+            os.environ["UNSLOTH_RETURN_HIDDEN_STATES"] = "0"
+        lm_head = self.accelerator.unwrap_model(model).get_output_embeddings()
+        if num_items_in_batch is not None and not self.model_accepts_loss_kwargs:
+            num_items_in_batch = None
+        if outputs.logits.shape[-1] == lm_head.weight.shape[0]:
+            # Model without the hidden-state switch: already logits
+            return cross_entropy(outputs.logits, labels, num_items_in_batch = num_items_in_batch, budget_bytes = budget)
+        return linear_cross_entropy(
+            outputs.logits, lm_head.weight, labels,
+            num_items_in_batch = num_items_in_batch, budget_bytes = budget,
+        )
+
     # Override training step to add activation offloading context.
     def training_step(self, *args, **kwargs):
         with self.maybe_activation_offload_context: